@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Ajuste Automático do Encoder libx264 para o ZudoEditor
+
+Este script mede, na máquina local e com um clipe de amostra, o tempo de
+codificação, a qualidade (SSIM) e o bitrate de combinações de preset, CRF e
+threads do libx264. Para cada perfil de plataforma é guardada a combinação
+mais rápida que atende à meta de qualidade e tamanho do perfil. Os caminhos
+de renderização (MoviePy, fan-out, ffmpeg e gerador de vídeos) leem esses
+ajustes automaticamente por parametros_encoder().
+
+Uso:
+    python ajuste_encoder.py --amostra /caminho/para/amostra.mp4
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+
+from sonda_midia import obter_sonda
+
+logger = logging.getLogger("AjusteEncoder")
+
+# Arquivo com os ajustes medidos (pasta config do ZudoEditor)
+ARQUIVO_AJUSTES_PADRAO = os.environ.get(
+    "ZUDO_AJUSTE_ENCODER",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "encoder_tuning.json")
+)
+
+# Parâmetros usados enquanto não houver ajuste medido
+PARAMETROS_PADRAO = {
+    "preset": "medium",
+    "crf": 23,
+    "threads": 4
+}
+
+# Candidatos avaliados (do mais rápido para o mais lento)
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium"]
+CRFS = [18, 21, 23, 26]
+
+# Perfil do gerador de vídeos (VideoGeneratorConfig), além das PLATAFORMAS
+PERFIL_GERADOR = "gerador"
+META_GERADOR = {
+    "resolucao": (1920, 1080),
+    "qualidade_minima": 0.97,
+    "bitrate_maximo": 10000
+}
+
+# Duração da amostra usada nas medições (segundos)
+DURACAO_AMOSTRA = 10
+
+# Ajustes já lidos do disco (invalidado quando o arquivo muda)
+_cache_ajustes = {}
+
+
+def carregar_ajustes(caminho=None):
+    """
+    Carrega os ajustes medidos.
+    
+    Args:
+        caminho: Arquivo de ajustes (padrão: ARQUIVO_AJUSTES_PADRAO)
+    
+    Returns:
+        Dict: Ajustes por perfil (vazio se ainda não houver medição)
+    """
+    caminho = caminho or ARQUIVO_AJUSTES_PADRAO
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return {}
+    
+    chave = (caminho, estado.st_mtime_ns, estado.st_size)
+    if _cache_ajustes.get("chave") != chave:
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                perfis = json.load(f).get("perfis", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ajustes do encoder inválidos em {caminho}: {str(e)}")
+            perfis = {}
+        _cache_ajustes.update({"chave": chave, "perfis": perfis})
+    
+    return _cache_ajustes["perfis"]
+
+
+def parametros_encoder(perfil, threads_max=None, caminho=None):
+    """
+    Retorna preset, CRF e threads do libx264 para um perfil.
+    
+    Args:
+        perfil: Nome da plataforma (PLATAFORMAS) ou PERFIL_GERADOR
+        threads_max: Limite de threads (orçamento de CPU do chamador)
+        caminho: Arquivo de ajustes (opcional)
+    
+    Returns:
+        Dict: "preset", "crf" e "threads"
+    """
+    parametros = dict(PARAMETROS_PADRAO)
+    ajuste = carregar_ajustes(caminho).get(perfil)
+    if ajuste:
+        parametros.update({chave: ajuste[chave] for chave in PARAMETROS_PADRAO if chave in ajuste})
+    
+    if threads_max:
+        parametros["threads"] = max(1, min(parametros["threads"], threads_max))
+    
+    return parametros
+
+
+def parametros_ffmpeg(parametros):
+    """Parâmetros extras do ffmpeg (ffmpeg_params do MoviePy) para o CRF"""
+    return ["-crf", str(parametros["crf"])]
+
+
+def _executar(comando):
+    """Executa o ffmpeg e retorna o stderr; levanta exceção em caso de erro"""
+    resultado = subprocess.run(
+        comando,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    if resultado.returncode != 0:
+        raise Exception(f"Erro no ffmpeg: {resultado.stderr.strip()[-2000:]}")
+    return resultado.stderr
+
+
+def preparar_referencia(amostra, resolucao, pasta, duracao=DURACAO_AMOSTRA):
+    """
+    Gera a referência sem perdas na resolução do perfil.
+    
+    Todas as medições partem dela, então recorte, escala e decodificação da
+    amostra original não entram no tempo de codificação medido.
+    """
+    largura, altura = resolucao
+    referencia = os.path.join(pasta, f"referencia_{largura}x{altura}.mkv")
+    _executar([
+        "ffmpeg", "-y",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", amostra,
+        "-t", str(duracao),
+        "-an",
+        "-vf", f"scale={largura}:{altura}:force_original_aspect_ratio=increase,crop={largura}:{altura}",
+        "-c:v", "libx264",
+        "-qp", "0",
+        "-preset", "ultrafast",
+        "-pix_fmt", "yuv420p",
+        referencia
+    ])
+    return referencia
+
+
+def medir(referencia, preset, crf, threads, pasta):
+    """
+    Codifica a referência com uma combinação e mede tempo, qualidade e bitrate.
+    
+    Returns:
+        Dict: preset, crf, threads, segundos, ssim e bitrate (kbps)
+    """
+    saida = os.path.join(pasta, f"teste_{preset}_{crf}_{threads}.mp4")
+    
+    inicio = time.time()
+    _executar([
+        "ffmpeg", "-y",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", referencia,
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", str(crf),
+        "-threads", str(threads),
+        "-pix_fmt", "yuv420p",
+        saida
+    ])
+    segundos = time.time() - inicio
+    
+    # SSIM da saída em relação à referência
+    log = _executar([
+        "ffmpeg",
+        "-hide_banner",
+        "-i", saida,
+        "-i", referencia,
+        "-lavfi", "[0:v][1:v]ssim",
+        "-f", "null", "-"
+    ])
+    ssim = re.findall(r"All:([0-9.]+)", log)
+    
+    # Bitrate efetivo (tamanho / duração da referência)
+    duracao = _duracao(referencia)
+    bitrate = os.path.getsize(saida) * 8 / 1000 / duracao if duracao else 0
+    
+    os.remove(saida)
+    return {
+        "preset": preset,
+        "crf": crf,
+        "threads": threads,
+        "segundos": round(segundos, 3),
+        "ssim": float(ssim[-1]) if ssim else 0.0,
+        "bitrate": round(bitrate)
+    }
+
+
+def _duracao(arquivo):
+    """Duração de um arquivo de mídia em segundos"""
+    info = obter_sonda().info_video(arquivo)
+    return info["duracao"] if info else 0
+
+
+def _atende(medicao, meta):
+    return medicao["ssim"] >= meta["qualidade_minima"] and medicao["bitrate"] <= meta["bitrate_maximo"]
+
+
+def ajustar_perfil(referencia, meta, pasta, candidatos_threads):
+    """
+    Escolhe a combinação mais rápida que atende à meta do perfil.
+    
+    Preset e CRF são avaliados com o número padrão de threads; em seguida
+    as threads são ajustadas para a combinação escolhida.
+    
+    Returns:
+        Dict: Combinação escolhida e suas medições
+    """
+    threads_base = min(PARAMETROS_PADRAO["threads"], max(candidatos_threads))
+    medicoes = []
+    for preset in PRESETS:
+        for crf in CRFS:
+            medicao = medir(referencia, preset, crf, threads_base, pasta)
+            logger.info(f"- {preset} crf={crf}: {medicao['segundos']}s, SSIM {medicao['ssim']:.4f}, {medicao['bitrate']} kbps")
+            medicoes.append(medicao)
+    
+    aprovadas = [m for m in medicoes if _atende(m, meta)]
+    if aprovadas:
+        escolhida = min(aprovadas, key=lambda m: m["segundos"])
+    else:
+        # Nenhuma combinação atende: ficar com a de melhor qualidade dentro do limite de tamanho
+        dentro_limite = [m for m in medicoes if m["bitrate"] <= meta["bitrate_maximo"]] or medicoes
+        escolhida = max(dentro_limite, key=lambda m: m["ssim"])
+        logger.warning(f"Nenhuma combinação atinge a meta {meta}; usando a de maior qualidade")
+    
+    # Threads: menor número que fica a até 5% do mais rápido
+    por_threads = [escolhida]
+    for threads in candidatos_threads:
+        if threads != threads_base:
+            por_threads.append(medir(referencia, escolhida["preset"], escolhida["crf"], threads, pasta))
+    mais_rapido = min(m["segundos"] for m in por_threads)
+    escolhida = min(
+        (m for m in por_threads if m["segundos"] <= mais_rapido * 1.05),
+        key=lambda m: m["threads"]
+    )
+    
+    escolhida["atende_meta"] = _atende(escolhida, meta)
+    return escolhida
+
+
+def ajustar(amostra, perfis, caminho=None, duracao=DURACAO_AMOSTRA):
+    """
+    Mede os perfis e grava os ajustes.
+    
+    Args:
+        amostra: Clipe de vídeo usado nas medições
+        perfis: Dicionário nome -> meta ("resolucao", "qualidade_minima", "bitrate_maximo")
+        caminho: Arquivo de ajustes (padrão: ARQUIVO_AJUSTES_PADRAO)
+        duracao: Segundos da amostra usados nas medições
+    
+    Returns:
+        Dict: Ajustes gravados
+    """
+    caminho = caminho or ARQUIVO_AJUSTES_PADRAO
+    cpus = os.cpu_count() or 4
+    candidatos_threads = sorted({t for t in (1, 2, 4, 8, cpus) if t <= cpus})
+    
+    pasta = tempfile.mkdtemp(prefix="zudo_ajuste_")
+    ajustes = {}
+    try:
+        referencias = {}
+        medidos = {}
+        for nome, meta in perfis.items():
+            resolucao = tuple(meta["resolucao"])
+            chave = (resolucao, meta["qualidade_minima"], meta["bitrate_maximo"])
+            
+            # Perfis com a mesma resolução e meta compartilham a medição
+            if chave not in medidos:
+                if resolucao not in referencias:
+                    referencias[resolucao] = preparar_referencia(amostra, resolucao, pasta, duracao)
+                logger.info(f"Medindo perfil {nome} ({resolucao[0]}x{resolucao[1]})")
+                medidos[chave] = ajustar_perfil(referencias[resolucao], meta, pasta, candidatos_threads)
+            
+            ajustes[nome] = dict(medidos[chave])
+            logger.info(f"Perfil {nome}: {ajustes[nome]}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({
+            "amostra": os.path.abspath(amostra),
+            "cpus": cpus,
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "perfis": ajustes
+        }, f, indent=4)
+    
+    logger.info(f"Ajustes gravados em: {caminho}")
+    return ajustes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajuste automático do encoder libx264")
+    parser.add_argument("--amostra", required=True, help="Clipe de vídeo usado nas medições")
+    parser.add_argument("--saida", default=ARQUIVO_AJUSTES_PADRAO, help="Arquivo de ajustes")
+    parser.add_argument("--duracao", type=float, default=DURACAO_AMOSTRA,
+                        help="Segundos da amostra usados nas medições")
+    parser.add_argument("--plataformas", nargs="+", help="Perfis a medir (padrão: todos)")
+    
+    args = parser.parse_args()
+    
+    from processador_video import PLATAFORMAS
+    
+    perfis = dict(PLATAFORMAS)
+    perfis[PERFIL_GERADOR] = META_GERADOR
+    if args.plataformas:
+        perfis = {nome: perfis[nome] for nome in args.plataformas}
+    
+    ajustar(args.amostra, perfis, args.saida, args.duracao)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Análise de Mídia em Passada Única para o ZudoEditor
+
+Este módulo analisa um vídeo de entrada com uma única decodificação do
+ffmpeg, que produz ao mesmo tempo:
+- o PCM 16 kHz mono usado no reconhecimento de fala (pipe ou arquivo WAV);
+- as estatísticas de loudness EBU R128 (filtro ebur128);
+- algumas miniaturas reduzidas distribuídas ao longo do vídeo.
+
+As informações de formato e streams vêm da sonda com cache (sonda_midia),
+que lê apenas o cabeçalho do arquivo.
+
+Uso:
+    python analise_midia.py /caminho/para/video.mp4 /caminho/para/miniaturas
+"""
+
+import os
+import re
+import sys
+import json
+import logging
+import subprocess
+
+import audio_pcm
+from reconhecimento_fala import TAXA_AMOSTRAGEM
+from sonda_midia import obter_sonda
+
+logger = logging.getLogger("AnaliseMidia")
+
+# Miniaturas geradas por vídeo e sua largura em pixels
+N_MINIATURAS = 6
+LARGURA_MINIATURA = 320
+
+
+class AnaliseMidia:
+    """Análise de um vídeo em uma única passada do ffmpeg."""
+    
+    def __init__(self, arquivo, pasta_miniaturas, info=None, arquivo_audio=None,
+                 n_miniaturas=N_MINIATURAS, largura_miniatura=LARGURA_MINIATURA):
+        """
+        Inicializa a análise.
+        
+        Args:
+            arquivo: Vídeo a analisar
+            pasta_miniaturas: Pasta onde as miniaturas serão gravadas
+            info: Resumo do vídeo (ver SondaMidia.info_video); consultado se ausente
+            arquivo_audio: Gravar o PCM neste WAV em vez de entregá-lo em pipe
+            n_miniaturas: Número de miniaturas
+            largura_miniatura: Largura das miniaturas em pixels
+        """
+        self.arquivo = arquivo
+        self.pasta_miniaturas = pasta_miniaturas
+        self.info = info or obter_sonda().info_video(arquivo) or {}
+        self.arquivo_audio = arquivo_audio
+        self.n_miniaturas = n_miniaturas
+        self.largura_miniatura = largura_miniatura
+        
+        # Preenchido ao fim da passada
+        self.resultado = None
+    
+    @property
+    def tem_audio(self):
+        return self.info.get("tem_audio", False)
+    
+    @property
+    def tem_video(self):
+        return bool(self.info.get("largura"))
+    
+    def comando(self):
+        """Monta o comando ffmpeg da passada única"""
+        grafo = []
+        saidas = []
+        
+        if self.tem_audio:
+            # Loudness medido no áudio original, antes da reamostragem para o ASR
+            grafo.append(
+                "[0:a:0]ebur128=peak=true:framelog=verbose,"
+                f"aresample={TAXA_AMOSTRAGEM},aformat=sample_fmts=s16:channel_layouts=mono[pcm]"
+            )
+            saidas += ["-map", "[pcm]", "-c:a", "pcm_s16le"]
+            if self.arquivo_audio:
+                saidas += ["-f", "wav", self.arquivo_audio]
+            else:
+                saidas += ["-f", "s16le", "pipe:1"]
+        
+        if self.tem_video and self.n_miniaturas:
+            duracao = self.info.get("duracao") or 0
+            taxa = f"{self.n_miniaturas}/{duracao:.3f}" if duracao else "1/10"
+            grafo.append(f"[0:v:0]fps=fps={taxa},scale={self.largura_miniatura}:-2[miniaturas]")
+            saidas += [
+                "-map", "[miniaturas]",
+                "-frames:v", str(self.n_miniaturas),
+                "-q:v", "4",
+                os.path.join(self.pasta_miniaturas, "miniatura_%02d.jpg")
+            ]
+        
+        return [
+            "ffmpeg", "-y",
+            "-hide_banner",
+            "-nostats",
+            "-loglevel", "info",
+            "-i", self.arquivo,
+            "-filter_complex", ";".join(grafo)
+        ] + saidas
+    
+    def blocos_pcm(self, amostras_por_bloco=audio_pcm.AMOSTRAS_POR_BLOCO):
+        """
+        Executa a passada entregando o PCM à medida que é decodificado.
+        
+        Yields:
+            np.ndarray: Blocos int16 mono (nenhum se o vídeo não tiver áudio)
+        """
+        if self.arquivo_audio:
+            raise ValueError("O PCM está sendo gravado em arquivo; use executar()")
+        
+        if not self.tem_audio:
+            self.executar()
+            return
+        
+        os.makedirs(self.pasta_miniaturas, exist_ok=True)
+        yield from audio_pcm.stream_pcm(
+            self.arquivo,
+            amostras_por_bloco=amostras_por_bloco,
+            comando=self.comando(),
+            ao_concluir=self._concluir
+        )
+    
+    def executar(self):
+        """
+        Executa a passada até o fim (PCM em arquivo WAV ou vídeo sem áudio).
+        
+        Returns:
+            Dict: Resultado da análise
+        """
+        if not self.tem_audio and not self.tem_video:
+            self._concluir("")
+            return self.resultado
+        
+        os.makedirs(self.pasta_miniaturas, exist_ok=True)
+        if self.tem_audio and not self.arquivo_audio:
+            # PCM não é necessário: descartar a saída de áudio
+            comando = self.comando()
+            comando[comando.index("pipe:1")] = os.devnull
+        else:
+            comando = self.comando()
+        
+        resultado = subprocess.run(
+            comando,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        log = resultado.stderr.decode("utf-8", errors="replace")
+        if resultado.returncode != 0:
+            raise Exception(f"Erro na análise de mídia: {log.strip()[-2000:]}")
+        
+        self._concluir(log)
+        return self.resultado
+    
+    def _concluir(self, log):
+        """Monta o resultado a partir do log do ffmpeg e das miniaturas gravadas"""
+        miniaturas = []
+        if os.path.isdir(self.pasta_miniaturas):
+            miniaturas = sorted(
+                os.path.join(self.pasta_miniaturas, nome)
+                for nome in os.listdir(self.pasta_miniaturas)
+                if nome.startswith("miniatura_")
+            )
+        
+        self.resultado = {
+            "info": self.info,
+            "loudness": extrair_loudness(log) if self.tem_audio else None,
+            "miniaturas": miniaturas
+        }
+        logger.info(f"Análise concluída: {self.arquivo}")
+
+
+def extrair_loudness(log):
+    """
+    Extrai o resumo do filtro ebur128 do log do ffmpeg.
+    
+    Returns:
+        Dict: integrado (LUFS), faixa (LU) e pico_real (dBFS), ou None se ausente
+    """
+    if "Summary:" not in log:
+        return None
+    
+    resumo = log[log.rindex("Summary:"):]
+    padroes = {
+        "integrado": r"I:\s+(-?[\d.]+|-inf) LUFS",
+        "faixa": r"LRA:\s+(-?[\d.]+) LU",
+        "pico_real": r"Peak:\s+(-?[\d.]+|-inf) dBFS"
+    }
+    
+    loudness = {}
+    for chave, padrao in padroes.items():
+        encontrado = re.search(padrao, resumo)
+        loudness[chave] = float(encontrado.group(1)) if encontrado else None
+    return loudness
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    analise = AnaliseMidia(sys.argv[1], sys.argv[2])
+    amostras = sum(len(bloco) for bloco in analise.blocos_pcm())
+    print(f"PCM: {amostras / TAXA_AMOSTRAGEM:.1f}s")
+    print(json.dumps(analise.resultado, indent=4))
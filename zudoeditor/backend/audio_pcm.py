@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Extração de Áudio PCM em Streaming para o ZudoEditor
+
+Este módulo lê o áudio de um vídeo como PCM 16 kHz mono diretamente do
+stdout do ffmpeg, sem arquivo WAV temporário. Os blocos passam por um
+buffer circular NumPy e são entregues como segmentos ao reconhecedor de
+fala (ou a outros analisadores) enquanto a extração ainda está em curso.
+"""
+
+import wave
+import logging
+import threading
+import subprocess
+
+import numpy as np
+
+from reconhecimento_fala import SegmentoAudio, TAXA_AMOSTRAGEM, LARGURA_AMOSTRA
+
+logger = logging.getLogger("AudioPCM")
+
+# Amostras lidas do ffmpeg por bloco (~1 segundo a 16 kHz)
+AMOSTRAS_POR_BLOCO = 16384
+
+
+def stream_pcm(arquivo, taxa=TAXA_AMOSTRAGEM, amostras_por_bloco=AMOSTRAS_POR_BLOCO,
+               comando=None, ao_concluir=None):
+    """
+    Decodifica o áudio de um arquivo e produz blocos PCM à medida que chegam.
+    
+    Args:
+        arquivo: Arquivo de vídeo ou áudio
+        taxa: Taxa de amostragem de saída em Hz
+        amostras_por_bloco: Tamanho de cada bloco lido do ffmpeg
+        comando: Comando ffmpeg alternativo que escreve PCM s16le mono em
+            pipe:1 (ex.: análise em passada única, ver analise_midia)
+        ao_concluir: Função chamada com o log (stderr) do ffmpeg ao fim do stream
+    
+    Yields:
+        np.ndarray: Blocos int16 mono
+    """
+    if comando is None:
+        comando = [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel", "error",
+            "-i", arquivo,
+            "-vn",  # Sem vídeo
+            "-acodec", "pcm_s16le",  # Formato PCM
+            "-ar", str(taxa),  # Taxa de amostragem
+            "-ac", "1",  # Mono
+            "-f", "s16le",
+            "pipe:1"
+        ]
+    
+    processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    # Ler o stderr em paralelo para o ffmpeg não bloquear com o pipe cheio
+    log = []
+    leitor_log = threading.Thread(target=lambda: log.append(processo.stderr.read()), daemon=True)
+    leitor_log.start()
+    try:
+        while True:
+            dados = processo.stdout.read(amostras_por_bloco * LARGURA_AMOSTRA)
+            if not dados:
+                break
+            
+            # Descartar um byte final incompleto (só ocorre no fim do stream)
+            dados = dados[:len(dados) - len(dados) % LARGURA_AMOSTRA]
+            yield np.frombuffer(dados, dtype=np.int16)
+        
+        processo.wait()
+        leitor_log.join()
+        texto_log = b"".join(log).decode("utf-8", errors="replace")
+        if processo.returncode != 0:
+            raise Exception(f"Erro ao extrair áudio: {texto_log.strip()[-2000:]}")
+        
+        if ao_concluir:
+            ao_concluir(texto_log)
+    
+    finally:
+        # Consumidor encerrou antes do fim: não deixar o ffmpeg órfão
+        if processo.poll() is None:
+            processo.kill()
+            processo.wait()
+        leitor_log.join()
+        processo.stdout.close()
+        processo.stderr.close()
+
+
+def blocos_wav(arquivo, amostras_por_bloco=AMOSTRAS_POR_BLOCO):
+    """
+    Lê um WAV PCM 16 bits mono em blocos, como stream_pcm.
+    
+    Yields:
+        np.ndarray: Blocos int16 mono
+    """
+    with wave.open(arquivo, "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != LARGURA_AMOSTRA:
+            raise ValueError(f"WAV deve ser PCM 16 bits mono: {arquivo}")
+        
+        while True:
+            dados = wav.readframes(amostras_por_bloco)
+            if not dados:
+                break
+            yield np.frombuffer(dados, dtype=np.int16)
+
+
+class BufferCircularPCM:
+    """Buffer circular de amostras int16 com capacidade fixa."""
+    
+    def __init__(self, capacidade):
+        """
+        Inicializa o buffer.
+        
+        Args:
+            capacidade: Número máximo de amostras armazenadas
+        """
+        self._dados = np.zeros(capacidade, dtype=np.int16)
+        self._inicio = 0
+        self.disponivel = 0
+    
+    @property
+    def capacidade(self):
+        return len(self._dados)
+    
+    @property
+    def livre(self):
+        return self.capacidade - self.disponivel
+    
+    def escrever(self, amostras):
+        """Acrescenta amostras ao fim do buffer"""
+        n = len(amostras)
+        if n > self.livre:
+            raise ValueError(f"Buffer cheio: {n} amostras para {self.livre} livres")
+        
+        fim = (self._inicio + self.disponivel) % self.capacidade
+        primeira_parte = min(n, self.capacidade - fim)
+        self._dados[fim:fim + primeira_parte] = amostras[:primeira_parte]
+        self._dados[:n - primeira_parte] = amostras[primeira_parte:]
+        self.disponivel += n
+    
+    def ler(self, n):
+        """Remove e retorna até n amostras do início do buffer"""
+        n = min(n, self.disponivel)
+        indices = (self._inicio + np.arange(n)) % self.capacidade
+        amostras = self._dados[indices]
+        self._inicio = (self._inicio + n) % self.capacidade
+        self.disponivel -= n
+        return amostras
+
+
+def segmentos_pcm(blocos, duracao_segmento=10, duracao_minima=1, taxa=TAXA_AMOSTRAGEM):
+    """
+    Reagrupa blocos PCM em segmentos de duração fixa.
+    
+    Args:
+        blocos: Iterável de blocos int16 (ex.: stream_pcm)
+        duracao_segmento: Duração de cada segmento em segundos
+        duracao_minima: Segmentos finais mais curtos que isso são descartados
+        taxa: Taxa de amostragem em Hz
+    
+    Yields:
+        SegmentoAudio: Segmentos na ordem do áudio, assim que ficam completos
+    """
+    amostras_segmento = int(duracao_segmento * taxa)
+    buffer = BufferCircularPCM(amostras_segmento + AMOSTRAS_POR_BLOCO)
+    inicio = 0.0
+    
+    for bloco in blocos:
+        while len(bloco):
+            n = min(len(bloco), buffer.livre)
+            buffer.escrever(bloco[:n])
+            bloco = bloco[n:]
+            
+            while buffer.disponivel >= amostras_segmento:
+                amostras = buffer.ler(amostras_segmento)
+                yield SegmentoAudio(inicio, inicio + duracao_segmento, amostras.tobytes(), taxa)
+                inicio += duracao_segmento
+    
+    # Resto do áudio
+    duracao = buffer.disponivel / taxa
+    if duracao >= duracao_minima:
+        yield SegmentoAudio(inicio, inicio + duracao, buffer.ler(buffer.disponivel).tobytes(), taxa)
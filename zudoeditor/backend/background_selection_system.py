@@ -26,6 +26,11 @@ logging.basicConfig(
 logger = logging.getLogger('zudo_background')
 
 try:
+    # Adicionar diretório atual ao path para importar módulos locais
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    
+    from sonda_midia import obter_sonda
+    
     import numpy as np
     from PIL import Image, ImageDraw, ImageFilter, ImageFont
     from moviepy.editor import VideoFileClip, ImageClip, ColorClip
@@ -230,10 +235,11 @@ class BackgroundManager:
             logger.error(f"Vídeo não encontrado: {video_path}")
             return None
         
-        # Verificar se é um vídeo válido
+        # Verificar se é um vídeo válido (sonda em cache, sem abrir o vídeo)
         try:
-            video = VideoFileClip(video_path)
-            video.close()
+            info = obter_sonda().info_video(video_path)
+            if not info or not info["largura"]:
+                raise Exception("nenhuma faixa de vídeo encontrada")
         except Exception as e:
             logger.error(f"Arquivo não é um vídeo válido: {e}")
             return None
@@ -529,6 +535,12 @@ class BackgroundManager:
                     logger.warning(f"Vídeo não encontrado: {background_source}. Usando cor preta.")
                     return ColorClip(size=(width, height), color="#000000", duration=duration)
                 
+                # Verificar com a sonda em cache antes de abrir o vídeo
+                info = obter_sonda().info_video(background_source)
+                if not info or not info["largura"]:
+                    logger.warning(f"Vídeo inválido: {background_source}. Usando cor preta.")
+                    return ColorClip(size=(width, height), color="#000000", duration=duration)
+                
                 # Criar clip com o vídeo
                 video_clip = VideoFileClip(background_source)
                 
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Cache de Transcrições para o ZudoEditor
+
+Este módulo evita refazer o reconhecimento de fala de uma narração já
+transcrita (vídeo gerado que volta para edição, mesmo clipe colocado de
+novo em entrada). As legendas ficam em um índice SQLite em disco, com
+remoção LRU por tamanho, indexadas por uma impressão digital do PCM
+decodificado mais o reconhecedor, o modelo, o idioma e a segmentação.
+
+A impressão usa o envelope de energia do áudio (blocos de 100 ms,
+quantizados em ~1,5 dB), e não os bytes exatos: trocar o contêiner ou
+recodificar o áudio no mesmo volume não altera a chave.
+
+Uso:
+    python cache_transcricao.py /caminho/para/audio_ou_video
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+import numpy as np
+
+import audio_pcm
+from sonda_midia import DIR_CACHE_PADRAO
+from reconhecimento_fala import TAXA_AMOSTRAGEM
+
+logger = logging.getLogger("CacheTranscricao")
+
+# Tamanho máximo do cache em disco (bytes de legendas serializadas)
+LIMITE_PADRAO = 64 * 1024 * 1024
+
+# Amostras por bloco do envelope (100 ms a 16 kHz)
+AMOSTRAS_ENVELOPE = TAXA_AMOSTRAGEM // 10
+
+# Fala (segundos) coberta pela impressão do início da narração, consultada
+# antes de decidir entre transcrever em streaming ou apenas calcular a chave
+DURACAO_PREFIXO = 30
+
+
+class ImpressaoAudio:
+    """Impressão digital incremental do envelope de energia de um PCM 16 bits mono."""
+    
+    def __init__(self):
+        self._hash = hashlib.sha1()
+        self._resto = np.zeros(0, dtype=np.int16)
+        self.blocos = 0
+    
+    def atualizar(self, amostras):
+        """
+        Acrescenta amostras (np.ndarray int16 ou bytes PCM) à impressão.
+        
+        Os blocos podem ter qualquer tamanho: o resultado depende só do áudio.
+        """
+        if isinstance(amostras, (bytes, bytearray)):
+            amostras = np.frombuffer(amostras, dtype=np.int16)
+        
+        amostras = np.concatenate([self._resto, amostras])
+        n_blocos = len(amostras) // AMOSTRAS_ENVELOPE
+        self._resto = amostras[n_blocos * AMOSTRAS_ENVELOPE:]
+        if not n_blocos:
+            return
+        
+        blocos = amostras[:n_blocos * AMOSTRAS_ENVELOPE].reshape(n_blocos, AMOSTRAS_ENVELOPE)
+        energia = np.abs(blocos.astype(np.int32)).mean(axis=1)
+        niveis = np.clip(np.round(4 * np.log2(1 + energia)), 0, 255).astype(np.uint8)
+        
+        self._hash.update(niveis.tobytes())
+        self.blocos += n_blocos
+    
+    def atualizar_segmento(self, segmento):
+        """
+        Acrescenta um SegmentoAudio: sua posição no tempo e o seu PCM.
+        
+        A VAD descarta os silêncios entre os trechos; sem os instantes, a
+        mesma fala deslocada no vídeo teria a mesma impressão (e as
+        legendas em cache viriam com os tempos antigos).
+        """
+        self._hash.update(f"{round(segmento.inicio * 1000)}-{round(segmento.fim * 1000)};".encode("ascii"))
+        self.atualizar(segmento.pcm)
+    
+    def hexdigest(self):
+        return f"{self._hash.hexdigest()}-{self.blocos}"
+
+
+def impressao_segmentos(segmentos):
+    """Impressão digital de uma sequência de SegmentoAudio, incluindo seus instantes"""
+    impressao = ImpressaoAudio()
+    for segmento in segmentos:
+        impressao.atualizar_segmento(segmento)
+    return impressao.hexdigest()
+
+
+def impressao_blocos(blocos):
+    """Impressão digital de blocos PCM (ex.: audio_pcm.stream_pcm)"""
+    impressao = ImpressaoAudio()
+    for bloco in blocos:
+        impressao.atualizar(bloco)
+    return impressao.hexdigest()
+
+
+class CacheTranscricao:
+    """Índice em disco de transcrições, com remoção LRU por tamanho."""
+    
+    def __init__(self, caminho_indice=None, limite_bytes=LIMITE_PADRAO):
+        """
+        Inicializa o cache.
+        
+        Args:
+            caminho_indice: Caminho do banco SQLite (opcional)
+            limite_bytes: Tamanho máximo das transcrições guardadas
+        """
+        self.caminho_indice = caminho_indice or os.path.join(DIR_CACHE_PADRAO, "transcricoes.db")
+        self.limite_bytes = limite_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho_indice)), exist_ok=True)
+        
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        self._local = threading.local()
+        
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transcricoes (
+                    chave TEXT PRIMARY KEY,
+                    legendas TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    ultimo_acesso REAL NOT NULL,
+                    prefixo TEXT
+                )
+                """
+            )
+            # Bancos criados antes da coluna prefixo
+            colunas = [linha[1] for linha in conexao.execute("PRAGMA table_info(transcricoes)")]
+            if "prefixo" not in colunas:
+                conexao.execute("ALTER TABLE transcricoes ADD COLUMN prefixo TEXT")
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_transcricoes_prefixo ON transcricoes (prefixo)"
+            )
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_transcricoes_acesso ON transcricoes (ultimo_acesso)"
+            )
+    
+    def _conexao(self):
+        """Retorna a conexão SQLite da thread atual"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho_indice, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+    
+    def chave(self, impressao, reconhecedor, modelo=None, idioma=None, **config):
+        """
+        Monta a chave de uma transcrição.
+        
+        Args:
+            impressao: Impressão digital do áudio
+            reconhecedor: Nome do reconhecedor
+            modelo: Modelo usado pelo reconhecedor (caminho ou nome)
+            idioma: Idioma do reconhecimento
+            **config: Demais parâmetros que alteram o resultado (ex.: segmentação)
+        """
+        partes = {
+            "impressao": impressao,
+            "reconhecedor": reconhecedor,
+            "modelo": modelo,
+            "idioma": idioma,
+            "config": config
+        }
+        return hashlib.sha1(json.dumps(partes, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    
+    def obter(self, chave):
+        """Retorna as legendas em cache, ou None"""
+        try:
+            conexao = self._conexao()
+            with conexao:
+                linha = conexao.execute(
+                    "SELECT legendas FROM transcricoes WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is None:
+                    return None
+                conexao.execute(
+                    "UPDATE transcricoes SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave)
+                )
+            logger.info("Transcrição encontrada no cache")
+            return json.loads(linha[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao consultar cache de transcrições: {str(e)}")
+            return None
+    
+    def tem_prefixo(self, prefixo):
+        """Indica se há transcrição guardada de uma narração que começa com este prefixo"""
+        try:
+            return self._conexao().execute(
+                "SELECT 1 FROM transcricoes WHERE prefixo = ? LIMIT 1", (prefixo,)
+            ).fetchone() is not None
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao consultar cache de transcrições: {str(e)}")
+            return False
+    
+    def guardar(self, chave, legendas, prefixo=None):
+        """
+        Guarda as legendas e remove as menos usadas se o limite for excedido.
+        
+        Args:
+            chave: Chave da transcrição (ver chave())
+            legendas: Legendas a guardar
+            prefixo: Chave do início da narração (ver tem_prefixo)
+        """
+        serializado = json.dumps(legendas, ensure_ascii=False)
+        try:
+            conexao = self._conexao()
+            with conexao:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO transcricoes (chave, legendas, tamanho, ultimo_acesso, prefixo) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (chave, serializado, len(serializado.encode("utf-8")), time.time(), prefixo)
+                )
+                self._podar(conexao)
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar cache de transcrições: {str(e)}")
+    
+    def _podar(self, conexao):
+        """Remove as entradas acessadas há mais tempo até caber no limite"""
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM transcricoes").fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        
+        removidas = 0
+        for chave, tamanho in conexao.execute(
+                "SELECT chave, tamanho FROM transcricoes ORDER BY ultimo_acesso").fetchall():
+            if total <= self.limite_bytes:
+                break
+            conexao.execute("DELETE FROM transcricoes WHERE chave = ?", (chave,))
+            total -= tamanho
+            removidas += 1
+        
+        logger.info(f"Cache de transcrições podado: {removidas} entrada(s) removida(s)")
+
+
+# Instância compartilhada por processo
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache():
+    """Retorna a instância compartilhada de CacheTranscricao"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheTranscricao()
+        return _cache
+
+
+def _descartar_cache():
+    """Descarta a instância herdada após fork (conexões SQLite não sobrevivem ao fork)"""
+    global _cache
+    _cache = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_descartar_cache)
+
+
+if __name__ == "__main__":
+    for arquivo in sys.argv[1:]:
+        print(f"{arquivo}: {impressao_blocos(audio_pcm.stream_pcm(arquivo))}")
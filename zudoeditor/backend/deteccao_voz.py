@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Detecção de Atividade de Voz (VAD) para o ZudoEditor
+
+Este módulo divide o PCM 16 kHz mono em trechos de fala de duração
+variável, cortando nas pausas e descartando as regiões sem voz antes do
+reconhecimento. A decisão por quadro (30 ms) combina energia e taxa de
+cruzamentos por zero, calculadas de forma vetorizada com NumPy; o limiar
+de energia se adapta ao ruído de fundo estimado no próprio áudio.
+
+Uso:
+    python deteccao_voz.py /caminho/para/video.mp4
+"""
+
+import sys
+import logging
+
+import numpy as np
+
+import audio_pcm
+from reconhecimento_fala import SegmentoAudio, TAXA_AMOSTRAGEM
+
+logger = logging.getLogger("DeteccaoVoz")
+
+# Parâmetros do detector (segundos, exceto quando indicado)
+DURACAO_QUADRO = 0.03
+MARGEM_RUIDO_DB = 10  # energia acima do ruído de fundo considerada fala
+ENERGIA_MINIMA_DB = 30  # abaixo disso é silêncio, qualquer que seja o ruído
+ZCR_FRICATIVA = 0.25  # cruzamentos por amostra de consoantes fricativas (s, f, x)
+PAUSA_MINIMA = 0.3  # pausas mais curtas não separam trechos
+FALA_MINIMA = 0.2  # trechos mais curtos são descartados
+MARGEM_TRECHO = 0.15  # folga mantida antes e depois de cada trecho
+DURACAO_MAXIMA = 10  # trechos mais longos são divididos no quadro mais silencioso
+JANELA_ANALISE = 30  # áudio acumulado antes de cada análise no modo streaming
+
+
+def caracteristicas_quadros(amostras, taxa=TAXA_AMOSTRAGEM):
+    """
+    Calcula energia (dB) e taxa de cruzamentos por zero de cada quadro.
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray, int]: energia_db, zcr e amostras por quadro
+    """
+    por_quadro = int(taxa * DURACAO_QUADRO)
+    n_quadros = len(amostras) // por_quadro
+    quadros = amostras[:n_quadros * por_quadro].reshape(n_quadros, por_quadro).astype(np.float32)
+    
+    energia_db = 10 * np.log10(np.mean(quadros ** 2, axis=1) + 1e-9)
+    sinais = np.signbit(quadros)
+    zcr = np.mean(sinais[:, 1:] != sinais[:, :-1], axis=1)
+    
+    return energia_db, zcr, por_quadro
+
+
+def detectar_fala(amostras, taxa=TAXA_AMOSTRAGEM, piso_ruido=None, duracao_maxima=DURACAO_MAXIMA):
+    """
+    Localiza os trechos de fala de um PCM.
+    
+    Args:
+        amostras: np.ndarray int16 mono
+        taxa: Taxa de amostragem em Hz
+        piso_ruido: Ruído de fundo já estimado (dB); estimado no áudio se ausente
+        duracao_maxima: Trechos mais longos são divididos
+    
+    Returns:
+        Tuple[List[Tuple[int, int]], float]: Trechos (amostra inicial, amostra final)
+            e o piso de ruído usado
+    """
+    energia_db, zcr, por_quadro = caracteristicas_quadros(amostras, taxa)
+    if not len(energia_db):
+        return [], piso_ruido
+    
+    piso = float(np.percentile(energia_db, 10))
+    if piso_ruido is not None:
+        piso = min(piso, piso_ruido)
+    
+    limiar = max(piso + MARGEM_RUIDO_DB, ENERGIA_MINIMA_DB)
+    voz = (energia_db > limiar) | ((energia_db > limiar - 6) & (zcr > ZCR_FRICATIVA))
+    
+    # Bordas dos trechos contínuos de voz
+    bordas = np.flatnonzero(np.diff(np.concatenate(([0], voz.astype(np.int8), [0]))))
+    inicios, fins = bordas[::2], bordas[1::2]
+    if not len(inicios):
+        return [], piso
+    
+    # Unir trechos separados por pausas curtas
+    quadros_pausa = int(PAUSA_MINIMA / DURACAO_QUADRO)
+    separa = inicios[1:] - fins[:-1] >= quadros_pausa
+    inicios = np.concatenate((inicios[:1], inicios[1:][separa]))
+    fins = np.concatenate((fins[:-1][separa], fins[-1:]))
+    
+    # Descartar ruídos curtos
+    longos = fins - inicios >= int(FALA_MINIMA / DURACAO_QUADRO)
+    inicios, fins = inicios[longos], fins[longos]
+    
+    # Margem em volta de cada trecho, sem ultrapassar os vizinhos
+    margem = int(MARGEM_TRECHO / DURACAO_QUADRO)
+    inicios = np.maximum(inicios - margem, np.concatenate(([0], fins[:-1])))
+    fins = np.minimum(fins + margem, np.concatenate((inicios[1:], [len(energia_db)])))
+    
+    # Dividir trechos longos no quadro mais silencioso da segunda metade
+    quadros_maximo = int(duracao_maxima / DURACAO_QUADRO)
+    trechos = []
+    for inicio, fim in zip(inicios.tolist(), fins.tolist()):
+        while fim - inicio > quadros_maximo:
+            metade = inicio + quadros_maximo // 2
+            corte = metade + int(np.argmin(energia_db[metade:inicio + quadros_maximo]))
+            trechos.append((inicio, corte))
+            inicio = corte
+        trechos.append((inicio, fim))
+    
+    return [(inicio * por_quadro, fim * por_quadro) for inicio, fim in trechos], piso
+
+
+def segmentos_fala(blocos, taxa=TAXA_AMOSTRAGEM, janela=JANELA_ANALISE, duracao_maxima=DURACAO_MAXIMA):
+    """
+    Converte blocos PCM em trechos de fala à medida que chegam.
+    
+    O áudio é analisado em janelas; o último trecho de cada janela fica
+    pendente, pois a fala pode continuar no bloco seguinte.
+    
+    Args:
+        blocos: Iterável de blocos int16 (ex.: audio_pcm.stream_pcm)
+        taxa: Taxa de amostragem em Hz
+        janela: Segundos acumulados antes de cada análise
+        duracao_maxima: Duração máxima de cada trecho
+    
+    Yields:
+        SegmentoAudio: Trechos de fala na ordem do áudio
+    """
+    pendentes = []
+    n_pendentes = 0
+    deslocamento = 0  # amostra absoluta do início do buffer
+    piso = None
+    
+    def emitir(amostras, trechos):
+        for inicio, fim in trechos:
+            yield SegmentoAudio(
+                (deslocamento + inicio) / taxa,
+                (deslocamento + fim) / taxa,
+                amostras[inicio:fim].tobytes(),
+                taxa
+            )
+    
+    for bloco in blocos:
+        pendentes.append(bloco)
+        n_pendentes += len(bloco)
+        if n_pendentes < janela * taxa:
+            continue
+        
+        amostras = np.concatenate(pendentes)
+        trechos, piso = detectar_fala(amostras, taxa, piso, duracao_maxima)
+        
+        # Manter o último trecho (e o que vem depois dele) para a próxima janela
+        manter = trechos[-1][0] if trechos else max(0, len(amostras) - int(PAUSA_MINIMA * taxa))
+        yield from emitir(amostras, trechos[:-1])
+        
+        pendentes = [amostras[manter:]]
+        n_pendentes = len(amostras) - manter
+        deslocamento += manter
+    
+    if n_pendentes:
+        amostras = np.concatenate(pendentes)
+        trechos, _ = detectar_fala(amostras, taxa, piso, duracao_maxima)
+        yield from emitir(amostras, trechos)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    total = 0.0
+    for segmento in segmentos_fala(audio_pcm.stream_pcm(sys.argv[1])):
+        total += segmento.fim - segmento.inicio
+        print(f"{segmento.inicio:8.2f} - {segmento.fim:8.2f}")
+    print(f"Fala: {total:.1f}s")
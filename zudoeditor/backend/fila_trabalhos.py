@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Fila Durável de Trabalhos para o Monitor de Pasta do ZudoEditor
+
+A fila de vídeos a processar fica em um banco SQLite (WAL), e não em
+memória: reiniciar ou derrubar o monitor não perde os trabalhos pendentes.
+Cada trabalho tem estado, prioridade, tentativas e datas. Um trabalho em
+processamento pertence a um dono por um prazo (lease) renovado
+periodicamente (heartbeat); prazos vencidos devolvem o trabalho à fila, até
+o limite de tentativas.
+
+O pid do processador de cada trabalho também fica no banco: se o monitor
+cair com processadores ainda rodando, o monitor reiniciado os adota em vez
+de devolver os trabalhos à fila (o que poria um segundo processador na
+mesma pasta).
+
+Os trabalhos são reivindicados em transação (BEGIN IMMEDIATE), e todas as
+consultas usam índices parciais por estado: a fila comporta dezenas de
+milhares de itens sem varreduras completas. O metadados.json de cada vídeo
+passa a ser uma projeção deste estado (ver monitor_pasta).
+
+Uso:
+    python fila_trabalhos.py /caminho/para/fila.db
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("FilaTrabalhos")
+
+# Estados de um trabalho
+ESTADO_NA_FILA = "na_fila"
+ESTADO_PROCESSANDO = "processando"
+ESTADO_CONCLUIDO = "concluido"
+ESTADO_ERRO = "erro"
+
+# Prazo de posse de um trabalho sem heartbeat (segundos)
+DURACAO_LEASE = 120.0
+
+# Tentativas de processamento antes de marcar o trabalho com erro
+MAX_TENTATIVAS = 3
+
+# Valor de ordenação dos vídeos sem duração conhecida (vão para o fim)
+DURACAO_DESCONHECIDA = 1e12
+
+
+def identificador_dono():
+    """Dono dos trabalhos reivindicados por este processo (host:pid)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def identificador_processo(pid):
+    """
+    Identificador de um processador (host:pid:início).
+    
+    O início do processo distingue o processador de outro processo que
+    tenha recebido o mesmo pid depois de uma queda ou reinício da máquina.
+    """
+    inicio = _inicio_processo(pid)
+    if inicio is None:
+        return f"{socket.gethostname()}:{pid}"
+    return f"{socket.gethostname()}:{pid}:{inicio}"
+
+
+def _inicio_processo(pid):
+    """Início do processo em ticks desde o boot (campo 22 de /proc/<pid>/stat), ou None"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            estado = f.read()
+    except OSError:
+        return None
+    # O nome (campo 2) vem entre parênteses e pode conter espaços
+    return int(estado.rpartition(b")")[2].split()[19])
+
+
+def _local(identificador):
+    """(pid, início ou None) de um identificador desta máquina, ou None"""
+    partes = (identificador or "").split(":")
+    if len(partes) not in (2, 3) or partes[0] != socket.gethostname() or not all(p.isdigit() for p in partes[1:]):
+        return None
+    return int(partes[1]), int(partes[2]) if len(partes) == 3 else None
+
+
+def _pid_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _dono_vivo(dono):
+    """Falso apenas se o dono for um processo desta máquina que já terminou"""
+    local = _local(dono)
+    return local is None or _pid_vivo(local[0])
+
+
+def processo_vivo(processo):
+    """
+    Verdadeiro apenas se o processador for um processo desta máquina ainda em
+    execução (pid vivo e, se registrado, com o mesmo início: pid reutilizado
+    conta como encerrado)
+    """
+    local = _local(processo)
+    if local is None or not _pid_vivo(local[0]):
+        return False
+    pid, inicio = local
+    return inicio is None or _inicio_processo(pid) == inicio
+
+
+class FilaTrabalhos:
+    """Fila de trabalhos persistente com reivindicação transacional e leases."""
+    
+    def __init__(self, caminho_banco, duracao_lease=DURACAO_LEASE, max_tentativas=MAX_TENTATIVAS):
+        """
+        Inicializa a fila.
+        
+        Args:
+            caminho_banco: Caminho do banco SQLite
+            duracao_lease: Prazo de posse sem heartbeat (segundos)
+            max_tentativas: Tentativas antes de marcar o trabalho com erro
+        """
+        self.caminho_banco = caminho_banco
+        self.duracao_lease = duracao_lease
+        self.max_tentativas = max_tentativas
+        os.makedirs(os.path.dirname(os.path.abspath(caminho_banco)), exist_ok=True)
+        
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        self._local = threading.local()
+        
+        with self._transacao() as conexao:
+            conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trabalhos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pasta_video TEXT NOT NULL UNIQUE,
+                    arquivo TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    prioridade REAL NOT NULL,
+                    duracao REAL,
+                    ordem_prioridade REAL NOT NULL,
+                    ordem_duracao REAL NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    dono TEXT,
+                    lease_ate REAL,
+                    heartbeat REAL,
+                    criado_em REAL NOT NULL,
+                    iniciado_em REAL,
+                    finalizado_em REAL,
+                    mensagem_erro TEXT,
+                    processo TEXT
+                )
+                """
+            )
+            # Bancos criados antes da coluna processo
+            colunas = [linha[1] for linha in conexao.execute("PRAGMA table_info(trabalhos)")]
+            if "processo" not in colunas:
+                conexao.execute("ALTER TABLE trabalhos ADD COLUMN processo TEXT")
+            # Ordem da fila: maior prioridade, vídeo mais curto, ordem de chegada
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trabalhos_fila ON trabalhos "
+                "(ordem_prioridade, ordem_duracao, id) WHERE estado = 'na_fila'"
+            )
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trabalhos_lease ON trabalhos (lease_ate) "
+                "WHERE estado = 'processando'"
+            )
+    
+    def _conexao(self):
+        """Retorna a conexão SQLite da thread atual"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            # Transações controladas explicitamente (ver _transacao)
+            conexao = sqlite3.connect(self.caminho_banco, timeout=30, isolation_level=None)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+    
+    @contextmanager
+    def _transacao(self):
+        """Transação que reserva a escrita desde o início (BEGIN IMMEDIATE)"""
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexao
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        conexao.execute("COMMIT")
+    
+    def enfileirar(self, pasta_video, arquivo, prioridade=0, duracao=None):
+        """
+        Adiciona um trabalho à fila.
+        
+        Returns:
+            Dict: Trabalho criado
+        """
+        agora = time.time()
+        with self._transacao() as conexao:
+            cursor = conexao.execute(
+                "INSERT INTO trabalhos (pasta_video, arquivo, estado, prioridade, duracao, ordem_prioridade, "
+                "ordem_duracao, criado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (pasta_video, arquivo, ESTADO_NA_FILA, prioridade, duracao, -prioridade,
+                 duracao if duracao is not None else DURACAO_DESCONHECIDA, agora)
+            )
+            return self._obter(conexao, cursor.lastrowid)
+    
+    def _obter(self, conexao, id_trabalho):
+        linha = conexao.execute("SELECT * FROM trabalhos WHERE id = ?", (id_trabalho,)).fetchone()
+        return dict(linha) if linha is not None else None
+    
+    def obter(self, id_trabalho):
+        """Retorna um trabalho pelo id, ou None"""
+        return self._obter(self._conexao(), id_trabalho)
+    
+    def reivindicar(self, dono):
+        """
+        Reivindica o primeiro trabalho da fila para um dono.
+        
+        Returns:
+            Dict: Trabalho reivindicado (já em processamento), ou None se a fila estiver vazia
+        """
+        agora = time.time()
+        with self._transacao() as conexao:
+            linha = conexao.execute(
+                "SELECT id FROM trabalhos WHERE estado = 'na_fila' "
+                "ORDER BY ordem_prioridade, ordem_duracao, id LIMIT 1"
+            ).fetchone()
+            if linha is None:
+                return None
+            conexao.execute(
+                "UPDATE trabalhos SET estado = ?, dono = ?, lease_ate = ?, heartbeat = ?, iniciado_em = ?, "
+                "processo = NULL, tentativas = tentativas + 1 WHERE id = ?",
+                (ESTADO_PROCESSANDO, dono, agora + self.duracao_lease, agora, agora, linha["id"])
+            )
+            return self._obter(conexao, linha["id"])
+    
+    def registrar_processo(self, id_trabalho, dono, pid):
+        """Guarda o pid do processador iniciado para um trabalho do dono"""
+        with self._transacao() as conexao:
+            conexao.execute(
+                "UPDATE trabalhos SET processo = ? WHERE id = ? AND dono = ? AND estado = 'processando'",
+                (identificador_processo(pid), id_trabalho, dono)
+            )
+    
+    def renovar(self, ids, dono):
+        """Heartbeat: estende o lease dos trabalhos ainda em posse do dono"""
+        if not ids:
+            return
+        agora = time.time()
+        with self._transacao() as conexao:
+            conexao.executemany(
+                "UPDATE trabalhos SET lease_ate = ?, heartbeat = ? "
+                "WHERE id = ? AND dono = ? AND estado = 'processando'",
+                [(agora + self.duracao_lease, agora, id_trabalho, dono) for id_trabalho in ids]
+            )
+    
+    def concluir(self, id_trabalho, dono):
+        """Marca um trabalho do dono como concluído"""
+        with self._transacao() as conexao:
+            conexao.execute(
+                "UPDATE trabalhos SET estado = ?, dono = NULL, lease_ate = NULL, processo = NULL, finalizado_em = ?, "
+                "mensagem_erro = NULL WHERE id = ? AND dono = ?",
+                (ESTADO_CONCLUIDO, time.time(), id_trabalho, dono)
+            )
+            return self._obter(conexao, id_trabalho)
+    
+    def falhar(self, id_trabalho, dono, mensagem):
+        """
+        Registra a falha de um trabalho do dono.
+        
+        Returns:
+            Dict: Trabalho atualizado: de volta à fila se ainda houver
+                tentativas, ou com erro
+        """
+        with self._transacao() as conexao:
+            self._falhar(conexao, id_trabalho, mensagem, "dono = ?", (dono,))
+            return self._obter(conexao, id_trabalho)
+    
+    def _falhar(self, conexao, id_trabalho, mensagem, condicao, parametros):
+        conexao.execute(
+            "UPDATE trabalhos SET "
+            "estado = CASE WHEN tentativas < ? THEN 'na_fila' ELSE 'erro' END, "
+            "finalizado_em = CASE WHEN tentativas < ? THEN NULL ELSE ? END, "
+            f"dono = NULL, lease_ate = NULL, processo = NULL, mensagem_erro = ? WHERE id = ? AND {condicao}",
+            (self.max_tentativas, self.max_tentativas, time.time(), mensagem, id_trabalho) + tuple(parametros)
+        )
+    
+    def recuperar(self, incluir_orfaos=False):
+        """
+        Devolve à fila (ou marca com erro) os trabalhos abandonados.
+        
+        Trabalhos cujo processador ainda roda nesta máquina não são
+        abandonados: ficam para adotar().
+        
+        Args:
+            incluir_orfaos: Verificar também os trabalhos de donos desta
+                máquina que já terminaram, sem esperar o lease vencer (ex.: ao
+                reiniciar o monitor)
+        
+        Returns:
+            List[Dict]: Trabalhos recuperados, já atualizados
+        """
+        agora = time.time()
+        with self._transacao() as conexao:
+            if incluir_orfaos:
+                linhas = conexao.execute(
+                    "SELECT id, dono, lease_ate, processo FROM trabalhos WHERE estado = 'processando'"
+                ).fetchall()
+            else:
+                linhas = conexao.execute(
+                    "SELECT id, dono, lease_ate, processo FROM trabalhos "
+                    "WHERE estado = 'processando' AND lease_ate < ?",
+                    (agora,)
+                ).fetchall()
+            
+            recuperados = []
+            for linha in linhas:
+                if processo_vivo(linha["processo"]):
+                    continue
+                if linha["lease_ate"] < agora:
+                    motivo = "lease vencido"
+                elif not _dono_vivo(linha["dono"]):
+                    motivo = f"dono {linha['dono']} encerrado"
+                else:
+                    continue
+                self._falhar(conexao, linha["id"], f"Trabalho abandonado ({motivo})", "dono IS ?", (linha["dono"],))
+                recuperados.append(self._obter(conexao, linha["id"]))
+        
+        for trabalho in recuperados:
+            logger.warning(f"Trabalho {trabalho['id']} recuperado: {trabalho['mensagem_erro']} -> {trabalho['estado']}")
+        return recuperados
+    
+    def adotar(self, dono):
+        """
+        Passa ao dono os trabalhos de donos encerrados cujo processador ainda
+        roda nesta máquina (ex.: o monitor caiu e foi reiniciado).
+        
+        Returns:
+            List[Dict]: Trabalhos adotados, já com o novo dono
+        """
+        agora = time.time()
+        adotados = []
+        with self._transacao() as conexao:
+            linhas = conexao.execute(
+                "SELECT id, dono, processo FROM trabalhos WHERE estado = 'processando' AND processo IS NOT NULL"
+            ).fetchall()
+            for linha in linhas:
+                if linha["dono"] == dono or _dono_vivo(linha["dono"]) or not processo_vivo(linha["processo"]):
+                    continue
+                conexao.execute(
+                    "UPDATE trabalhos SET dono = ?, lease_ate = ?, heartbeat = ? WHERE id = ? AND dono IS ?",
+                    (dono, agora + self.duracao_lease, agora, linha["id"], linha["dono"])
+                )
+                adotados.append(self._obter(conexao, linha["id"]))
+        
+        for trabalho in adotados:
+            logger.warning(f"Trabalho {trabalho['id']} adotado: processador {trabalho['processo']} ainda em execução")
+        return adotados
+    
+    def definir_prioridade(self, id_trabalho, prioridade):
+        """Altera a prioridade de um trabalho ainda na fila"""
+        with self._transacao() as conexao:
+            conexao.execute(
+                "UPDATE trabalhos SET prioridade = ?, ordem_prioridade = ? WHERE id = ? AND estado = 'na_fila'",
+                (prioridade, -prioridade, id_trabalho)
+            )
+    
+    def primeiros(self, limite):
+        """Os próximos trabalhos da fila, em ordem"""
+        return [dict(linha) for linha in self._conexao().execute(
+            "SELECT * FROM trabalhos WHERE estado = 'na_fila' "
+            "ORDER BY ordem_prioridade, ordem_duracao, id LIMIT ?",
+            (limite,)
+        )]
+    
+    def posicao(self, trabalho):
+        """Posição (a partir de 1) de um trabalho na fila, contando só os que estão à frente"""
+        return 1 + self._conexao().execute(
+            "SELECT COUNT(*) FROM trabalhos WHERE estado = 'na_fila' "
+            "AND (ordem_prioridade, ordem_duracao, id) < (?, ?, ?)",
+            (trabalho["ordem_prioridade"], trabalho["ordem_duracao"], trabalho["id"])
+        ).fetchone()[0]
+    
+    def contar(self, estado=ESTADO_NA_FILA):
+        """Número de trabalhos na fila ou em processamento (contados pelos índices parciais)"""
+        if estado not in (ESTADO_NA_FILA, ESTADO_PROCESSANDO):
+            raise ValueError(f"Estado sem índice para contagem: {estado}")
+        # O estado precisa ser literal para o SQLite usar o índice parcial
+        return self._conexao().execute(
+            f"SELECT COUNT(*) FROM trabalhos WHERE estado = '{estado}'"
+        ).fetchone()[0]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    fila = FilaTrabalhos(sys.argv[1])
+    for estado in (ESTADO_NA_FILA, ESTADO_PROCESSANDO):
+        print(f"{estado}: {fila.contar(estado)}")
+    for trabalho in fila.primeiros(10):
+        print(f"{trabalho['id']:6d}  {trabalho['prioridade']:5g}  {trabalho['arquivo']}")
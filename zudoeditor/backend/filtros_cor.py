@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Filtros de Cor por Tabela de Consulta para o ZudoEditor
+
+Este módulo compila uma cadeia de operações de cor (brilho, contraste,
+gama, saturação, curvas e LUTs 3D .cube) em tabelas pré-calculadas, em vez
+de refazer a conta em ponto flutuante para cada pixel de cada quadro:
+- operações por canal (brilho, contraste, gama, curvas) viram uma tabela
+  de 256 entradas por canal, exata;
+- a partir da primeira operação que mistura canais (saturação, .cube), o
+  restante da cadeia vira uma tabela 3D indexada pelos bits mais
+  significativos de R, G e B.
+
+As tabelas são aplicadas no próprio quadro uint8 com NumPy. A mesma cadeia
+pode ser exportada como .cube para os filtros lut1d/lut3d do ffmpeg.
+
+Uso:
+    python filtros_cor.py /caminho/para/imagem.jpg /caminho/para/saida.jpg [lut.cube]
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger("FiltrosCor")
+
+# Bits por canal do índice da tabela 3D (7 bits = 128³ entradas, ~6 MB)
+BITS_3D = 7
+
+# Pontos por eixo do .cube exportado para o lut3d do ffmpeg
+TAMANHO_CUBE = 33
+
+# Pesos de luminância (BT.601) usados na saturação
+PESOS_LUMA = np.array([0.299, 0.587, 0.114])
+
+# Operações que tratam cada canal isoladamente
+OPERACOES_POR_CANAL = {"brilho", "contraste", "gama", "curva", "lut_1d"}
+
+# Tabelas já lidas de arquivos .cube: (caminho, mtime, tamanho) -> (tipo, tabela)
+_cache_cube = {}
+
+
+def ler_cube(caminho):
+    """
+    Lê um arquivo .cube (formato Adobe/Resolve).
+    
+    Returns:
+        Tuple[str, np.ndarray]: "lut_1d" e tabela (N, 3), ou "lut_3d" e tabela
+            (N, N, N, 3) indexada por [b, g, r], com valores normalizados 0-1
+    """
+    estado = os.stat(caminho)
+    chave = (os.path.abspath(caminho), estado.st_mtime_ns, estado.st_size)
+    if chave in _cache_cube:
+        return _cache_cube[chave]
+    
+    tamanho_1d = tamanho_3d = None
+    minimo, maximo = np.zeros(3), np.ones(3)
+    valores = []
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            partes = linha.split("#", 1)[0].split()
+            if not partes or partes[0] == "TITLE":
+                continue
+            if partes[0] == "LUT_1D_SIZE":
+                tamanho_1d = int(partes[1])
+            elif partes[0] == "LUT_3D_SIZE":
+                tamanho_3d = int(partes[1])
+            elif partes[0] == "DOMAIN_MIN":
+                minimo = np.array([float(v) for v in partes[1:4]])
+            elif partes[0] == "DOMAIN_MAX":
+                maximo = np.array([float(v) for v in partes[1:4]])
+            elif partes[0][0].isdigit() or partes[0][0] in "-.":
+                valores.append([float(v) for v in partes[:3]])
+    
+    tabela = np.array(valores, dtype=np.float64)
+    if tamanho_3d:
+        if len(tabela) != tamanho_3d ** 3:
+            raise ValueError(f"{caminho}: esperados {tamanho_3d ** 3} valores, encontrados {len(tabela)}")
+        resultado = ("lut_3d", tabela.reshape(tamanho_3d, tamanho_3d, tamanho_3d, 3), minimo, maximo)
+    elif tamanho_1d:
+        if len(tabela) != tamanho_1d:
+            raise ValueError(f"{caminho}: esperados {tamanho_1d} valores, encontrados {len(tabela)}")
+        resultado = ("lut_1d", tabela, minimo, maximo)
+    else:
+        raise ValueError(f"{caminho}: LUT_1D_SIZE ou LUT_3D_SIZE ausente")
+    
+    _cache_cube[chave] = resultado
+    return resultado
+
+
+def _interpolar_3d(tabela, pontos):
+    """Interpolação trilinear de uma tabela (N, N, N, 3) [b, g, r] em pontos 0-1"""
+    n = tabela.shape[0]
+    posicao = np.clip(pontos, 0, 1) * (n - 1)
+    base = np.minimum(posicao.astype(np.int64), n - 2)
+    fracao = posicao - base
+    
+    r, g, b = base[..., 0], base[..., 1], base[..., 2]
+    fr, fg, fb = fracao[..., 0:1], fracao[..., 1:2], fracao[..., 2:3]
+    
+    resultado = 0
+    for db, pb in ((0, 1 - fb), (1, fb)):
+        for dg, pg in ((0, 1 - fg), (1, fg)):
+            for dr, pr in ((0, 1 - fr), (1, fr)):
+                resultado = resultado + tabela[b + db, g + dg, r + dr] * (pb * pg * pr)
+    return resultado
+
+
+def _avaliar(operacao, valores):
+    """
+    Avalia uma operação em valores float (..., 3) na escala 0-255.
+    
+    Os valores não são limitados aqui; CadeiaCor.avaliar limita (e
+    arredonda) no fim das operações por canal iniciais, onde a tabela 1D
+    compilada termina, e no resultado final.
+    """
+    nome, parametros = operacao
+    if nome == "brilho":
+        return valores + parametros["delta"]
+    if nome == "contraste":
+        return (valores - parametros["centro"]) * parametros["fator"] + parametros["centro"]
+    if nome == "gama":
+        return 255 * (np.clip(valores, 0, 255) / 255) ** (1 / parametros["gama"])
+    if nome == "saturacao":
+        luma = (valores @ PESOS_LUMA)[..., None]
+        return luma + (valores - luma) * parametros["fator"]
+    if nome == "curva":
+        entradas, saidas = zip(*parametros["pontos"])
+        resultado = valores.copy()
+        for canal in parametros["canais"]:
+            indice = "rgb".index(canal)
+            resultado[..., indice] = np.interp(valores[..., indice], entradas, saidas)
+        return resultado
+    if nome in ("lut_1d", "lut_3d"):
+        _, tabela, minimo, maximo = ler_cube(parametros["arquivo"])
+        normalizados = (valores / 255 - minimo) / (maximo - minimo)
+        if nome == "lut_3d":
+            return _interpolar_3d(tabela, normalizados) * 255
+        eixo = np.linspace(0, 1, len(tabela))
+        resultado = np.empty_like(valores, dtype=np.float64)
+        for indice in range(3):
+            resultado[..., indice] = np.interp(normalizados[..., indice], eixo, tabela[:, indice]) * 255
+        return resultado
+    raise ValueError(f"Operação de cor desconhecida: {nome}")
+
+
+def _para_uint8(valores):
+    return np.clip(np.round(valores), 0, 255).astype(np.uint8)
+
+
+class TabelaCor:
+    """Cadeia de cor compilada, aplicável a quadros RGB uint8."""
+    
+    def __init__(self, tabela_1d=None, tabela_3d=None, bits=BITS_3D):
+        """
+        Args:
+            tabela_1d: np.ndarray uint8 (3, 256), ou None se for a identidade
+            tabela_3d: np.ndarray uint8 (2^(3*bits), 3), ou None
+            bits: Bits por canal do índice da tabela 3D
+        """
+        self.tabela_1d = tabela_1d
+        self.tabela_3d = tabela_3d
+        self.bits = bits
+        # Mesma tabela nos três canais: uma única consulta sobre o quadro inteiro
+        self._canais_iguais = tabela_1d is not None and (tabela_1d == tabela_1d[0]).all()
+    
+    @property
+    def identidade(self):
+        return self.tabela_1d is None and self.tabela_3d is None
+    
+    def aplicar(self, quadro):
+        """
+        Aplica as tabelas ao quadro (H, W, 3) uint8.
+        
+        O quadro é alterado no lugar quando é gravável (quadros do leitor do
+        MoviePy são somente leitura e são copiados uma vez).
+        
+        Returns:
+            np.ndarray: Quadro com as cores ajustadas
+        """
+        if self.identidade:
+            return quadro
+        
+        if not quadro.flags.writeable or quadro.dtype != np.uint8:
+            quadro = np.array(quadro, dtype=np.uint8)
+        
+        if self.tabela_1d is not None:
+            if self._canais_iguais and quadro.shape[-1] == 3:
+                np.take(self.tabela_1d[0], quadro, out=quadro, mode="clip")
+            else:
+                for canal in range(3):
+                    quadro[..., canal] = self.tabela_1d[canal][quadro[..., canal]]
+        
+        if self.tabela_3d is not None:
+            deslocamento = 8 - self.bits
+            indice = (quadro[..., 0] >> deslocamento).astype(np.int32) << (2 * self.bits)
+            indice |= (quadro[..., 1] >> deslocamento).astype(np.int32) << self.bits
+            indice |= quadro[..., 2] >> deslocamento
+            np.take(self.tabela_3d, indice, axis=0, out=quadro[..., :3], mode="clip")
+        
+        return quadro
+    
+    __call__ = aplicar
+
+
+class CadeiaCor:
+    """Cadeia de operações de cor, compilada sob demanda em tabelas de consulta."""
+    
+    def __init__(self, bits_3d=BITS_3D):
+        """
+        Inicializa uma cadeia vazia.
+        
+        Args:
+            bits_3d: Bits por canal do índice da tabela 3D
+        """
+        self.operacoes = []
+        self.bits_3d = bits_3d
+        self._tabela = None
+    
+    def __getstate__(self):
+        # A tabela compilada é refeita no processo de destino (ProcessPoolExecutor)
+        estado = dict(self.__dict__)
+        estado["_tabela"] = None
+        return estado
+    
+    def _adicionar(self, nome, **parametros):
+        self.operacoes.append((nome, parametros))
+        self._tabela = None
+        return self
+    
+    def brilho(self, delta):
+        """Soma delta (escala 0-255) aos três canais"""
+        return self._adicionar("brilho", delta=delta)
+    
+    def contraste(self, fator, centro=128):
+        """Afasta (fator > 1) ou aproxima os valores do centro"""
+        return self._adicionar("contraste", fator=fator, centro=centro)
+    
+    def gama(self, gama):
+        """Correção de gama (gama > 1 clareia os tons médios)"""
+        return self._adicionar("gama", gama=gama)
+    
+    def saturacao(self, fator):
+        """Multiplica a distância de cada pixel ao seu tom de cinza"""
+        return self._adicionar("saturacao", fator=fator)
+    
+    def curva(self, pontos, canais="rgb"):
+        """
+        Curva de tons por interpolação linear.
+        
+        Args:
+            pontos: Pares (entrada, saída) na escala 0-255, em ordem crescente
+            canais: Canais afetados ("rgb", "r", "gb"...)
+        """
+        return self._adicionar("curva", pontos=[tuple(p) for p in pontos], canais=canais)
+    
+    def lut_cube(self, arquivo):
+        """Aplica uma LUT .cube (1D ou 3D)"""
+        tipo = ler_cube(arquivo)[0]
+        return self._adicionar(tipo, arquivo=os.path.abspath(arquivo))
+    
+    @property
+    def vazia(self):
+        return not self.operacoes
+    
+    @property
+    def por_canal(self):
+        """Se todas as operações tratam os canais isoladamente"""
+        return all(nome in OPERACOES_POR_CANAL for nome, _ in self.operacoes)
+    
+    def descricao(self):
+        """Descrição serializável da cadeia (inclui o conteúdo das LUTs)"""
+        descricao = []
+        for nome, parametros in self.operacoes:
+            parametros = dict(parametros)
+            if "arquivo" in parametros:
+                with open(parametros["arquivo"], "rb") as f:
+                    parametros["arquivo"] = hashlib.sha1(f.read()).hexdigest()
+            descricao.append([nome, parametros])
+        return descricao
+    
+    def _corte(self):
+        """Quantidade de operações por canal no início da cadeia (parte da tabela 1D)"""
+        corte = 0
+        while corte < len(self.operacoes) and self.operacoes[corte][0] in OPERACOES_POR_CANAL:
+            corte += 1
+        return corte
+    
+    def avaliar(self, valores):
+        """
+        Avalia a cadeia inteira em valores float (..., 3) 0-255, sem tabelas.
+        
+        Entre as operações por canal iniciais e o restante da cadeia os valores
+        passam a uint8, como na saída da tabela 1D de compilar(); assim a
+        avaliação direta, o .cube exportado e as tabelas dão o mesmo resultado.
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        corte = self._corte()
+        for indice, operacao in enumerate(self.operacoes):
+            if indice == corte and corte:
+                valores = _para_uint8(valores).astype(np.float64)
+            valores = _avaliar(operacao, valores)
+        return valores
+    
+    def compilar(self):
+        """
+        Compila a cadeia em tabelas de consulta (resultado guardado).
+        
+        Returns:
+            TabelaCor: Tabelas prontas para aplicar
+        """
+        if self._tabela is not None:
+            return self._tabela
+        
+        # Operações por canal no início da cadeia: tabela 1D exata
+        corte = self._corte()
+        
+        tabela_1d = None
+        if corte:
+            valores = np.repeat(np.arange(256, dtype=np.float64)[:, None], 3, axis=1)
+            for operacao in self.operacoes[:corte]:
+                valores = _avaliar(operacao, valores)
+            tabela_1d = np.ascontiguousarray(_para_uint8(valores).T)
+            if (tabela_1d == np.arange(256, dtype=np.uint8)).all():
+                tabela_1d = None
+        
+        # Restante da cadeia: tabela 3D amostrada no centro de cada célula
+        tabela_3d = None
+        if corte < len(self.operacoes):
+            passo = 1 << (8 - self.bits_3d)
+            eixo = np.arange(0, 256, passo, dtype=np.float64) + (passo - 1) / 2
+            r, g, b = np.meshgrid(eixo, eixo, eixo, indexing="ij")
+            valores = np.stack((r.ravel(), g.ravel(), b.ravel()), axis=1)
+            for operacao in self.operacoes[corte:]:
+                valores = _avaliar(operacao, valores)
+            tabela_3d = _para_uint8(valores)
+        
+        self._tabela = TabelaCor(tabela_1d, tabela_3d, self.bits_3d)
+        return self._tabela
+    
+    def aplicar(self, quadro):
+        """Aplica a cadeia a um quadro RGB uint8 (ver TabelaCor.aplicar)"""
+        return self.compilar().aplicar(quadro)
+    
+    def exportar_cube(self, caminho, tamanho=TAMANHO_CUBE):
+        """
+        Exporta a cadeia como .cube para os filtros lut1d/lut3d do ffmpeg.
+        
+        Cadeias só com operações por canal viram uma LUT 1D de 256 pontos
+        (exata); as demais, uma LUT 3D com tamanho pontos por eixo.
+        
+        Returns:
+            str: Nome do filtro do ffmpeg que lê o arquivo ("lut1d" ou "lut3d")
+        """
+        if self.por_canal:
+            eixo = np.arange(256, dtype=np.float64)
+            valores = self.avaliar(np.repeat(eixo[:, None], 3, axis=1))
+            cabecalho, filtro = "LUT_1D_SIZE 256", "lut1d"
+        else:
+            eixo = np.linspace(0, 255, tamanho)
+            # No .cube o vermelho varia mais rápido
+            b, g, r = np.meshgrid(eixo, eixo, eixo, indexing="ij")
+            valores = self.avaliar(np.stack((r.ravel(), g.ravel(), b.ravel()), axis=1))
+            cabecalho, filtro = f"LUT_3D_SIZE {tamanho}", "lut3d"
+        
+        valores = np.clip(valores, 0, 255) / 255
+        # Temporário exclusivo: renderizações em paralelo podem exportar a mesma LUT
+        descritor, temporario = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(caminho)), prefix=".cor.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(descritor, "w", encoding="utf-8") as f:
+                f.write("TITLE \"ZudoEditor\"\n")
+                f.write(cabecalho + "\n")
+                for r, g, b in valores:
+                    f.write(f"{r:.6f} {g:.6f} {b:.6f}\n")
+            os.replace(temporario, caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        return filtro
+    
+    def exportar_ffmpeg(self, pasta):
+        """
+        Exporta a cadeia para uma pasta (reaproveitando exportações anteriores).
+        
+        Returns:
+            Tuple[str, str]: Filtro do ffmpeg e arquivo .cube, ou None se a cadeia for vazia
+        """
+        if self.vazia:
+            return None
+        
+        assinatura = hashlib.sha1(json.dumps(self.descricao(), sort_keys=True).encode("utf-8")).hexdigest()
+        caminho = os.path.join(pasta, f"cor_{assinatura[:16]}.cube")
+        filtro = "lut1d" if self.por_canal else "lut3d"
+        if not os.path.exists(caminho):
+            os.makedirs(pasta, exist_ok=True)
+            filtro = self.exportar_cube(caminho)
+        return filtro, caminho
+
+
+def cadeia_padrao():
+    """Ajuste padrão das plataformas: contraste 1,2 e brilho +10"""
+    return CadeiaCor().contraste(1.2).brilho(10)
+
+
+if __name__ == "__main__":
+    import cv2
+    
+    logging.basicConfig(level=logging.INFO)
+    cadeia = cadeia_padrao()
+    if len(sys.argv) > 3:
+        cadeia.lut_cube(sys.argv[3])
+    
+    imagem = cv2.cvtColor(cv2.imread(sys.argv[1]), cv2.COLOR_BGR2RGB)
+    cv2.imwrite(sys.argv[2], cv2.cvtColor(cadeia.aplicar(imagem), cv2.COLOR_RGB2BGR))
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Índice de Duplicatas dos Vídeos Recebidos pelo ZudoEditor
+
+O monitor de pasta processaria de novo um vídeo colocado outra vez na
+entrada, renomeado ou reencontrado na varredura inicial. Este módulo
+guarda, em um índice SQLite em disco, a impressão de cada vídeo ingerido
+(tamanho, hash parcial e hash completo) e a pasta do job que o processou.
+
+O hash parcial (tamanho mais três blocos do arquivo) é lido a cada
+chegada; o hash completo só é calculado quando o parcial coincide com o de
+um vídeo já indexado, ou de graça durante a ingestão por cópia (ver
+monitor_pasta.ingerir), que já lê o arquivo inteiro.
+
+Cópias idênticas que chegam juntas são serializadas por impressão (ver
+IndiceDuplicatas.travar): a segunda só é procurada depois que a primeira
+foi registrada.
+
+Uso:
+    python indice_duplicatas.py /caminho/para/video.mp4
+"""
+
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from sonda_midia import DIR_CACHE_PADRAO
+
+logger = logging.getLogger("IndiceDuplicatas")
+
+# Bytes lidos de cada bloco do hash parcial (início, meio e fim do arquivo)
+BLOCO_PARCIAL = 1024 * 1024
+
+# Bytes por leitura no hash completo
+TAMANHO_LEITURA = 8 * 1024 * 1024
+
+
+def hash_parcial(caminho, tamanho=None):
+    """Hash do tamanho e dos blocos do início, do meio e do fim do arquivo"""
+    tamanho = os.path.getsize(caminho) if tamanho is None else tamanho
+    resumo = hashlib.sha1(str(tamanho).encode("ascii"))
+    with open(caminho, "rb") as f:
+        for posicao in sorted({0, max(0, tamanho // 2 - BLOCO_PARCIAL // 2), max(0, tamanho - BLOCO_PARCIAL)}):
+            f.seek(posicao)
+            resumo.update(f.read(BLOCO_PARCIAL))
+    return resumo.hexdigest()
+
+
+def novo_resumo():
+    """Resumo usado no hash completo (atualizável durante uma cópia)"""
+    return hashlib.sha1()
+
+
+def hash_completo(caminho):
+    """Hash do conteúdo inteiro, lido em blocos"""
+    resumo = novo_resumo()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(TAMANHO_LEITURA), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+class IndiceDuplicatas:
+    """Índice em disco de vídeos ingeridos, consultado antes de criar um job."""
+    
+    def __init__(self, caminho_indice=None):
+        """
+        Inicializa o índice.
+        
+        Args:
+            caminho_indice: Caminho do banco SQLite (opcional)
+        """
+        self.caminho_indice = caminho_indice or os.path.join(DIR_CACHE_PADRAO, "duplicatas.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho_indice)), exist_ok=True)
+        
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        self._local = threading.local()
+        
+        # Travas por impressão: (tamanho, hash_parcial) -> [Lock, usuários]
+        self._travas = {}
+        self._travas_lock = threading.Lock()
+        
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS videos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tamanho INTEGER NOT NULL,
+                    hash_parcial TEXT NOT NULL,
+                    hash_completo TEXT,
+                    arquivo TEXT NOT NULL,
+                    arquivo_original TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    pasta_video TEXT NOT NULL,
+                    data REAL NOT NULL
+                )
+                """
+            )
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_videos_impressao ON videos (tamanho, hash_parcial)"
+            )
+    
+    def _conexao(self):
+        """Retorna a conexão SQLite da thread atual"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho_indice, timeout=30)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+    
+    def impressao(self, arquivo):
+        """
+        Impressão barata de um arquivo recebido.
+        
+        Returns:
+            Dict: tamanho, mtime_ns, hash_parcial e hash_completo (None até ser necessário)
+        """
+        estado = os.stat(arquivo)
+        return {
+            "tamanho": estado.st_size,
+            "mtime_ns": estado.st_mtime_ns,
+            "hash_parcial": hash_parcial(arquivo, estado.st_size),
+            "hash_completo": None
+        }
+    
+    @contextmanager
+    def travar(self, impressao):
+        """
+        Serializa a procura e o registro de arquivos com a mesma impressão.
+        
+        Sem a trava, duas cópias do mesmo vídeo recebidas ao mesmo tempo não
+        se encontram no índice (nenhuma foi registrada ainda) e ambas são
+        processadas. Arquivos diferentes não esperam uns pelos outros.
+        """
+        chave = (impressao["tamanho"], impressao["hash_parcial"])
+        with self._travas_lock:
+            trava = self._travas.setdefault(chave, [threading.Lock(), 0])
+            trava[1] += 1
+        try:
+            with trava[0]:
+                yield
+        finally:
+            with self._travas_lock:
+                trava[1] -= 1
+                if not trava[1]:
+                    del self._travas[chave]
+    
+    def procurar(self, arquivo, impressao=None):
+        """
+        Procura um vídeo já indexado com o mesmo conteúdo.
+        
+        Args:
+            arquivo: Vídeo recebido
+            impressao: Impressão já calculada (ver impressao()); calculada se ausente
+        
+        Returns:
+            Tuple[Dict, Dict]: Entrada do índice (ou None) e a impressão do arquivo,
+                com o hash completo se ele precisou ser calculado
+        """
+        impressao = impressao or self.impressao(arquivo)
+        try:
+            candidatos = [dict(linha) for linha in self._conexao().execute(
+                "SELECT * FROM videos WHERE tamanho = ? AND hash_parcial = ? ORDER BY id",
+                (impressao["tamanho"], impressao["hash_parcial"])
+            )]
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao consultar índice de duplicatas: {str(e)}")
+            return None, impressao
+        
+        # O mesmo arquivo, inalterado, reencontrado (ex.: varredura inicial)
+        for candidato in candidatos:
+            if candidato["arquivo_original"] == arquivo and candidato["mtime_ns"] == impressao["mtime_ns"]:
+                return candidato, impressao
+        
+        for candidato in candidatos:
+            if candidato["hash_completo"] is None:
+                candidato["hash_completo"] = self._completar(candidato)
+                if candidato["hash_completo"] is None:
+                    continue
+            if impressao["hash_completo"] is None:
+                impressao["hash_completo"] = hash_completo(arquivo)
+            if candidato["hash_completo"] == impressao["hash_completo"]:
+                return candidato, impressao
+        
+        return None, impressao
+    
+    def _completar(self, entrada):
+        """Calcula e guarda o hash completo de uma entrada; remove-a se o arquivo sumiu"""
+        try:
+            valor = hash_completo(entrada["arquivo"])
+        except OSError:
+            self.remover(entrada["id"])
+            return None
+        try:
+            with self._conexao() as conexao:
+                conexao.execute("UPDATE videos SET hash_completo = ? WHERE id = ?", (valor, entrada["id"]))
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar índice de duplicatas: {str(e)}")
+        return valor
+    
+    def registrar(self, impressao, arquivo, arquivo_original, pasta_video):
+        """
+        Registra um vídeo ingerido.
+        
+        Args:
+            impressao: Impressão do arquivo recebido (ver impressao())
+            arquivo: Cópia do vídeo na pasta do job (usada para o hash completo)
+            arquivo_original: Caminho em que o vídeo foi recebido
+            pasta_video: Pasta do job que processa (ou referencia) o vídeo
+        """
+        try:
+            with self._conexao() as conexao:
+                conexao.execute(
+                    "INSERT INTO videos (tamanho, hash_parcial, hash_completo, arquivo, arquivo_original, "
+                    "mtime_ns, pasta_video, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (impressao["tamanho"], impressao["hash_parcial"], impressao["hash_completo"], arquivo,
+                     arquivo_original, impressao["mtime_ns"], pasta_video, time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar índice de duplicatas: {str(e)}")
+    
+    def remover(self, id_entrada):
+        """Remove uma entrada (job com erro ou pasta apagada)"""
+        try:
+            with self._conexao() as conexao:
+                conexao.execute("DELETE FROM videos WHERE id = ?", (id_entrada,))
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar índice de duplicatas: {str(e)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    indice = IndiceDuplicatas()
+    for arquivo in sys.argv[1:]:
+        entrada, _ = indice.procurar(os.path.abspath(arquivo))
+        print(f"{arquivo}: {entrada['pasta_video'] if entrada else 'novo'}")
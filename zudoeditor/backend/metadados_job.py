@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Gravação e Leitura de Metadados de Processamento para o ZudoEditor
+
+Este módulo concentra o acesso ao metadados.json de cada vídeo. As
+atualizações do processador são agrupadas e gravadas de forma atômica
+(arquivo temporário + rename) nas mudanças de etapa ou após um intervalo,
+em vez de reescrever o arquivo a cada alteração. Leitores (painel e
+monitor) nunca veem um arquivo parcial e podem consultar o estado com
+frequência: o conteúdo só é relido quando o arquivo muda.
+"""
+
+import os
+import json
+import atexit
+import logging
+import tempfile
+import threading
+import weakref
+
+logger = logging.getLogger("MetadadosJob")
+
+# Intervalo máximo entre uma atualização e sua gravação em disco (segundos)
+INTERVALO_GRAVACAO = 2.0
+
+
+def gravar_metadados(caminho, dados):
+    """
+    Grava os metadados de forma atômica.
+    
+    Args:
+        caminho: Caminho do metadados.json
+        dados: Dicionário de metadados
+    """
+    _gravar_atomico(caminho, json.dumps(dados, indent=4))
+
+
+def _gravar_atomico(caminho, conteudo):
+    """Escreve em um temporário na mesma pasta e substitui o destino com rename"""
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    descritor, temporario = tempfile.mkstemp(dir=pasta, prefix=".metadados.", suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+# Cache de leitura: caminho -> (mtime_ns, tamanho, dados)
+_cache_leitura = {}
+_cache_lock = threading.Lock()
+
+
+def ler_metadados(caminho, padrao=None):
+    """
+    Lê os metadados de um vídeo, relendo o arquivo apenas se ele mudou.
+    
+    Args:
+        caminho: Caminho do metadados.json
+        padrao: Valor retornado se o arquivo não existir ou for inválido
+    
+    Returns:
+        Dict: Cópia dos metadados (alterações não afetam o cache)
+    """
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return padrao
+    
+    chave = (estado.st_mtime_ns, estado.st_size)
+    with _cache_lock:
+        em_cache = _cache_leitura.get(caminho)
+    
+    if em_cache is None or em_cache[0] != chave:
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao ler metadados {caminho}: {str(e)}")
+            return padrao
+        
+        em_cache = (chave, dados)
+        with _cache_lock:
+            _cache_leitura[caminho] = em_cache
+    
+    return json.loads(json.dumps(em_cache[1]))
+
+
+def ler_metadados_resolvidos(caminho, padrao=None):
+    """
+    Lê os metadados de um vídeo, resolvendo duplicatas.
+    
+    A pasta de uma duplicata só aponta para o job original (duplicata_de);
+    o status e os resultados do original são lidos agora, e não copiados
+    quando a duplicata foi detectada (o original podia ainda estar na fila).
+    
+    Returns:
+        Dict: Metadados, com status_original e resultados do original nas duplicatas
+    """
+    metadados = ler_metadados(caminho, padrao)
+    if not metadados or not metadados.get("duplicata_de"):
+        return metadados
+    
+    original = ler_metadados(os.path.join(metadados["duplicata_de"], "metadados.json"), {})
+    metadados["status_original"] = original.get("status")
+    metadados["resultados"] = original.get("resultados", {})
+    return metadados
+
+
+class GravadorMetadados:
+    """Agrupa atualizações de um metadados.json e as grava atomicamente."""
+    
+    def __init__(self, caminho, intervalo=INTERVALO_GRAVACAO):
+        """
+        Inicializa o gravador.
+        
+        Args:
+            caminho: Caminho do metadados.json
+            intervalo: Atraso máximo de gravação das atualizações agrupadas
+        """
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self._iniciar_estado()
+        _gravadores.add(self)
+    
+    def _iniciar_estado(self):
+        self._lock = threading.Lock()
+        self._pendente = None
+        self._timer = None
+    
+    def __getstate__(self):
+        # Locks e timers não são serializáveis (ProcessPoolExecutor)
+        return {"caminho": self.caminho, "intervalo": self.intervalo}
+    
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._iniciar_estado()
+        # Gravadores recriados nos workers também são descarregados ao sair
+        _gravadores.add(self)
+    
+    def salvar(self, dados, imediato=False):
+        """
+        Registra o estado atual dos metadados para gravação.
+        
+        Args:
+            dados: Dicionário de metadados (serializado no momento da chamada)
+            imediato: Gravar agora (mudanças de etapa) em vez de agrupar
+        """
+        conteudo = json.dumps(dados, indent=4)
+        with self._lock:
+            self._pendente = conteudo
+            if not imediato and self._timer is None:
+                self._timer = threading.Timer(self.intervalo, self.descarregar)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        if imediato:
+            self.descarregar()
+    
+    def descarregar(self):
+        """Grava a última atualização pendente, se houver"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            conteudo, self._pendente = self._pendente, None
+            
+            if conteudo is None:
+                return
+            
+            try:
+                _gravar_atomico(self.caminho, conteudo)
+            except Exception as e:
+                logger.error(f"Erro ao salvar metadados: {str(e)}")
+
+
+# Gravadores vivos, descarregados ao encerrar o processo
+_gravadores = weakref.WeakSet()
+
+
+@atexit.register
+def _descarregar_todos():
+    for gravador in list(_gravadores):
+        gravador.descarregar()
@@ -10,16 +10,33 @@ Uso:
 """
 
 import os
+import sys
 import time
+import errno
 import argparse
 import logging
 import json
+import sqlite3
 import shutil
+import threading
 import subprocess
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+# Módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import sonda_midia
+import metadados_job
+import indice_duplicatas
+import fila_trabalhos
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,107 +51,690 @@ logger = logging.getLogger("MonitorPasta")
 # Formatos de vídeo suportados
 FORMATOS_SUPORTADOS = ['.mp4', '.mov', '.avi', '.wmv', '.mkv']
 
+# Prioridade padrão dos vídeos (maior é processado antes)
+PRIORIDADE_PADRAO = 0
+
+# Processadores de vídeo simultâneos (cada renderização já usa várias threads)
+MAX_PARALELO_PADRAO = max(1, (os.cpu_count() or 1) // 4)
+
+# Intervalo entre verificações dos processos em execução (segundos)
+INTERVALO_VERIFICACAO = 1.0
+
+# Sem processos em execução: intervalo entre verificações de trabalhos
+# abandonados por outros monitores (segundos)
+INTERVALO_OCIOSO = 30.0
+
+# Intervalo entre heartbeats dos trabalhos em execução (segundos)
+INTERVALO_HEARTBEAT = 10.0
+
+# Primeiros da fila cuja posição é mantida atualizada no metadados.json
+POSICOES_PUBLICADAS = 200
+
+# Arquivos em cópia: intervalo entre verificações e tempo sem alterações
+# que caracteriza um arquivo completo quando o fechamento não é notificado
+INTERVALO_ESTABILIDADE = 0.5
+TEMPO_ESTAVEL = 3.0
+
+# Arquivos estáveis validados e enfileirados ao mesmo tempo
+MAX_ENTREGAS = 4
+
+
+# Métodos de ingestão, do preferido ao último recurso. O hardlink compartilha
+# o inode com o arquivo que fica na entrada, então só é tentado se o rename
+# falhar (ex.: pasta de entrada sem permissão de escrita), nunca quando a
+# entrada é mantida de propósito (ver METODOS_MANTENDO_ENTRADA)
+METODOS_INGESTAO = ("rename", "hardlink", "reflink", "copia")
+
+# Com o original mantido na pasta de entrada, um arquivo de mesmo nome
+# colocado de novo (cp trunca e reescreve no lugar) alteraria o vídeo do job
+# por um hardlink; reflink e cópia são independentes do original
+METODOS_MANTENDO_ENTRADA = ("reflink", "copia")
+
+# ioctl FICLONE do Linux: cópia por referência (btrfs, XFS, bcachefs...)
+FICLONE = 0x40049409
+
+
+def _reflink(origem, destino):
+    """Clona o arquivo compartilhando os blocos do original (mesmo sistema de arquivos)"""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink indisponível nesta plataforma")
+    with open(origem, "rb") as f_origem, open(destino, "xb") as f_destino:
+        try:
+            fcntl.ioctl(f_destino.fileno(), FICLONE, f_origem.fileno())
+        except OSError:
+            f_destino.close()
+            os.remove(destino)
+            raise
+    shutil.copystat(origem, destino)
+
+
+def _copiar(origem, destino, resumo=None):
+    """Cópia convencional; com resumo, o hash completo é calculado na mesma leitura"""
+    if resumo is None:
+        shutil.copy2(origem, destino)
+        return
+    with open(origem, "rb") as f_origem, open(destino, "xb") as f_destino:
+        for bloco in iter(lambda: f_origem.read(indice_duplicatas.TAMANHO_LEITURA), b""):
+            resumo.update(bloco)
+            f_destino.write(bloco)
+    shutil.copystat(origem, destino)
+
+
+_INGESTORES = {
+    "rename": os.rename,
+    "hardlink": os.link,
+    "reflink": _reflink,
+    "copia": _copiar
+}
+
+
+def _ingerir_por(metodo, origem, destino, resumo):
+    if metodo == "copia":
+        _copiar(origem, destino, resumo)
+    else:
+        _INGESTORES[metodo](origem, destino)
+
+
+def ingerir(origem, destino, metodos=METODOS_INGESTAO, resumo=None):
+    """
+    Traz um arquivo para a pasta de processamento, evitando copiar os dados.
+    
+    Renomear (move o original para fora da pasta de entrada) e criar hardlink
+    só funcionam no mesmo sistema de arquivos; reflink exige também suporte
+    do sistema de arquivos. A cópia só é feita quando nenhum outro método
+    funciona (ex.: entre dispositivos).
+    
+    Args:
+        origem: Arquivo na pasta de entrada
+        destino: Caminho na pasta de processamento (não pode existir)
+        metodos: Métodos tentados, em ordem (ver METODOS_INGESTAO)
+        resumo: Hash (hashlib) atualizado com o conteúdo se houver cópia
+    
+    Returns:
+        str: Método que funcionou
+    """
+    for metodo in metodos[:-1]:
+        try:
+            _ingerir_por(metodo, origem, destino, resumo)
+            return metodo
+        except OSError as e:
+            logger.debug(f"Ingestão por {metodo} indisponível para {origem}: {str(e)}")
+    
+    _ingerir_por(metodos[-1], origem, destino, resumo)
+    return metodos[-1]
+
+
+def metodos_ingestao(manter_entrada=False):
+    """
+    Métodos de ingestão conforme o destino do original.
+    
+    Manter os originais na pasta de entrada dispensa o rename e impede o
+    hardlink (o job compartilharia o arquivo que continua na entrada).
+    """
+    return METODOS_MANTENDO_ENTRADA if manter_entrada else METODOS_INGESTAO
+
+
+class ProcessoAdotado:
+    """
+    Processador iniciado por um monitor anterior, acompanhado pelo pid.
+    
+    Não é filho deste processo, então o código de saída não está
+    disponível: o resultado vem do status que o processador grava no
+    metadados.json ao terminar.
+    """
+    
+    def __init__(self, trabalho):
+        self.processo = trabalho["processo"]
+        self.metadados_path = os.path.join(trabalho["pasta_video"], "metadados.json")
+    
+    def poll(self):
+        """None enquanto o processador roda; depois 0 (concluído) ou 1"""
+        if fila_trabalhos.processo_vivo(self.processo):
+            return None
+        metadados = metadados_job.ler_metadados(self.metadados_path, {})
+        return 0 if metadados.get("status") == "concluido" else 1
+
+
 class ProcessadorFila:
-    """Gerencia a fila de processamento de vídeos"""
+    """
+    Gerencia a fila de processamento de vídeos.
+    
+    Os vídeos são preparados (pasta, cópia e metadados) ao entrar na fila e
+    despachados por uma única thread agendadora, que mantém no máximo
+    max_paralelo processadores em execução. A ordem segue a prioridade
+    manual e, em seguida, a duração sondada (vídeos curtos primeiro).
     
-    def __init__(self, pasta_saida):
+    A fila fica em disco (ver fila_trabalhos): trabalhos pendentes
+    sobrevivem a um reinício do monitor, e os que estavam em processamento
+    voltam à fila (ou são adotados, se o processador ainda estiver
+    rodando). O metadados.json de cada vídeo é uma projeção do estado do
+    trabalho, atualizada nas transições.
+    """
+    
+    def __init__(self, pasta_saida, max_paralelo=MAX_PARALELO_PADRAO, metodos_ingestao=METODOS_INGESTAO,
+                 deduplicar=True, caminho_fila=None):
+        """
+        Args:
+            pasta_saida: Pasta onde cada vídeo ganha sua pasta de processamento
+            max_paralelo: Máximo de processadores de vídeo simultâneos
+            metodos_ingestao: Métodos tentados, em ordem, para trazer o vídeo
+                à pasta de processamento (ver ingerir)
+            deduplicar: Reaproveitar o job de um vídeo de mesmo conteúdo já
+                recebido (ver indice_duplicatas)
+            caminho_fila: Banco da fila de trabalhos (padrão: fila.db na pasta de saída)
+        """
         self.pasta_saida = pasta_saida
-        self.fila = []
-        self.processando = False
+        self.max_paralelo = max(1, int(max_paralelo))
+        self.orcamento_cpu = max(1, (os.cpu_count() or 1) // self.max_paralelo)
+        self.metodos_ingestao = tuple(metodos_ingestao)
+        self.indice = indice_duplicatas.IndiceDuplicatas() if deduplicar else None
+        self.em_execucao = {}  # id do trabalho -> (trabalho, subprocess.Popen)
+        self._posicoes = {}  # id do trabalho -> última posição publicada
+        self._ultimo_heartbeat = 0.0
+        # A condição protege só em_execucao e os sinais ao agendador; banco,
+        # metadados e processos são tratados fora dela
+        self._condicao = threading.Condition()
+        self._parar = False
+        self._acordar = False
+        # Um trabalho recém-enfileirado só é reivindicado depois de projetado
+        self._trava_enfileiramento = threading.Lock()
         
         # Criar pasta de saída se não existir
         if not os.path.exists(pasta_saida):
             os.makedirs(pasta_saida)
             logger.info(f"Pasta de saída criada: {pasta_saida}")
-    
-    def adicionar(self, arquivo):
-        """Adiciona um arquivo à fila de processamento"""
-        self.fila.append(arquivo)
-        logger.info(f"Arquivo adicionado à fila: {arquivo}")
         
-        # Iniciar processamento se não estiver em andamento
-        if not self.processando:
-            self.processar_proximo()
+        self.fila = fila_trabalhos.FilaTrabalhos(caminho_fila or os.path.join(pasta_saida, "fila.db"))
+        self.dono = fila_trabalhos.identificador_dono()
+        
+        # Processadores de uma execução anterior que ainda rodam são adotados;
+        # os demais trabalhos interrompidos voltam à fila
+        self._adotar()
+        for trabalho in self.fila.recuperar(incluir_orfaos=True):
+            self._projetar(trabalho)
+        pendentes = self.fila.contar()
+        if pendentes:
+            logger.info(f"Fila retomada com {pendentes} trabalho(s) pendente(s)")
+        
+        self._agendador = threading.Thread(target=self._executar, name="AgendadorFila", daemon=True)
+        self._agendador.start()
     
-    def processar_proximo(self):
-        """Processa o próximo arquivo na fila"""
-        if not self.fila:
-            self.processando = False
-            return
+    @property
+    def processando(self):
+        with self._condicao:
+            em_execucao = bool(self.em_execucao)
+        return em_execucao or self.fila.contar() > 0
+    
+    def adicionar(self, arquivo, prioridade=None):
+        """
+        Adiciona um arquivo à fila de processamento.
         
-        self.processando = True
-        arquivo = self.fila.pop(0)
+        Args:
+            arquivo: Vídeo detectado na pasta de entrada
+            prioridade: Prioridade manual (padrão: a do arquivo .json ao lado
+                do vídeo, ou PRIORIDADE_PADRAO)
         
+        Returns:
+            str: Pasta de processamento do vídeo, ou None em caso de erro
+        """
         try:
-            logger.info(f"Iniciando processamento de: {arquivo}")
-            
-            # Criar pasta para este vídeo específico
-            nome_base = os.path.basename(arquivo)
-            nome_sem_ext, _ = os.path.splitext(nome_base)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pasta_video = os.path.join(self.pasta_saida, f"{nome_sem_ext}_{timestamp}")
-            os.makedirs(pasta_video)
+            if self.indice is None:
+                pasta_video, arquivo_destino, prioridade, duracao = self._preparar(arquivo, prioridade)
+            else:
+                # Procura e registro no índice sob a mesma trava: de duas cópias
+                # idênticas recebidas juntas, a segunda vira duplicata da primeira
+                impressao = self.indice.impressao(os.path.abspath(arquivo))
+                with self.indice.travar(impressao):
+                    pasta_existente = self._verificar_duplicata(arquivo, impressao)
+                    if pasta_existente is not None:
+                        return pasta_existente
+                    pasta_video, arquivo_destino, prioridade, duracao = self._preparar(arquivo, prioridade,
+                                                                                       impressao)
             
-            # Copiar arquivo original para pasta de processamento
-            arquivo_destino = os.path.join(pasta_video, nome_base)
-            shutil.copy2(arquivo, arquivo_destino)
-            
-            # Criar arquivo de metadados
-            metadados = {
-                "arquivo_original": arquivo,
-                "data_deteccao": datetime.now().isoformat(),
-                "status": "detectado",
-                "plataformas": ["youtube", "instagram", "tiktok"]
-            }
-            
-            with open(os.path.join(pasta_video, "metadados.json"), "w") as f:
-                json.dump(metadados, f, indent=4)
+            # Enfileirar e projetar antes que o agendador possa reivindicar o trabalho
+            with self._trava_enfileiramento:
+                trabalho = self.fila.enfileirar(pasta_video, arquivo_destino, prioridade, duracao)
+                posicao = self.fila.posicao(trabalho)
+                self._projetar(trabalho, {"posicao_fila": posicao})
+            self._notificar()
+        except Exception as e:
+            logger.error(f"Erro ao processar arquivo {arquivo}: {str(e)}")
+            return None
+        
+        logger.info(
+            f"Arquivo adicionado à fila: {arquivo} "
+            f"(prioridade {trabalho['prioridade']}, posição {posicao})"
+        )
+        return trabalho["pasta_video"]
+    
+    def parar(self):
+        """Encerra o agendador; processadores já iniciados continuam até o fim"""
+        with self._condicao:
+            self._parar = True
+            self._condicao.notify()
+        self._agendador.join()
+    
+    def _notificar(self):
+        """Acorda o agendador (ou faz a próxima espera dele terminar de imediato)"""
+        with self._condicao:
+            self._acordar = True
+            self._condicao.notify()
+    
+    def _criar_pasta(self, arquivo):
+        """Cria a pasta de um vídeo específico"""
+        nome_sem_ext, _ = os.path.splitext(os.path.basename(arquivo))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pasta_video = os.path.join(self.pasta_saida, f"{nome_sem_ext}_{timestamp}")
+        os.makedirs(pasta_video)
+        return pasta_video
+    
+    def _verificar_duplicata(self, arquivo, impressao):
+        """
+        Procura no índice um vídeo de mesmo conteúdo com job válido.
+        
+        Args:
+            arquivo: Vídeo recebido
+            impressao: Impressão do arquivo (completada com o hash completo, se
+                ele precisar ser calculado)
+        
+        Returns:
+            str: Pasta que representa o vídeo, ou None se ele deve ser processado
+        """
+        caminho = os.path.abspath(arquivo)
+        entrada, impressao = self.indice.procurar(caminho, impressao)
+        if entrada is None:
+            return None
+        
+        # Jobs com erro ou apagados não servem de referência
+        metadados_original = metadados_job.ler_metadados(
+            os.path.join(entrada["pasta_video"], "metadados.json")
+        )
+        if metadados_original is None or metadados_original.get("status") == "erro":
+            logger.info(f"Job anterior indisponível, processando novamente: {arquivo}")
+            self.indice.remover(entrada["id"])
+            return None
+        
+        if entrada["arquivo_original"] == caminho and entrada["mtime_ns"] == impressao["mtime_ns"]:
+            logger.info(f"Arquivo já recebido, ignorado: {arquivo} ({entrada['pasta_video']})")
+            return entrada["pasta_video"]
+        
+        # Duplicata: pasta própria apontando para o job existente, que pode
+        # ainda estar na fila; status e resultados do original são lidos sob
+        # demanda (ver metadados_job.ler_metadados_resolvidos)
+        pasta_video = self._criar_pasta(arquivo)
+        metadados = {
+            "arquivo_original": arquivo,
+            "data_deteccao": datetime.now().isoformat(),
+            "status": "duplicado",
+            "plataformas": metadados_original.get("plataformas", ["youtube", "instagram", "tiktok"]),
+            "duplicata_de": entrada["pasta_video"]
+        }
+        metadados_job.gravar_metadados(os.path.join(pasta_video, "metadados.json"), metadados)
+        
+        # Novas chegadas do mesmo arquivo são reconhecidas sem hash completo
+        self.indice.registrar(impressao, entrada["arquivo"], caminho, entrada["pasta_video"])
+        
+        logger.info(f"Duplicata de {entrada['pasta_video']}, sem novo processamento: {arquivo}")
+        return pasta_video
+    
+    def _preparar(self, arquivo, prioridade, impressao=None):
+        """
+        Cria a pasta do vídeo, ingere o original e grava os metadados iniciais.
+        
+        Returns:
+            Tuple[str, str, float, float]: Pasta, vídeo ingerido, prioridade e duração
+        """
+        nome_base = os.path.basename(arquivo)
+        nome_sem_ext, _ = os.path.splitext(nome_base)
+        pasta_video = self._criar_pasta(arquivo)
+        
+        # Prioridade e duração antes da ingestão, que pode mover o original
+        if prioridade is None:
+            prioridade = self._prioridade_manual(arquivo)
+        
+        # Duração já sondada na validação (consulta ao cache de sondas)
+        info = sonda_midia.obter_sonda().info_video(arquivo) or {}
+        duracao = info.get("duracao") or None
+        
+        # Trazer o original para a pasta de processamento sem copiar, se possível
+        inicio_ingestao = time.time()
+        arquivo_destino = os.path.join(pasta_video, nome_base)
+        resumo = indice_duplicatas.novo_resumo() if impressao and not impressao["hash_completo"] else None
+        metodo = ingerir(arquivo, arquivo_destino, self.metodos_ingestao, resumo)
+        ingestao = {"metodo": metodo, "duracao": round(time.time() - inicio_ingestao, 3)}
+        
+        # Legendas do gerador (SRT ao lado do vídeo) acompanham o vídeo
+        arquivo_srt = os.path.splitext(arquivo)[0] + ".srt"
+        if os.path.exists(arquivo_srt):
+            ingestao["metodo_legendas"] = ingerir(
+                arquivo_srt, os.path.join(pasta_video, nome_sem_ext + ".srt"), self.metodos_ingestao
+            )
+        
+        # Indexar o conteúdo; a cópia já calculou o hash completo
+        if impressao is not None:
+            if metodo == "copia":
+                impressao["hash_completo"] = resumo.hexdigest()
+            self.indice.registrar(impressao, arquivo_destino, os.path.abspath(arquivo), pasta_video)
+        
+        logger.info(f"Arquivo ingerido por {metodo} em {ingestao['duracao']:.3f}s: {arquivo}")
+        
+        # Criar arquivo de metadados
+        metadados = {
+            "arquivo_original": arquivo,
+            "data_deteccao": datetime.now().isoformat(),
+            "status": "na_fila",
+            "plataformas": ["youtube", "instagram", "tiktok"],
+            "prioridade": prioridade,
+            "duracao": duracao,
+            "data_enfileiramento": datetime.now().isoformat(),
+            "ingestao": ingestao
+        }
+        
+        metadados_job.gravar_metadados(os.path.join(pasta_video, "metadados.json"), metadados)
+        return pasta_video, arquivo_destino, prioridade, duracao
+    
+    def _prioridade_manual(self, arquivo):
+        """Prioridade do arquivo .json ao lado do vídeo ({"prioridade": n}), se houver"""
+        arquivo_json = os.path.splitext(arquivo)[0] + ".json"
+        if not os.path.exists(arquivo_json):
+            return PRIORIDADE_PADRAO
+        try:
+            with open(arquivo_json, "r", encoding="utf-8") as f:
+                prioridade = json.load(f).get("prioridade", PRIORIDADE_PADRAO)
+            return prioridade if isinstance(prioridade, (int, float)) else PRIORIDADE_PADRAO
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Prioridade inválida em {arquivo_json}: {str(e)}")
+            return PRIORIDADE_PADRAO
+    
+    def _executar(self):
+        """
+        Laço do agendador: recolhe processadores encerrados e inicia os próximos da fila.
+        
+        Só o agendador altera em_execucao; a condição é mantida apenas para
+        alterá-lo ou copiá-lo, e para esperar. adicionar() e o watchdog não
+        esperam pelo banco, pelos metadados nem pelo início dos processadores.
+        """
+        while True:
+            try:
+                self._recolher_finalizados()
+                self._manter_leases()
+                
+                if self._vagas():
+                    self._reler_prioridades()
+                    while self._vagas():
+                        with self._trava_enfileiramento:
+                            trabalho = self.fila.reivindicar(self.dono)
+                        if trabalho is None:
+                            break
+                        processo = self._iniciar_processamento(trabalho)
+                        if processo is None:
+                            self._projetar(self.fila.falhar(trabalho["id"], self.dono,
+                                                            "Erro ao iniciar processamento"))
+                            continue
+                        with self._condicao:
+                            self.em_execucao[trabalho["id"]] = (trabalho, processo)
+                        # Com o pid no banco, um monitor reiniciado adota o
+                        # processador em vez de iniciar outro na mesma pasta
+                        self.fila.registrar_processo(trabalho["id"], self.dono, processo.pid)
+                
+                self._publicar_posicoes()
+            except sqlite3.Error as e:
+                logger.error(f"Erro na fila de trabalhos: {str(e)}")
             
-            # Iniciar processamento em segundo plano
-            self._iniciar_processamento(arquivo_destino, pasta_video)
+            # Sem processos em execução, só há o que fazer quando algo entrar
+            # na fila (ou quando outro monitor abandonar um trabalho)
+            with self._condicao:
+                if not self._acordar and not self._parar:
+                    self._condicao.wait(INTERVALO_VERIFICACAO if self.em_execucao else INTERVALO_OCIOSO)
+                self._acordar = False
+                if self._parar:
+                    return
+    
+    def _vagas(self):
+        with self._condicao:
+            return len(self.em_execucao) < self.max_paralelo
+    
+    def _em_execucao(self):
+        """Cópia de em_execucao (alterado apenas pelo agendador, sob a condição)"""
+        with self._condicao:
+            return dict(self.em_execucao)
+    
+    def _recolher_finalizados(self):
+        """Remove os processadores encerrados, liberando suas vagas"""
+        for id_trabalho, (trabalho, processo) in self._em_execucao().items():
+            codigo = processo.poll()
+            if codigo is None:
+                continue
             
-            logger.info(f"Arquivo preparado para processamento: {arquivo}")
+            with self._condicao:
+                del self.em_execucao[id_trabalho]
+            duracao = time.time() - trabalho["iniciado_em"]
+            if codigo == 0:
+                # O processador já gravou o resultado no metadados.json
+                self._projetar(self.fila.concluir(id_trabalho, self.dono))
+                logger.info(f"Processamento encerrado para: {trabalho['arquivo']} ({duracao:.0f}s)")
+                continue
             
-        except Exception as e:
-            logger.error(f"Erro ao processar arquivo {arquivo}: {str(e)}")
+            trabalho = self.fila.falhar(id_trabalho, self.dono, f"Processador encerrado com código {codigo}")
+            logger.error(
+                f"Processador encerrado com código {codigo}: {trabalho['arquivo']} "
+                f"(tentativa {trabalho['tentativas']}, agora {trabalho['estado']})"
+            )
+            self._projetar(trabalho)
+    
+    def _manter_leases(self):
+        """Heartbeat dos trabalhos em execução e adoção ou recuperação dos abandonados por outros donos"""
+        agora = time.time()
+        if agora - self._ultimo_heartbeat < INTERVALO_HEARTBEAT:
+            return
+        self._ultimo_heartbeat = agora
+        self.fila.renovar(list(self._em_execucao()), self.dono)
+        self._adotar()
+        for trabalho in self.fila.recuperar():
+            self._projetar(trabalho)
+    
+    def _adotar(self):
+        """Acompanha os processadores ainda em execução de monitores encerrados"""
+        for trabalho in self.fila.adotar(self.dono):
+            with self._condicao:
+                self.em_execucao[trabalho["id"]] = (trabalho, ProcessoAdotado(trabalho))
+    
+    def _reler_prioridades(self):
+        """Aplica prioridades alteradas manualmente no metadados.json dos próximos da fila"""
+        for trabalho in self.fila.primeiros(POSICOES_PUBLICADAS):
+            metadados = metadados_job.ler_metadados(os.path.join(trabalho["pasta_video"], "metadados.json"), {})
+            prioridade = metadados.get("prioridade")
+            if isinstance(prioridade, (int, float)) and prioridade != trabalho["prioridade"]:
+                self.fila.definir_prioridade(trabalho["id"], prioridade)
+    
+    def _publicar_posicoes(self):
+        """
+        Grava a posição na fila e a espera dos primeiros da fila cuja posição mudou.
+        
+        Os demais têm a posição gravada ao entrar na fila e ao sair da
+        janela publicada; a fila pode ser longa demais para atualizar todos.
+        """
+        agora = time.time()
+        posicoes = {}
+        for posicao, trabalho in enumerate(self.fila.primeiros(POSICOES_PUBLICADAS), 1):
+            posicoes[trabalho["id"]] = posicao
+            if self._posicoes.get(trabalho["id"]) != posicao:
+                self._projetar(trabalho, {
+                    "posicao_fila": posicao,
+                    "tempo_espera": round(agora - trabalho["criado_em"], 1)
+                })
         
-        # Continuar com o próximo arquivo
-        self.processar_proximo()
+        for id_trabalho in self._posicoes.keys() - posicoes.keys():
+            trabalho = self.fila.obter(id_trabalho)
+            if trabalho is not None and trabalho["estado"] == fila_trabalhos.ESTADO_NA_FILA:
+                self._projetar(trabalho, {"posicao_fila": self.fila.posicao(trabalho)})
+        self._posicoes = posicoes
     
-    def _iniciar_processamento(self, arquivo, pasta_saida):
-        """Inicia o script de processamento em segundo plano"""
+    def _projetar(self, trabalho, campos=None):
+        """Atualiza o metadados.json de um vídeo com o estado do seu trabalho"""
+        metadados_path = os.path.join(trabalho["pasta_video"], "metadados.json")
+        try:
+            metadados = metadados_job.ler_metadados(metadados_path, {})
+            metadados["status"] = trabalho["estado"]
+            metadados["tentativas"] = trabalho["tentativas"]
+            if trabalho["mensagem_erro"]:
+                metadados["mensagem_erro"] = trabalho["mensagem_erro"]
+            else:
+                metadados.pop("mensagem_erro", None)
+            if trabalho["estado"] != fila_trabalhos.ESTADO_NA_FILA:
+                metadados.pop("posicao_fila", None)
+            metadados.update(campos or {})
+            metadados_job.gravar_metadados(metadados_path, metadados)
+        except Exception as e:
+            logger.warning(f"Erro ao atualizar metadados de {trabalho['pasta_video']}: {str(e)}")
+    
+    def _iniciar_processamento(self, trabalho):
+        """
+        Inicia o script de processamento em segundo plano.
+        
+        Returns:
+            subprocess.Popen: Processo iniciado, ou None em caso de erro
+        """
         try:
             # Aqui chamaríamos o script de processamento real
             # Para este exemplo, apenas simulamos chamando um script externo
             comando = [
                 "python3", 
                 "processador_video.py", 
-                "--arquivo", arquivo, 
-                "--pasta_saida", pasta_saida
+                "--arquivo", trabalho["arquivo"], 
+                "--pasta_saida", trabalho["pasta_video"],
+                # Cada processador dimensiona encoders e threads só pela sua parte da CPU
+                "--orcamento_cpu", str(self.orcamento_cpu)
             ]
             
-            # Executar em segundo plano
-            subprocess.Popen(
+            # Atualizar metadados antes de iniciar o processador, que passa a
+            # ser o único a gravá-los (evita sobrescrever o progresso dele)
+            tempo_espera = round(trabalho["iniciado_em"] - trabalho["criado_em"], 1)
+            self._projetar(trabalho, {
+                "inicio_processamento": datetime.fromtimestamp(trabalho["iniciado_em"]).isoformat(),
+                "tempo_espera": tempo_espera
+            })
+            
+            # Executar em segundo plano; a saída não é lida, então não pode ir
+            # para um pipe (o processo travaria com o buffer cheio)
+            processo = subprocess.Popen(
                 comando,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
             )
             
-            logger.info(f"Processamento iniciado para: {arquivo}")
-            
-            # Atualizar metadados
-            metadados_path = os.path.join(pasta_saida, "metadados.json")
-            with open(metadados_path, "r") as f:
-                metadados = json.load(f)
-            
-            metadados["status"] = "processando"
-            metadados["inicio_processamento"] = datetime.now().isoformat()
-            
-            with open(metadados_path, "w") as f:
-                json.dump(metadados, f, indent=4)
-                
+            logger.info(
+                f"Processamento iniciado para: {trabalho['arquivo']} "
+                f"(espera de {tempo_espera:.0f}s, tentativa {trabalho['tentativas']})"
+            )
+            return processo
+        
         except Exception as e:
             logger.error(f"Erro ao iniciar processamento: {str(e)}")
+            return None
+
+
+class RastreadorEstabilidade:
+    """
+    Acompanha ao mesmo tempo todos os arquivos ainda sendo copiados.
+    
+    Um arquivo é entregue assim que se estabiliza: logo após o fechamento
+    da escrita (IN_CLOSE_WRITE do inotify, via on_closed do watchdog) ou,
+    sem esse evento, quando tamanho e mtime ficam inalterados por
+    TEMPO_ESTAVEL. Uma única thread verifica os pendentes periodicamente,
+    e as entregas (validação e enfileiramento) rodam em um pool próprio.
+    """
+    
+    def __init__(self, entregar, intervalo=INTERVALO_ESTABILIDADE, tempo_estavel=TEMPO_ESTAVEL,
+                 max_entregas=MAX_ENTREGAS):
+        """
+        Args:
+            entregar: Função chamada com o caminho de cada arquivo estável
+            intervalo: Intervalo entre verificações dos pendentes (segundos)
+            tempo_estavel: Tempo sem alterações que caracteriza um arquivo completo
+            max_entregas: Entregas executadas ao mesmo tempo
+        """
+        self.entregar = entregar
+        self.intervalo = intervalo
+        self.tempo_estavel = tempo_estavel
+        self.pendentes = {}  # caminho -> {"estado", "alterado_em", "fechado"}
+        self._condicao = threading.Condition()
+        self._parar = False
+        self._entregas = ThreadPoolExecutor(max_workers=max_entregas, thread_name_prefix="Entrega")
+        self._thread = threading.Thread(target=self._executar, name="RastreadorEstabilidade", daemon=True)
+        self._thread.start()
+    
+    @staticmethod
+    def _estado(caminho):
+        """(tamanho, mtime_ns) do arquivo, ou None se ele não existir mais"""
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            return None
+        return estado.st_size, estado.st_mtime_ns
+    
+    def observar(self, caminho):
+        """Passa a acompanhar um arquivo novo (ou reinicia o acompanhamento)"""
+        with self._condicao:
+            self.pendentes[caminho] = {
+                "estado": self._estado(caminho),
+                "alterado_em": time.monotonic(),
+                "fechado": False
+            }
+            self._condicao.notify()
+    
+    def alterado(self, caminho):
+        """Escrita em andamento: o arquivo volta a ser considerado aberto"""
+        with self._condicao:
+            pendente = self.pendentes.get(caminho)
+            if pendente is not None:
+                pendente["alterado_em"] = time.monotonic()
+                pendente["fechado"] = False
+    
+    def fechado(self, caminho):
+        """Escrita encerrada: o arquivo é entregue na próxima verificação se não mudar"""
+        with self._condicao:
+            pendente = self.pendentes.get(caminho)
+            if pendente is not None:
+                pendente["estado"] = self._estado(caminho)
+                pendente["fechado"] = True
+                self._condicao.notify()
+    
+    def parar(self):
+        """Encerra o acompanhamento e aguarda as entregas em andamento"""
+        with self._condicao:
+            self._parar = True
+            self._condicao.notify()
+        self._thread.join()
+        self._entregas.shutdown(wait=True)
+    
+    def _executar(self):
+        """Laço de verificação: entrega os arquivos estáveis e descarta os removidos"""
+        with self._condicao:
+            while not self._parar:
+                agora = time.monotonic()
+                for caminho, pendente in list(self.pendentes.items()):
+                    estado = self._estado(caminho)
+                    if estado is None:
+                        # Arquivo pode ter sido removido (ou renomeado) durante a cópia
+                        logger.warning(f"Arquivo removido durante cópia: {caminho}")
+                        del self.pendentes[caminho]
+                    elif estado != pendente["estado"]:
+                        pendente["estado"] = estado
+                        pendente["alterado_em"] = agora
+                        pendente["fechado"] = False
+                    elif pendente["fechado"] or agora - pendente["alterado_em"] >= self.tempo_estavel:
+                        del self.pendentes[caminho]
+                        self._entregas.submit(self._entregar, caminho)
+                
+                # Sem pendentes, só há o que fazer quando um arquivo novo aparecer
+                self._condicao.wait(self.intervalo if self.pendentes else None)
+    
+    def _entregar(self, caminho):
+        try:
+            self.entregar(caminho)
+        except Exception as e:
+            logger.error(f"Erro ao entregar arquivo {caminho}: {str(e)}")
 
 
 class ManipuladorArquivos(FileSystemEventHandler):
@@ -142,8 +742,14 @@ class ManipuladorArquivos(FileSystemEventHandler):
     
     def __init__(self, processador):
         self.processador = processador
+        self.rastreador = RastreadorEstabilidade(self._arquivo_completo)
         super().__init__()
     
+    def _suportado(self, caminho_arquivo):
+        """Verifica se é um formato de vídeo suportado"""
+        _, extensao = os.path.splitext(caminho_arquivo)
+        return extensao.lower() in FORMATOS_SUPORTADOS
+    
     def on_created(self, event):
         """Chamado quando um arquivo é criado na pasta monitorada"""
         if event.is_directory:
@@ -151,15 +757,30 @@ class ManipuladorArquivos(FileSystemEventHandler):
         
         caminho_arquivo = event.src_path
         
-        # Verificar se é um formato de vídeo suportado
-        _, extensao = os.path.splitext(caminho_arquivo)
-        if extensao.lower() not in FORMATOS_SUPORTADOS:
+        if not self._suportado(caminho_arquivo):
             logger.info(f"Arquivo ignorado (formato não suportado): {caminho_arquivo}")
             return
         
-        # Verificar se o arquivo está completo (não está sendo copiado)
-        self._esperar_arquivo_completo(caminho_arquivo)
-        
+        # Acompanhar até que o arquivo esteja completo (não está sendo copiado),
+        # sem bloquear a thread de eventos
+        self.rastreador.observar(caminho_arquivo)
+    
+    def on_moved(self, event):
+        """Arquivos copiados com nome temporário e renomeados ao final"""
+        if not event.is_directory and self._suportado(event.dest_path):
+            self.rastreador.observar(event.dest_path)
+    
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.rastreador.alterado(event.src_path)
+    
+    def on_closed(self, event):
+        """IN_CLOSE_WRITE (inotify): a escrita do arquivo terminou"""
+        if not event.is_directory:
+            self.rastreador.fechado(event.src_path)
+    
+    def _arquivo_completo(self, caminho_arquivo):
+        """Chamado pelo rastreador quando o arquivo se estabiliza"""
         # Verificar se o arquivo é um vídeo válido
         if self._validar_video(caminho_arquivo):
             # Adicionar à fila de processamento
@@ -167,45 +788,20 @@ class ManipuladorArquivos(FileSystemEventHandler):
         else:
             logger.warning(f"Arquivo inválido ou corrompido: {caminho_arquivo}")
     
-    def _esperar_arquivo_completo(self, caminho_arquivo):
-        """Espera até que o arquivo esteja completamente copiado"""
-        tamanho_anterior = -1
-        tamanho_atual = os.path.getsize(caminho_arquivo)
-        
-        # Enquanto o tamanho estiver mudando, o arquivo ainda está sendo copiado
-        while tamanho_atual != tamanho_anterior:
-            tamanho_anterior = tamanho_atual
-            time.sleep(1)  # Esperar 1 segundo
-            try:
-                tamanho_atual = os.path.getsize(caminho_arquivo)
-            except FileNotFoundError:
-                # Arquivo pode ter sido removido
-                logger.warning(f"Arquivo removido durante cópia: {caminho_arquivo}")
-                return False
-        
-        # Esperar mais um pouco para garantir que o sistema de arquivos esteja estável
-        time.sleep(2)
-        return True
+    def parar(self):
+        self.rastreador.parar()
     
     def _validar_video(self, caminho_arquivo):
-        """Verifica se o arquivo é um vídeo válido usando ffprobe"""
+        """Verifica se o arquivo é um vídeo válido usando ffprobe (com cache de sondas)"""
         try:
-            resultado = subprocess.run(
-                ["ffprobe", "-v", "error", caminho_arquivo],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # Se o código de saída for 0, o arquivo é um vídeo válido
-            return resultado.returncode == 0
-            
+            return sonda_midia.obter_sonda().validar(caminho_arquivo)
+        
         except Exception as e:
             logger.error(f"Erro ao validar vídeo {caminho_arquivo}: {str(e)}")
             return False
 
 
-def iniciar_monitoramento(pasta_entrada, pasta_saida):
+def iniciar_monitoramento(pasta_entrada, pasta_saida, max_paralelo=MAX_PARALELO_PADRAO, manter_entrada=False):
     """Inicia o monitoramento da pasta de entrada"""
     
     # Verificar se a pasta de entrada existe
@@ -214,7 +810,7 @@ def iniciar_monitoramento(pasta_entrada, pasta_saida):
         logger.info(f"Pasta de entrada criada: {pasta_entrada}")
     
     # Criar processador de fila
-    processador = ProcessadorFila(pasta_saida)
+    processador = ProcessadorFila(pasta_saida, max_paralelo, metodos_ingestao(manter_entrada))
     
     # Configurar manipulador de eventos
     manipulador = ManipuladorArquivos(processador)
@@ -232,18 +828,19 @@ def iniciar_monitoramento(pasta_entrada, pasta_saida):
         for arquivo in os.listdir(pasta_entrada):
             caminho_completo = os.path.join(pasta_entrada, arquivo)
             if os.path.isfile(caminho_completo):
-                _, extensao = os.path.splitext(caminho_completo)
-                if extensao.lower() in FORMATOS_SUPORTADOS:
-                    if manipulador._validar_video(caminho_completo):
-                        processador.adicionar(caminho_completo)
+                # Arquivos existentes também podem estar sendo copiados
+                if manipulador._suportado(caminho_completo):
+                    manipulador.rastreador.observar(caminho_completo)
         
         # Manter o script em execução
         while True:
             time.sleep(1)
-            
+    
     except KeyboardInterrupt:
         logger.info("Monitoramento interrompido pelo usuário")
         observador.stop()
+        manipulador.parar()
+        processador.parar()
     
     observador.join()
 
@@ -253,8 +850,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Monitor de pasta para sistema de automação de vídeos")
     parser.add_argument("--pasta_entrada", required=True, help="Caminho para a pasta de entrada")
     parser.add_argument("--pasta_saida", required=True, help="Caminho para a pasta de saída")
+    parser.add_argument("--max_paralelo", type=int, default=MAX_PARALELO_PADRAO,
+                        help="Máximo de vídeos processados ao mesmo tempo")
+    parser.add_argument("--manter_entrada", action="store_true",
+                        help="Não mover os vídeos para fora da pasta de entrada (reflink ou cópia)")
     
     args = parser.parse_args()
     
     # Iniciar monitoramento
-    iniciar_monitoramento(args.pasta_entrada, args.pasta_saida)
+    iniciar_monitoramento(args.pasta_entrada, args.pasta_saida, args.max_paralelo,
+                          args.manter_entrada)
@@ -15,14 +15,32 @@ import sys
 import json
 import argparse
 import logging
-import subprocess
 import tempfile
 import shutil
+import hashlib
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 import numpy as np
 import cv2
 from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip, AudioFileClip
-import speech_recognition as sr
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+# Módulos locais
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import render_ffmpeg
+import reconhecimento_fala
+import sonda_midia
+import audio_pcm
+import metadados_job
+import ajuste_encoder
+import analise_midia
+import cache_transcricao
+import deteccao_voz
+import filtros_cor
+import sobreposicoes
+import recorte_inteligente
 
 # Configuração de logging
 logging.basicConfig(
@@ -43,7 +61,10 @@ PLATAFORMAS = {
         "texto_cta": "Confira meu eBook! Link na descrição",
         "posicao_cta": ("center", 0.85),  # (x, y) relativo
         "cor_cta": "white",
-        "bg_cta": "rgba(0,0,0,0.5)"
+        "bg_cta": "rgba(0,0,0,0.5)",
+        "qualidade_minima": 0.97,  # SSIM mínimo (ajuste_encoder.py)
+        "bitrate_maximo": 8000,  # kbps
+        "legendas_externas": True  # Aceita legendas em faixa/arquivo (MODO_LEGENDAS_FAIXA)
     },
     "instagram": {
         "resolucao": (1080, 1920),  # 9:16
@@ -51,7 +72,10 @@ PLATAFORMAS = {
         "texto_cta": "Confira meu eBook! Link na bio",
         "posicao_cta": ("center", 0.85),
         "cor_cta": "white",
-        "bg_cta": "rgba(0,0,0,0.5)"
+        "bg_cta": "rgba(0,0,0,0.5)",
+        "qualidade_minima": 0.96,  # SSIM mínimo (ajuste_encoder.py)
+        "bitrate_maximo": 6000,  # kbps
+        "legendas_externas": False
     },
     "tiktok": {
         "resolucao": (1080, 1920),  # 9:16
@@ -59,17 +83,87 @@ PLATAFORMAS = {
         "texto_cta": "Link do eBook na bio! 📚",
         "posicao_cta": ("center", 0.85),
         "cor_cta": "white",
-        "bg_cta": "rgba(0,0,0,0.5)"
+        "bg_cta": "rgba(0,0,0,0.5)",
+        "qualidade_minima": 0.96,  # SSIM mínimo (ajuste_encoder.py)
+        "bitrate_maximo": 6000,  # kbps
+        "legendas_externas": False
     }
 }
 
+# Modos de renderização das plataformas
+MODO_RENDER_SEQUENCIAL = "sequencial"  # Uma decodificação completa por plataforma
+MODO_RENDER_FANOUT = "fanout"  # Decodifica uma vez e envia os quadros para todos os encoders
+
+# Modos de extração do áudio para reconhecimento de fala
+MODO_AUDIO_STREAM = "stream"  # PCM lido do stdout do ffmpeg, transcrição começa durante a extração
+MODO_AUDIO_ARQUIVO = "arquivo"  # WAV temporário em pasta_temp
+
+# Modos de recorte para proporções diferentes da original
+MODO_RECORTE_CENTRO = "centro"  # Janela fixa no centro do quadro
+MODO_RECORTE_INTELIGENTE = "inteligente"  # Janela segue rostos/regiões salientes (ver recorte_inteligente)
+
+# Modos de legenda nas saídas
+MODO_LEGENDAS_QUEIMAR = "queimar"  # Texto composto nos quadros (todas as plataformas)
+MODO_LEGENDAS_FAIXA = "faixa"  # Faixa mov_text + SRT ao lado nas plataformas com legendas_externas
+
+# Duração máxima dos trechos de fala enviados ao reconhecedor (segundos)
+DURACAO_SEGMENTO_LEGENDA = 10
+
+# Entradas mais longas que a maior duração usada (mais esta margem, em
+# segundos) são recortadas por stream copy antes de qualquer decodificação
+MARGEM_PRE_RECORTE = 10
+
+# Normalização opcional do áudio das saídas (ganho único a partir do loudness medido)
+ALVO_LOUDNESS = -14  # LUFS
+PICO_MAXIMO = -1.0  # dBTP
+
+# Backends de renderização
+BACKEND_MOVIEPY = "moviepy"  # Composição quadro a quadro em Python
+BACKEND_FFMPEG = "ffmpeg"  # filter_complex nativo em um único subprocesso (fallback: MoviePy)
+
 
 class ProcessadorVideo:
     """Classe principal para processamento de vídeos"""
     
-    def __init__(self, arquivo_entrada, pasta_saida):
+    def __init__(self, arquivo_entrada, pasta_saida, modo_render=MODO_RENDER_FANOUT,
+                 orcamento_cpu=None, max_paralelo=None, backend_render=BACKEND_MOVIEPY,
+                 reconhecedor="google", workers_reconhecimento=4, modo_audio=MODO_AUDIO_STREAM,
+                 retomar=True, cadeia_cor=None, modo_recorte=None, modo_legendas=MODO_LEGENDAS_QUEIMAR,
+                 normalizar_audio=False, plataformas=None):
         self.arquivo_entrada = arquivo_entrada
+        # Arquivo efetivamente decodificado (a entrada ou seu recorte prévio)
+        self.arquivo_render = arquivo_entrada
+        self._duracao_recorte = None
         self.pasta_saida = pasta_saida
+        self.modo_render = modo_render
+        self.backend_render = backend_render
+        
+        # Reconhecedor de fala (nome em reconhecimento_fala.RECONHECEDORES ou instância)
+        self.reconhecedor = reconhecedor
+        self.workers_reconhecimento = workers_reconhecimento
+        self.modo_audio = modo_audio
+        
+        # Reaproveitar etapas concluídas em execuções anteriores (ver metadados["etapas"])
+        self.retomar = retomar
+        
+        # Ajuste de cor das plataformas, compilado em tabelas de consulta (ver filtros_cor)
+        self.cadeia_cor = cadeia_cor or filtros_cor.cadeia_padrao()
+        
+        # Recorte para proporções mais estreitas: central ou seguindo rostos/saliência
+        self.modo_recorte = modo_recorte or MODO_RECORTE_CENTRO
+        self.caminho_recorte = None
+        
+        # Legendas queimadas ou em faixa (plataformas que aceitam legendas externas)
+        self.modo_legendas = modo_legendas
+        
+        # Áudio das saídas: codificado uma vez por job e copiado em todas as plataformas
+        self.normalizar_audio = normalizar_audio
+        self.arquivo_audio_saida = None
+        
+        # Núcleos de CPU divididos entre os encoders que rodam ao mesmo tempo
+        self.orcamento_cpu = orcamento_cpu or os.cpu_count() or 4
+        # Máximo de processos de renderização simultâneos (None = um por grupo)
+        self.max_paralelo = max_paralelo
         self.pasta_temp = os.path.join(pasta_saida, "temp")
         self.metadados_path = os.path.join(pasta_saida, "metadados.json")
         
@@ -77,35 +171,39 @@ class ProcessadorVideo:
         if not os.path.exists(self.pasta_temp):
             os.makedirs(self.pasta_temp)
         
-        # Carregar metadados
+        # Carregar metadados (gravações agrupadas e atômicas, ver metadados_job)
+        self._gravador_metadados = metadados_job.GravadorMetadados(self.metadados_path)
         self.metadados = self._carregar_metadados()
+        if plataformas is not None:
+            self.metadados["plataformas"] = list(plataformas)
         
         # Atualizar status
         self._atualizar_status("processando")
     
     def _carregar_metadados(self):
         """Carrega os metadados do arquivo JSON"""
-        try:
-            with open(self.metadados_path, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Erro ao carregar metadados: {str(e)}")
+        metadados = metadados_job.ler_metadados(self.metadados_path)
+        if metadados is None:
+            logger.error(f"Erro ao carregar metadados: {self.metadados_path}")
             return {
                 "arquivo_original": self.arquivo_entrada,
                 "data_deteccao": datetime.now().isoformat(),
                 "status": "detectado",
                 "plataformas": ["youtube", "instagram", "tiktok"]
             }
+        return metadados
     
-    def _salvar_metadados(self):
-        """Salva os metadados no arquivo JSON"""
-        try:
-            with open(self.metadados_path, "w") as f:
-                json.dump(self.metadados, f, indent=4)
-        except Exception as e:
-            logger.error(f"Erro ao salvar metadados: {str(e)}")
+    def _salvar_metadados(self, imediato=True):
+        """
+        Salva os metadados no arquivo JSON.
+        
+        Args:
+            imediato: Gravar agora (mudança de etapa); se False, a gravação é
+                agrupada com as próximas atualizações
+        """
+        self._gravador_metadados.salvar(self.metadados, imediato)
     
-    def _atualizar_status(self, status, detalhes=None):
+    def _atualizar_status(self, status, detalhes=None, imediato=True):
         """Atualiza o status nos metadados"""
         self.metadados["status"] = status
         self.metadados["ultima_atualizacao"] = datetime.now().isoformat()
@@ -115,43 +213,75 @@ class ProcessadorVideo:
                 self.metadados["detalhes"] = {}
             self.metadados["detalhes"].update(detalhes)
         
-        self._salvar_metadados()
+        self._salvar_metadados(imediato)
     
     def processar(self):
         """Processa o vídeo para todas as plataformas configuradas"""
         try:
             logger.info(f"Iniciando processamento de: {self.arquivo_entrada}")
             
+            # Identidade do arquivo de entrada para validar etapas já concluídas
+            self._hash_entrada = self._calcular_hash_entrada()
+            
             # Extrair informações do vídeo original
-            info_video = self._extrair_info_video()
-            self.metadados["info_original"] = info_video
-            self._salvar_metadados()
+            if self._etapa_valida("info", self._hash_config({})) and "info_original" in self.metadados:
+                info_video = self.metadados["info_original"]
+            else:
+                info_video = self._extrair_info_video()
+                self.metadados["info_original"] = info_video
+                self._registrar_etapa("info", self._hash_config({}))
+            
+            plataformas = [
+                p for p in self.metadados.get("plataformas", ["youtube", "instagram", "tiktok"])
+                if p in PLATAFORMAS
+            ]
             
-            # Extrair áudio para reconhecimento de fala
-            arquivo_audio = self._extrair_audio()
+            # Descartar o trecho que nenhuma plataforma usa antes de decodificar
+            if plataformas:
+                duracao_usada = max(PLATAFORMAS[p]["duracao_maxima"] for p in plataformas)
+                self.arquivo_render = self._pre_recortar(info_video, duracao_usada)
+            
+            # Analisar a entrada (loudness, miniaturas) e gerar legendas a partir do áudio
+            legendas = self._etapa_analise(info_video)
+            
+            if self.modo_recorte == MODO_RECORTE_INTELIGENTE and plataformas:
+                self.caminho_recorte = self._etapa_recorte_inteligente(info_video)
             
-            # Gerar legendas
-            legendas = self._gerar_legendas(arquivo_audio)
             self.metadados["legendas_geradas"] = len(legendas) > 0
-            self._salvar_metadados()
+            self._salvar_metadados(imediato=False)
             
             # Processar para cada plataforma
+            # Reaproveitar saídas cujas entradas e configurações não mudaram
+            self._hashes_plataforma = {p: self._hash_config_plataforma(p, legendas) for p in plataformas}
+            self._hashes_video = {p: self._hash_video_plataforma(p, legendas) for p in plataformas}
+            resultados_anteriores = self.metadados.get("resultados", {})
+            progresso = self.metadados.setdefault("progresso_plataformas", {})
             resultados = {}
-            for plataforma in self.metadados.get("plataformas", ["youtube", "instagram", "tiktok"]):
-                if plataforma in PLATAFORMAS:
-                    self._atualizar_status("processando", {"plataforma_atual": plataforma})
-                    
-                    arquivo_saida = self._processar_plataforma(
-                        plataforma, 
-                        info_video, 
-                        legendas
-                    )
-                    
-                    if arquivo_saida:
-                        resultados[plataforma] = {
-                            "arquivo": arquivo_saida,
-                            "timestamp": datetime.now().isoformat()
-                        }
+            pendentes = []
+            for plataforma in plataformas:
+                if plataforma in resultados_anteriores and self._etapa_valida(
+                        f"plataforma:{plataforma}", self._hashes_plataforma[plataforma]):
+                    resultados[plataforma] = resultados_anteriores[plataforma]
+                    progresso[plataforma] = {"status": "concluido", "reaproveitado": True}
+                elif plataforma in resultados_anteriores and self._video_reaproveitavel(plataforma):
+                    # Só as legendas em faixa mudaram: remux, sem decodificar nem codificar
+                    progresso[plataforma] = {"status": "processando", "inicio": datetime.now().isoformat()}
+                    saida = self._aplicar_legendas_faixa(resultados_anteriores[plataforma]["arquivo"], legendas)
+                    self._registrar_saidas({plataforma: saida}, resultados)
+                    if not saida["arquivo"]:
+                        pendentes.append(plataforma)
+                else:
+                    pendentes.append(plataforma)
+            
+            if pendentes:
+                self.arquivo_audio_saida = self._preparar_audio(info_video)
+            
+            if self.modo_render == MODO_RENDER_FANOUT:
+                grupos = self._agrupar_plataformas(pendentes)
+            else:
+                grupos = [[plataforma] for plataforma in pendentes]
+            
+            resultados.update(self._renderizar_plataformas(grupos, info_video, legendas))
             
             # Atualizar metadados com resultados
             self.metadados["resultados"] = resultados
@@ -168,46 +298,339 @@ class ProcessadorVideo:
             self._atualizar_status("erro", {"mensagem_erro": str(e)})
             return False
     
-    def _extrair_info_video(self):
-        """Extrai informações básicas do vídeo usando ffprobe"""
+    def _etapa_recorte_inteligente(self, info_video):
+        """
+        Calcula (ou reaproveita) o caminho do recorte inteligente.
+        
+        A detecção roda uma vez, em poucos quadros reduzidos por segundo; as
+        plataformas só fatiam cada quadro na posição do caminho.
+        """
+        config_recorte = self._hash_config({
+            "amostras_por_segundo": recorte_inteligente.AMOSTRAS_POR_SEGUNDO,
+            "suavizacao": recorte_inteligente.SUAVIZACAO,
+            "duracao": self._duracao_recorte
+        })
+        if self._etapa_valida("recorte_inteligente", config_recorte) and "recorte_inteligente" in self.metadados:
+            return recorte_inteligente.CaminhoRecorte.de_dict(self.metadados["recorte_inteligente"])
+        
+        info_render = info_video if self.arquivo_render == self.arquivo_entrada else None
         try:
-            comando = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration,size,bit_rate:stream=width,height,codec_name,codec_type",
-                "-of", "json",
-                self.arquivo_entrada
-            ]
+            caminho = recorte_inteligente.analisar(self.arquivo_render, info=info_render)
+        except Exception as e:
+            logger.warning(f"Recorte inteligente indisponível, usando recorte central: {str(e)}")
+            return None
+        
+        self.metadados["recorte_inteligente"] = caminho.para_dict()
+        self._registrar_etapa("recorte_inteligente", config_recorte)
+        return caminho
+    
+    def _preparar_audio(self, info_video):
+        """
+        Codifica o áudio das saídas uma única vez (AAC, normalizado se configurado).
+        
+        Cada plataforma copia este arquivo no mux, cortado por pacote na sua
+        duração, em vez de recodificar o mesmo áudio.
+        
+        Returns:
+            str: Arquivo .m4a, ou None se o vídeo não tiver áudio
+        """
+        if not info_video.get("tem_audio"):
+            return None
+        
+        ganho = self._ganho_normalizacao() if self.normalizar_audio else None
+        arquivo_audio = os.path.join(self.pasta_temp, "audio_saida.m4a")
+        config_audio = self._hash_config({"duracao": self._duracao_recorte, "ganho": ganho})
+        if self._etapa_valida("audio_saida", config_audio):
+            return arquivo_audio
+        
+        logger.info("Codificando o áudio das saídas" + (f" (ganho {ganho:+.1f} dB)" if ganho else ""))
+        render_ffmpeg.codificar_audio(self.arquivo_render, arquivo_audio, ganho_db=ganho)
+        self._registrar_etapa("audio_saida", config_audio, [arquivo_audio], imediato=False)
+        return arquivo_audio
+    
+    def _ganho_normalizacao(self):
+        """Ganho (dB) que leva o loudness medido na análise ao alvo, sem ultrapassar o pico máximo"""
+        loudness = (self.metadados.get("analise") or {}).get("loudness") or {}
+        integrado, pico = loudness.get("integrado"), loudness.get("pico_real")
+        if integrado is None or not math.isfinite(integrado):
+            return None
+        
+        ganho = ALVO_LOUDNESS - integrado
+        if pico is not None and math.isfinite(pico):
+            ganho = min(ganho, PICO_MAXIMO - pico)
+        return round(ganho, 2)
+    
+    def _calcular_hash_entrada(self):
+        """Identifica a versão atual do arquivo de entrada (caminho, tamanho e mtime)"""
+        estado = os.stat(self.arquivo_entrada)
+        return self._hash_config({
+            "arquivo": os.path.abspath(self.arquivo_entrada),
+            "tamanho": estado.st_size,
+            "mtime_ns": estado.st_mtime_ns
+        })
+    
+    def _hash_config(self, config):
+        """Calcula o hash estável de uma configuração serializável em JSON"""
+        serializado = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha1(serializado.encode("utf-8")).hexdigest()
+    
+    def _legendas_em_faixa(self, plataforma):
+        """Se as legendas da plataforma vão em faixa/arquivo em vez de queimadas"""
+        return self.modo_legendas == MODO_LEGENDAS_FAIXA and PLATAFORMAS[plataforma].get("legendas_externas", False)
+    
+    def _hash_config_plataforma(self, plataforma, legendas):
+        """Hash de tudo que determina a saída de uma plataforma"""
+        return self._hash_config({
+            "video": self._hash_video_plataforma(plataforma, legendas),
+            "legendas": legendas,
+            "legendas_em_faixa": self._legendas_em_faixa(plataforma)
+        })
+    
+    def _hash_video_plataforma(self, plataforma, legendas):
+        """Hash de tudo que determina o vídeo codificado (sem as legendas em faixa)"""
+        if self._legendas_em_faixa(plataforma):
+            legendas = None
+        return self._hash_config({
+            "plataforma": PLATAFORMAS[plataforma],
+            "backend_render": self.backend_render,
+            "cor": self.cadeia_cor.descricao(),
+            "normalizar_audio": self.normalizar_audio,
+            "recorte": self.modo_recorte,
+            "encoder": {
+                chave: valor for chave, valor in ajuste_encoder.parametros_encoder(plataforma).items()
+                if chave != "threads"
+            },
+            "legendas": legendas
+        })
+    
+    def _etapa_valida(self, nome, hash_config):
+        """
+        Verifica se uma etapa pode ser reaproveitada.
+        
+        A etapa precisa ter sido concluída com a mesma entrada e a mesma
+        configuração, e todos os seus artefatos precisam ainda existir.
+        """
+        if not self.retomar:
+            return False
+        
+        etapa = self.metadados.get("etapas", {}).get(nome)
+        if not etapa or etapa.get("status") != "concluido":
+            return False
+        
+        if etapa.get("hash_entrada") != self._hash_entrada or etapa.get("hash_config") != hash_config:
+            return False
+        
+        if not all(os.path.exists(artefato) for artefato in etapa.get("artefatos", [])):
+            return False
+        
+        logger.info(f"Etapa '{nome}' reaproveitada da execução anterior")
+        return True
+    
+    def _registrar_etapa(self, nome, hash_config, artefatos=None, imediato=True, **extras):
+        """Registra uma etapa concluída nos metadados"""
+        self.metadados.setdefault("etapas", {})[nome] = dict(extras, **{
+            "status": "concluido",
+            "hash_entrada": self._hash_entrada,
+            "hash_config": hash_config,
+            "artefatos": artefatos or [],
+            "timestamp": datetime.now().isoformat()
+        })
+        self._salvar_metadados(imediato)
+    
+    def _video_reaproveitavel(self, plataforma):
+        """
+        Verifica se o vídeo de uma etapa anterior pode receber novas legendas em faixa.
+        
+        Vale quando só as legendas mudaram: mesma entrada, mesmo hash de vídeo
+        e arquivo ainda existente.
+        """
+        if not self.retomar or not self._legendas_em_faixa(plataforma):
+            return False
+        
+        etapa = self.metadados.get("etapas", {}).get(f"plataforma:{plataforma}")
+        if not etapa or etapa.get("status") != "concluido":
+            return False
+        
+        return (
+            etapa.get("hash_entrada") == self._hash_entrada
+            and etapa.get("hash_video") == self._hashes_video[plataforma]
+            and all(os.path.exists(artefato) for artefato in etapa.get("artefatos", [])[:1])
+        )
+    
+    def _aplicar_legendas_faixa(self, arquivo, legendas):
+        """
+        Embute as legendas como faixa mov_text (stream copy) e grava o SRT ao lado.
+        
+        Returns:
+            dict: Saída no formato de _executar_tarefa_render
+        """
+        arquivo_srt = os.path.splitext(arquivo)[0] + ".srt"
+        try:
+            if legendas:
+                render_ffmpeg.escrever_srt(legendas, arquivo_srt)
+                render_ffmpeg.embutir_legendas(arquivo, arquivo_srt)
+            else:
+                if os.path.exists(arquivo_srt):
+                    os.remove(arquivo_srt)
+                render_ffmpeg.embutir_legendas(arquivo)
+                arquivo_srt = None
+        except Exception as e:
+            logger.error(f"Erro ao embutir legendas em {arquivo}: {str(e)}")
+            return {"arquivo": None, "erro": str(e)}
+        
+        logger.info(f"Legendas em faixa aplicadas: {arquivo}")
+        return {"arquivo": arquivo, "erro": None, "legendas": arquivo_srt}
+    
+    def _pre_recortar(self, info_video, duracao_usada):
+        """
+        Recorta a entrada no primeiro quadro-chave após a duração usada.
+        
+        O recorte é feito com stream copy, sem decodificar; as plataformas
+        continuam aplicando a própria duração máxima sobre o arquivo recortado.
+        
+        Returns:
+            str: Arquivo a ser decodificado (recorte ou a própria entrada)
+        """
+        self._duracao_recorte = None
+        if info_video.get("duracao", 0) <= duracao_usada + MARGEM_PRE_RECORTE:
+            return self.arquivo_entrada
+        
+        try:
+            fim = render_ffmpeg.quadro_chave_apos(self.arquivo_entrada, duracao_usada)
+            if fim is None:
+                logger.info("Nenhum quadro-chave próximo ao limite de duração. Recorte prévio ignorado")
+                return self.arquivo_entrada
             
-            resultado = subprocess.run(
-                comando,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            _, extensao = os.path.splitext(self.arquivo_entrada)
+            arquivo_recorte = os.path.join(self.pasta_temp, f"entrada_recortada{extensao}")
+            config_recorte = self._hash_config({"fim": fim})
             
-            if resultado.returncode != 0:
-                raise Exception(f"Erro ao extrair informações do vídeo: {resultado.stderr}")
+            if not self._etapa_valida("recorte", config_recorte):
+                render_ffmpeg.recortar_copia(self.arquivo_entrada, arquivo_recorte, fim)
+                self._registrar_etapa("recorte", config_recorte, [arquivo_recorte])
             
-            info = json.loads(resultado.stdout)
+            logger.info(f"Entrada de {info_video['duracao']:.1f}s recortada para {fim:.1f}s")
+            self._duracao_recorte = fim
+            return arquivo_recorte
             
-            # Extrair informações relevantes
-            streams = info.get("streams", [])
-            formato = info.get("format", {})
+        except Exception as e:
+            logger.warning(f"Recorte prévio falhou, usando a entrada completa: {str(e)}")
+            return self.arquivo_entrada
+    
+    def _etapa_analise(self, info_video):
+        """
+        Analisa a entrada em uma única passada do ffmpeg e gera as legendas.
+        
+        A mesma decodificação produz o PCM do reconhecimento de fala, o
+        loudness EBU R128 e as miniaturas (ver analise_midia), guardados em
+        metadados["analise"] e reaproveitados em novas execuções. Vídeos do
+        gerador já trazem as legendas: nesse caso não há PCM nem reconhecimento.
+        """
+        legendas_gerador = self._legendas_do_gerador()
+        
+        config_analise = self._hash_config({
+            "legendas_gerador": legendas_gerador,
+            "reconhecedor": self.reconhecedor if isinstance(self.reconhecedor, str) else type(self.reconhecedor).__name__,
+            "duracao_segmento": DURACAO_SEGMENTO_LEGENDA,
+            "segmentacao": "vad",
+            "duracao_audio": self._duracao_recorte,
+            "n_miniaturas": analise_midia.N_MINIATURAS
+        })
+        arquivo_legendas = os.path.join(self.pasta_saida, "legendas.json")
+        
+        if self._etapa_valida("analise", config_analise) and "analise" in self.metadados:
+            with open(arquivo_legendas, "r", encoding="utf-8") as f:
+                return json.load(f)
+        
+        # Entrada recortada: sondar o recorte, não o original
+        info_render = info_video if self.arquivo_render == self.arquivo_entrada else None
+        arquivo_audio = None
+        if self.modo_audio == MODO_AUDIO_ARQUIVO and legendas_gerador is None:
+            arquivo_audio = os.path.join(self.pasta_temp, "audio.wav")
+        
+        analise = analise_midia.AnaliseMidia(
+            self.arquivo_render,
+            os.path.join(self.pasta_saida, "miniaturas"),
+            info=info_render,
+            arquivo_audio=arquivo_audio
+        )
+        
+        if analise.tem_audio and not arquivo_audio and legendas_gerador is None:
+            # Trechos de fala detectados enquanto a passada ainda está em curso
+            segmentos = self._segmentar_fala(analise.blocos_pcm())
+            legendas = self._transcrever_segmentos(segmentos)
+        else:
+            try:
+                analise.executar()
+            except Exception as e:
+                logger.error(f"Erro na análise de mídia: {str(e)}")
+            
+            if legendas_gerador is not None:
+                legendas = legendas_gerador
+            elif not analise.tem_audio:
+                logger.info("Vídeo sem faixa de áudio. Legendas não serão geradas")
+                legendas = []
+            else:
+                legendas = self._gerar_legendas(arquivo_audio)
+        
+        if analise.resultado is None:
+            # Passada interrompida: a etapa será refeita na próxima execução
+            logger.warning("Análise de mídia incompleta. Etapa não registrada")
+            return legendas
+        
+        self.metadados["analise"] = {
+            "loudness": analise.resultado["loudness"],
+            "miniaturas": analise.resultado["miniaturas"]
+        }
+        with open(arquivo_legendas, "w", encoding="utf-8") as f:
+            json.dump(legendas, f, ensure_ascii=False, indent=4)
+        self._registrar_etapa("analise", config_analise, [arquivo_legendas] + analise.resultado["miniaturas"])
+        
+        return legendas
+    
+    def _legendas_do_gerador(self):
+        """
+        Retorna as legendas de um vídeo produzido pelo gerador do ZudoEditor.
+        
+        O gerador conhece o roteiro e o tempo exato da narração (TTS) e grava
+        as legendas em um SRT ao lado do vídeo e como faixa de legenda embutida.
+        
+        Returns:
+            List[Dict]: Legendas, ou None se a origem não for o gerador
+        """
+        try:
+            arquivo_srt = os.path.splitext(self.arquivo_entrada)[0] + ".srt"
+            if os.path.exists(arquivo_srt):
+                legendas = render_ffmpeg.ler_srt(arquivo_srt)
+                logger.info(f"Legendas reaproveitadas do SRT: {arquivo_srt} ({len(legendas)} legendas)")
+                return legendas
             
-            video_stream = next((s for s in streams if s.get("codec_type") == "video"), None)
-            audio_stream = next((s for s in streams if s.get("codec_type") == "audio"), None)
+            dados = sonda_midia.obter_sonda().sondar(self.arquivo_entrada) or {}
+            comentario = dados.get("format", {}).get("tags", {}).get("comment", "")
+            tem_faixa_legenda = any(s.get("codec_type") == "subtitle" for s in dados.get("streams", []))
             
-            return {
-                "duracao": float(formato.get("duration", 0)),
-                "tamanho": int(formato.get("size", 0)),
-                "bitrate": int(formato.get("bit_rate", 0)),
-                "largura": int(video_stream.get("width", 0)) if video_stream else 0,
-                "altura": int(video_stream.get("height", 0)) if video_stream else 0,
-                "codec_video": video_stream.get("codec_name") if video_stream else None,
-                "codec_audio": audio_stream.get("codec_name") if audio_stream else None,
-                "tem_audio": audio_stream is not None
-            }
+            if comentario == render_ffmpeg.MARCA_GERADOR and tem_faixa_legenda:
+                arquivo_srt = render_ffmpeg.extrair_legendas(
+                    self.arquivo_entrada, os.path.join(self.pasta_temp, "legendas_gerador.srt")
+                )
+                legendas = render_ffmpeg.ler_srt(arquivo_srt)
+                logger.info(f"Legendas reaproveitadas da faixa embutida ({len(legendas)} legendas)")
+                return legendas
+        
+        except Exception as e:
+            logger.warning(f"Não foi possível reaproveitar as legendas do gerador: {str(e)}")
+        
+        return None
+    
+    def _extrair_info_video(self):
+        """Extrai informações básicas do vídeo usando ffprobe (com cache de sondas)"""
+        try:
+            info = sonda_midia.obter_sonda().info_video(self.arquivo_entrada)
+            
+            if info is None:
+                raise Exception(f"ffprobe não reconheceu o arquivo: {self.arquivo_entrada}")
+            
+            return info
             
         except Exception as e:
             logger.error(f"Erro ao extrair informações do vídeo: {str(e)}")
@@ -222,95 +645,79 @@ class ProcessadorVideo:
                 "tem_audio": False
             }
     
-    def _extrair_audio(self):
-        """Extrai o áudio do vídeo para um arquivo WAV temporário"""
-        arquivo_saida = os.path.join(self.pasta_temp, "audio.wav")
-        
-        try:
-            comando = [
-                "ffmpeg",
-                "-i", self.arquivo_entrada,
-                "-vn",  # Sem vídeo
-                "-acodec", "pcm_s16le",  # Formato PCM
-                "-ar", "16000",  # Taxa de amostragem
-                "-ac", "1",  # Mono
-                "-y",  # Sobrescrever
-                arquivo_saida
-            ]
-            
-            subprocess.run(
-                comando,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True
-            )
-            
-            logger.info(f"Áudio extraído para: {arquivo_saida}")
-            return arquivo_saida
-            
-        except Exception as e:
-            logger.error(f"Erro ao extrair áudio: {str(e)}")
-            return None
-    
     def _gerar_legendas(self, arquivo_audio):
         """Gera legendas a partir do áudio usando reconhecimento de fala"""
         if not arquivo_audio or not os.path.exists(arquivo_audio):
             logger.warning("Arquivo de áudio não disponível para geração de legendas")
             return []
         
+        segmentos = self._segmentar_fala(audio_pcm.blocos_wav(arquivo_audio))
+        return self._transcrever_segmentos(segmentos)
+    
+    def _segmentar_fala(self, blocos):
+        """Divide o PCM nas pausas da fala, descartando as regiões sem voz (ver deteccao_voz)"""
+        return deteccao_voz.segmentos_fala(blocos, duracao_maxima=DURACAO_SEGMENTO_LEGENDA)
+    
+    def _transcrever_segmentos(self, segmentos):
+        """
+        Transcreve segmentos de áudio em legendas, consultando antes o cache.
+        
+        Só o início da fala (cache_transcricao.DURACAO_PREFIXO) é lido antes
+        de decidir. Se nenhuma transcrição guardada começa igual, os segmentos
+        seguem direto para o pool, enquanto o áudio ainda é extraído, e a
+        impressão completa é calculada à medida que passam. Se o início
+        coincide, o restante só é lido para calcular a chave; a transcrição
+        só acontece se, no fim, a narração não for a mesma.
+        """
         try:
-            logger.info("Iniciando reconhecimento de fala para legendas")
+            reconhecedor = self._obter_reconhecedor()
+            cache = cache_transcricao.obter_cache()
+            config = {
+                "modelo": getattr(reconhecedor, "modelo", None),
+                "idioma": reconhecedor.idioma,
+                "duracao_segmento": DURACAO_SEGMENTO_LEGENDA,
+                "segmentacao": "vad"
+            }
             
-            # Inicializar reconhecedor
-            recognizer = sr.Recognizer()
+            impressao = cache_transcricao.ImpressaoAudio()
+            segmentos = iter(segmentos)
+            inicio = []
+            fala = 0.0
+            for segmento in segmentos:
+                impressao.atualizar_segmento(segmento)
+                inicio.append(segmento)
+                fala += segmento.fim - segmento.inicio
+                if fala >= cache_transcricao.DURACAO_PREFIXO:
+                    break
+            prefixo = cache.chave(impressao.hexdigest(), reconhecedor.nome, parte="prefixo", **config)
             
-            # Lista para armazenar legendas com timestamps
-            legendas = []
+            chave = None
+            if cache.tem_prefixo(prefixo):
+                # Provavelmente já transcrita: ler o restante só para a chave
+                # (guardado apenas para o caso raro de a narração divergir)
+                inicio.extend(self._acompanhar_impressao(segmentos, impressao))
+                segmentos = iter(())
+                chave = cache.chave(impressao.hexdigest(), reconhecedor.nome, **config)
+                legendas = cache.obter(chave)
+                if legendas is not None:
+                    return legendas
             
-            # Carregar áudio
-            with sr.AudioFile(arquivo_audio) as source:
-                # Ajustar para ruído ambiente
-                recognizer.adjust_for_ambient_noise(source)
-                
-                # Definir duração dos segmentos (em segundos)
-                duracao_segmento = 10
-                
-                # Obter duração total do áudio
-                audio_info = self._extrair_info_audio(arquivo_audio)
-                duracao_total = audio_info.get("duracao", 0)
-                
-                # Processar áudio em segmentos
-                for offset in range(0, int(duracao_total), duracao_segmento):
-                    # Calcular duração real do segmento
-                    duracao_real = min(duracao_segmento, duracao_total - offset)
-                    
-                    # Pular segmentos muito curtos
-                    if duracao_real < 1:
-                        continue
-                    
-                    # Capturar segmento de áudio
-                    audio_data = recognizer.record(source, duration=duracao_real)
-                    
-                    try:
-                        # Reconhecer fala (usando Google Speech Recognition)
-                        texto = recognizer.recognize_google(audio_data, language="pt-BR")
-                        
-                        if texto:
-                            # Adicionar à lista de legendas
-                            legendas.append({
-                                "inicio": offset,
-                                "fim": offset + duracao_real,
-                                "texto": texto
-                            })
-                            
-                            logger.debug(f"Legenda reconhecida: {texto}")
-                    
-                    except sr.UnknownValueError:
-                        logger.debug(f"Nenhuma fala reconhecida no segmento {offset}-{offset+duracao_real}")
-                    except sr.RequestError as e:
-                        logger.warning(f"Erro na API de reconhecimento: {str(e)}")
-                    except Exception as e:
-                        logger.warning(f"Erro ao processar segmento de áudio: {str(e)}")
+            logger.info("Iniciando reconhecimento de fala para legendas")
+            
+            # Transcrever os segmentos em paralelo, mantendo a ordem
+            pool = reconhecimento_fala.PoolReconhecimento(
+                reconhecedor,
+                max_workers=self.workers_reconhecimento
+            )
+            legendas = pool.transcrever(
+                itertools.chain(inicio, self._acompanhar_impressao(segmentos, impressao))
+            )
+            if chave is None:
+                chave = cache.chave(impressao.hexdigest(), reconhecedor.nome, **config)
+            
+            # Transcrições com segmentos que falharam não vão para o cache
+            if pool.falhas == 0:
+                cache.guardar(chave, legendas, prefixo)
             
             logger.info(f"Reconhecimento de fala concluído. {len(legendas)} segmentos gerados.")
             return legendas
@@ -319,28 +726,27 @@ class ProcessadorVideo:
             logger.error(f"Erro ao gerar legendas: {str(e)}")
             return []
     
+    @staticmethod
+    def _acompanhar_impressao(segmentos, impressao):
+        """Repassa os segmentos acrescentando cada um à impressão do áudio"""
+        for segmento in segmentos:
+            impressao.atualizar_segmento(segmento)
+            yield segmento
+    
+    def _obter_reconhecedor(self):
+        """Retorna a instância do reconhecedor configurado"""
+        if isinstance(self.reconhecedor, str):
+            return reconhecimento_fala.criar_reconhecedor(self.reconhecedor, idioma="pt-BR")
+        return self.reconhecedor
+    
     def _extrair_info_audio(self, arquivo_audio):
-        """Extrai informações do arquivo de áudio"""
+        """Extrai informações do arquivo de áudio (com cache de sondas)"""
         try:
-            comando = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "json",
-                arquivo_audio
-            ]
+            info = sonda_midia.obter_sonda().sondar(arquivo_audio)
             
-            resultado = subprocess.run(
-                comando,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            if info is None:
+                raise Exception(f"ffprobe não reconheceu o arquivo: {arquivo_audio}")
             
-            if resultado.returncode != 0:
-                raise Exception(f"Erro ao extrair informações do áudio: {resultado.stderr}")
-            
-            info = json.loads(resultado.stdout)
             formato = info.get("format", {})
             
             return {
@@ -351,7 +757,192 @@ class ProcessadorVideo:
             logger.error(f"Erro ao extrair informações do áudio: {str(e)}")
             return {"duracao": 0}
     
-    def _processar_plataforma(self, plataforma, info_video, legendas):
+    def _renderizar_plataformas(self, grupos, info_video, legendas):
+        """
+        Renderiza os grupos de plataformas em um pool de processos.
+        
+        O orçamento de CPU é dividido entre os encoders que rodam ao mesmo
+        tempo. O progresso e as falhas de cada saída são registrados nos
+        metadados pelo processo principal.
+        """
+        n_processos = max(1, min(len(grupos), self.max_paralelo or len(grupos)))
+        threads = self._threads_por_encoder(grupos, n_processos)
+        logger.info(f"Renderizando {len(grupos)} grupo(s) com {n_processos} processo(s) e {threads} thread(s) por encoder")
+        
+        progresso = self.metadados.setdefault("progresso_plataformas", {})
+        for grupo in grupos:
+            for plataforma in grupo:
+                progresso[plataforma] = {"status": "pendente"}
+        self._salvar_metadados(imediato=False)
+        
+        resultados = {}
+        
+        # Sem paralelismo possível: renderizar no próprio processo
+        if n_processos == 1:
+            for grupo in grupos:
+                self._marcar_em_andamento(grupo)
+                saidas = self._executar_tarefa_render(grupo, info_video, legendas, threads)
+                self._registrar_saidas(saidas, resultados)
+            return resultados
+        
+        pendentes = list(grupos)
+        em_execucao = {}
+        with ProcessPoolExecutor(max_workers=n_processos) as executor:
+            while pendentes or em_execucao:
+                # Manter no máximo n_processos grupos em execução
+                while pendentes and len(em_execucao) < n_processos:
+                    grupo = pendentes.pop(0)
+                    self._marcar_em_andamento(grupo)
+                    futuro = executor.submit(self._executar_tarefa_render, grupo, info_video, legendas, threads)
+                    em_execucao[futuro] = grupo
+                
+                concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    grupo = em_execucao.pop(futuro)
+                    try:
+                        saidas = futuro.result()
+                    except Exception as e:
+                        # Processo de trabalho encerrado de forma inesperada
+                        logger.error(f"Falha no processo de renderização de {', '.join(grupo)}: {str(e)}")
+                        saidas = {plataforma: {"arquivo": None, "erro": str(e)} for plataforma in grupo}
+                    self._registrar_saidas(saidas, resultados)
+        
+        return resultados
+    
+    def _threads_por_encoder(self, grupos, n_processos):
+        """Divide o orçamento de CPU entre os encoders que podem rodar simultaneamente"""
+        # Pior caso: os maiores grupos rodando ao mesmo tempo
+        encoders = sorted((len(grupo) for grupo in grupos), reverse=True)[:n_processos]
+        return max(1, self.orcamento_cpu // max(1, sum(encoders)))
+    
+    def _marcar_em_andamento(self, grupo):
+        """Marca as plataformas de um grupo como em processamento"""
+        progresso = self.metadados["progresso_plataformas"]
+        for plataforma in grupo:
+            progresso[plataforma] = {
+                "status": "processando",
+                "inicio": datetime.now().isoformat()
+            }
+        
+        em_andamento = [p for p, estado in progresso.items() if estado["status"] == "processando"]
+        self._atualizar_status("processando", {"plataforma_atual": ", ".join(em_andamento)}, imediato=False)
+    
+    def _registrar_saidas(self, saidas, resultados):
+        """Registra nos metadados o resultado de cada saída de um grupo"""
+        progresso = self.metadados["progresso_plataformas"]
+        for plataforma, saida in saidas.items():
+            progresso[plataforma].update({
+                "status": "concluido" if saida["arquivo"] else "erro",
+                "fim": datetime.now().isoformat()
+            })
+            
+            if saida["arquivo"]:
+                resultados[plataforma] = {
+                    "arquivo": saida["arquivo"],
+                    "timestamp": datetime.now().isoformat()
+                }
+                artefatos = [saida["arquivo"]]
+                if saida.get("legendas"):
+                    resultados[plataforma]["legendas"] = saida["legendas"]
+                    artefatos.append(saida["legendas"])
+                self._registrar_etapa(
+                    f"plataforma:{plataforma}",
+                    self._hashes_plataforma[plataforma],
+                    artefatos,
+                    imediato=False,
+                    hash_video=self._hashes_video[plataforma]
+                )
+            else:
+                progresso[plataforma]["erro"] = saida.get("erro")
+        
+        self._salvar_metadados()
+    
+    def _executar_tarefa_render(self, grupo, info_video, legendas, threads):
+        """
+        Renderiza um grupo de plataformas; executado nos processos do pool.
+        
+        Returns:
+            dict: {plataforma: {"arquivo": caminho ou None, "erro": mensagem ou None}}
+        """
+        # Legendas em faixa não são queimadas: entram depois, por stream copy
+        # (os grupos não misturam os dois modos, ver _agrupar_plataformas)
+        legendas_faixa = legendas if self._legendas_em_faixa(grupo[0]) else None
+        if legendas_faixa is not None:
+            legendas = []
+        
+        try:
+            arquivos_saida = None
+            if self.backend_render == BACKEND_FFMPEG:
+                configs = [PLATAFORMAS[plataforma] for plataforma in grupo]
+                motivo = render_ffmpeg.motivo_incompatibilidade(info_video, configs, legendas, self.cadeia_cor)
+                if motivo is None and self.caminho_recorte is not None:
+                    motivo = "recorte inteligente exige o caminho MoviePy"
+                if motivo is None:
+                    arquivos_saida = self._processar_grupo_ffmpeg(grupo, info_video, legendas, threads)
+                else:
+                    logger.info(f"Backend ffmpeg indisponível para {', '.join(grupo)} ({motivo}). Usando MoviePy")
+            
+            if arquivos_saida is None:
+                if len(grupo) > 1:
+                    # Camadas comuns decodificadas e compostas uma única vez
+                    arquivos_saida = self._processar_grupo_fanout(grupo, info_video, legendas, threads)
+                else:
+                    arquivos_saida = {
+                        grupo[0]: self._processar_plataforma(grupo[0], info_video, legendas, threads)
+                    }
+        
+        except Exception as e:
+            return {plataforma: {"arquivo": None, "erro": str(e)} for plataforma in grupo}
+        
+        if legendas_faixa is not None:
+            return {
+                plataforma: self._aplicar_legendas_faixa(arquivo, legendas_faixa)
+                for plataforma, arquivo in arquivos_saida.items()
+            }
+        return {plataforma: {"arquivo": arquivo, "erro": None} for plataforma, arquivo in arquivos_saida.items()}
+    
+    def _processar_grupo_ffmpeg(self, grupo, info_video, legendas, threads=4):
+        """Renderiza um grupo de plataformas com um único filter_complex do ffmpeg"""
+        logger.info(f"Processando vídeo com backend ffmpeg para: {', '.join(grupo)}")
+        
+        arquivo_srt = None
+        if legendas:
+            arquivo_srt = render_ffmpeg.escrever_srt(
+                legendas, os.path.join(self.pasta_temp, f"legendas_{'_'.join(grupo)}.srt")
+            )
+        
+        saidas = []
+        for plataforma in grupo:
+            config = PLATAFORMAS[plataforma]
+            duracao = config["duracao_maxima"]
+            if info_video.get("duracao"):
+                duracao = min(duracao, info_video["duracao"])
+            
+            saidas.append({
+                "arquivo": self._caminho_saida(plataforma),
+                "config": config,
+                "duracao": duracao,
+                "encoder": ajuste_encoder.parametros_encoder(plataforma, threads_max=threads)
+            })
+        
+        comando = render_ffmpeg.montar_comando(
+            self.arquivo_render,
+            info_video,
+            saidas,
+            arquivo_srt=arquivo_srt,
+            threads=threads,
+            tem_audio=info_video.get("tem_audio", False),
+            filtro_cor=render_ffmpeg.filtro_cor(self.cadeia_cor, self.pasta_temp),
+            arquivo_audio=self.arquivo_audio_saida
+        )
+        render_ffmpeg.renderizar(comando)
+        
+        for plataforma, saida in zip(grupo, saidas):
+            logger.info(f"Vídeo processado para {plataforma}: {saida['arquivo']}")
+        
+        return {plataforma: saida["arquivo"] for plataforma, saida in zip(grupo, saidas)}
+    
+    def _processar_plataforma(self, plataforma, info_video, legendas, threads=4):
         """Processa o vídeo para uma plataforma específica"""
         try:
             logger.info(f"Processando vídeo para plataforma: {plataforma}")
@@ -361,12 +952,10 @@ class ProcessadorVideo:
                 raise Exception(f"Configuração não encontrada para plataforma: {plataforma}")
             
             # Nome do arquivo de saída
-            nome_base = os.path.basename(self.arquivo_entrada)
-            nome_sem_ext, _ = os.path.splitext(nome_base)
-            arquivo_saida = os.path.join(self.pasta_saida, f"{nome_sem_ext}_{plataforma}.mp4")
+            arquivo_saida = self._caminho_saida(plataforma)
             
             # Carregar vídeo com MoviePy
-            video = VideoFileClip(self.arquivo_entrada)
+            video = VideoFileClip(self.arquivo_render)
             
             # Verificar duração
             if video.duration > config["duracao_maxima"]:
@@ -390,15 +979,16 @@ class ProcessadorVideo:
             # Adicionar marca d'água
             video = self._adicionar_marca_dagua(video)
             
-            # Salvar vídeo processado
+            # Salvar vídeo processado (preset/CRF/threads medidos por ajuste_encoder.py)
+            encoder = ajuste_encoder.parametros_encoder(plataforma, threads_max=threads)
+            # Áudio do job copiado sem recodificar, cortado na duração do vídeo
             video.write_videofile(
                 arquivo_saida,
                 codec="libx264",
-                audio_codec="aac",
-                temp_audiofile=os.path.join(self.pasta_temp, f"temp_audio_{plataforma}.m4a"),
-                remove_temp=True,
-                threads=4,
-                preset="medium"
+                audio=self.arquivo_audio_saida or False,
+                threads=encoder["threads"],
+                preset=encoder["preset"],
+                ffmpeg_params=ajuste_encoder.parametros_ffmpeg(encoder) + self._parametros_audio()
             )
             
             # Fechar para liberar recursos
@@ -409,7 +999,121 @@ class ProcessadorVideo:
             
         except Exception as e:
             logger.error(f"Erro ao processar vídeo para {plataforma}: {str(e)}")
-            return None
+            raise
+    
+    def _caminho_saida(self, plataforma):
+        """Retorna o caminho do arquivo de saída de uma plataforma"""
+        nome_base = os.path.basename(self.arquivo_entrada)
+        nome_sem_ext, _ = os.path.splitext(nome_base)
+        return os.path.join(self.pasta_saida, f"{nome_sem_ext}_{plataforma}.mp4")
+    
+    def _agrupar_plataformas(self, plataformas):
+        """Agrupa as plataformas que compartilham a mesma resolução de saída e modo de legenda"""
+        grupos = {}
+        for plataforma in plataformas:
+            # Legendas queimadas são uma camada comum: não misturar com as em faixa
+            chave = (tuple(PLATAFORMAS[plataforma]["resolucao"]), self._legendas_em_faixa(plataforma))
+            grupos.setdefault(chave, []).append(plataforma)
+        return list(grupos.values())
+    
+    def _processar_grupo_fanout(self, grupo, info_video, legendas, threads=4):
+        """
+        Processa várias plataformas com uma única decodificação.
+        
+        Redimensionamento, filtros, legendas e marca d'água são compostos uma
+        vez; cada quadro resultante é enviado ao encoder de todas as plataformas
+        do grupo, aplicando apenas o CTA e a duração máxima de cada uma.
+        """
+        saidas = {}
+        video = None
+        try:
+            logger.info(f"Processando vídeo em fan-out para: {', '.join(grupo)}")
+            
+            resolucao = PLATAFORMAS[grupo[0]]["resolucao"]
+            
+            # Carregar vídeo com MoviePy
+            video = VideoFileClip(self.arquivo_render)
+            fps = video.fps or 30
+            
+            # Decodificar apenas até a maior duração exigida pelo grupo
+            duracao_base = min(video.duration, max(PLATAFORMAS[p]["duracao_maxima"] for p in grupo))
+            base = video.subclip(0, duracao_base)
+            
+            # Camadas comuns a todas as plataformas do grupo
+            base = self._redimensionar_video(base, resolucao)
+            base = self._aplicar_filtros(base)
+            if legendas:
+                base = self._adicionar_legendas(base, legendas)
+            base = self._adicionar_marca_dagua(base)
+            
+            # Preparar um encoder por plataforma
+            for plataforma in grupo:
+                config = PLATAFORMAS[plataforma]
+                duracao = min(duracao_base, config["duracao_maxima"])
+                
+                arquivo_saida = self._caminho_saida(plataforma)
+                encoder = ajuste_encoder.parametros_encoder(plataforma, threads_max=threads)
+                saidas[plataforma] = {
+                    "arquivo": arquivo_saida,
+                    "total_quadros": int(duracao * fps),
+                    "cta": self._renderizar_cta(
+                        config["texto_cta"], config["posicao_cta"],
+                        config["cor_cta"], config["bg_cta"], base.size
+                    ),
+                    "writer": FFMPEG_VideoWriter(
+                        arquivo_saida,
+                        base.size,
+                        fps,
+                        codec="libx264",
+                        audiofile=self.arquivo_audio_saida,
+                        preset=encoder["preset"],
+                        threads=encoder["threads"],
+                        ffmpeg_params=ajuste_encoder.parametros_ffmpeg(encoder) + self._parametros_audio()
+                    )
+                }
+            
+            # Decodificar e compor cada quadro uma única vez
+            total_quadros = max(saida["total_quadros"] for saida in saidas.values())
+            for indice, quadro in enumerate(base.iter_frames(fps=fps, dtype="uint8")):
+                if indice >= total_quadros:
+                    break
+                
+                # CTA misturado no próprio quadro e desfeito após cada escrita
+                for saida in saidas.values():
+                    if indice < saida["total_quadros"]:
+                        quadro = saida["cta"].aplicar(quadro)
+                        saida["writer"].write_frame(quadro)
+                        saida["cta"].desfazer(quadro)
+            
+            arquivos_saida = {}
+            for plataforma, saida in saidas.items():
+                saida["writer"].close()
+                logger.info(f"Vídeo processado para {plataforma}: {saida['arquivo']}")
+                arquivos_saida[plataforma] = saida["arquivo"]
+            
+            return arquivos_saida
+            
+        except Exception as e:
+            logger.error(f"Erro ao processar vídeo em fan-out para {', '.join(grupo)}: {str(e)}")
+            for saida in saidas.values():
+                try:
+                    saida["writer"].close()
+                except Exception:
+                    pass
+            raise
+            
+        finally:
+            if video is not None:
+                video.close()
+    
+    def _parametros_audio(self):
+        """Parâmetros do mux do áudio compartilhado: terminar junto com o vídeo"""
+        return render_ffmpeg.parametros_audio_copiado(self.arquivo_audio_saida)
+    
+    def _renderizar_cta(self, texto, posicao, cor, bg_cor, tamanho_video):
+        """Rasteriza o CTA uma única vez (com cache) para composição por quadro"""
+        estilo = dict(sobreposicoes.ESTILO_CTA, color=cor, bg_color=bg_cor)
+        return sobreposicoes.Sobreposicao.de_texto(texto, estilo, posicao, tamanho_video)
     
     def _redimensionar_video(self, video, resolucao_alvo):
         """Redimensiona o vídeo para a resolução alvo mantendo a proporção"""
@@ -417,4 +1121,152 @@ class ProcessadorVideo:
         
         # Obter dimensões atuais
         largura_atual, altura_atual = video.size
-    
\ No newline at end of file
+        proporcao_atual = largura_atual / altura_atual
+        proporcao_alvo = largura_alvo / altura_alvo
+        
+        # Determinar estratégia de redimensionamento
+        if proporcao_atual > proporcao_alvo:
+            # Vídeo é mais largo que o alvo, cortar laterais
+            nova_largura = int(altura_atual * proporcao_alvo)
+            nova_altura = altura_atual
+            x1 = (largura_atual - nova_largura) // 2
+            y1 = 0
+        else:
+            # Vídeo é mais alto que o alvo, cortar topo e base
+            nova_largura = largura_atual
+            nova_altura = int(largura_atual / proporcao_alvo)
+            x1 = 0
+            y1 = (altura_atual - nova_altura) // 2
+        
+        if self.caminho_recorte is not None:
+            # Janela do mesmo tamanho, deslocada pelo caminho pré-calculado
+            posicao = self.caminho_recorte.posicionador(video.size, (nova_largura, nova_altura))
+            
+            def recortar(get_frame, t):
+                x, y = posicao(t)
+                return get_frame(t)[y:y + nova_altura, x:x + nova_largura]
+            
+            video_cortado = video.fl(recortar, apply_to=["mask"])
+        else:
+            video_cortado = video.crop(x1=x1, y1=y1, x2=x1+nova_largura, y2=y1+nova_altura)
+        
+        # Redimensionar para resolução final
+        return video_cortado.resize(resolucao_alvo)
+    
+    def _aplicar_filtros(self, video):
+        """Aplica os filtros de cor (contraste e brilho por padrão) ao vídeo"""
+        # Cadeia compilada uma vez; cada quadro é só uma consulta às tabelas
+        tabela = self.cadeia_cor.compilar()
+        if tabela.identidade:
+            return video
+        return video.fl_image(tabela.aplicar)
+    
+    def _adicionar_legendas(self, video, legendas):
+        """Adiciona legendas ao vídeo"""
+        # Lista para armazenar clips de texto
+        clips_texto = []
+        
+        for legenda in legendas:
+            # Criar clip de texto para cada legenda
+            texto_clip = TextClip(
+                legenda["texto"],
+                fontsize=30,
+                color='white',
+                bg_color='rgba(0,0,0,0.5)',
+                font='Arial-Bold',
+                method='caption',
+                size=(video.w * 0.9, None),
+                stroke_color='black',
+                stroke_width=1
+            )
+            
+            # Posicionar na parte inferior
+            texto_clip = texto_clip.set_position(('center', 'bottom'))
+            
+            # Definir duração baseada nos timestamps
+            texto_clip = texto_clip.set_start(legenda["inicio"]).set_end(legenda["fim"])
+            
+            # Adicionar à lista
+            clips_texto.append(texto_clip)
+        
+        # Combinar vídeo com legendas
+        return CompositeVideoClip([video] + clips_texto)
+    
+    def _adicionar_cta(self, video, texto, posicao, cor, bg_cor):
+        """Adiciona chamada para ação (CTA) ao vídeo"""
+        # CTA rasterizado uma vez e misturado só na sua área de cada quadro
+        cta = self._renderizar_cta(texto, posicao, cor, bg_cor, video.size)
+        return video.fl_image(cta.aplicar)
+    
+    def _adicionar_marca_dagua(self, video):
+        """Adiciona marca d'água ao vídeo"""
+        # Texto simples no canto superior direito, rasterizado uma vez
+        marca = sobreposicoes.Sobreposicao.de_texto(
+            sobreposicoes.TEXTO_MARCA_DAGUA,
+            sobreposicoes.ESTILO_MARCA_DAGUA,
+            sobreposicoes.POSICAO_MARCA_DAGUA,
+            video.size
+        )
+        return video.fl_image(marca.aplicar)
+    
+    def _limpar_temp(self):
+        """Remove a pasta de arquivos temporários"""
+        try:
+            if os.path.exists(self.pasta_temp):
+                shutil.rmtree(self.pasta_temp)
+        except Exception as e:
+            logger.warning(f"Erro ao limpar arquivos temporários: {str(e)}")
+
+
+if __name__ == "__main__":
+    # Configurar argumentos de linha de comando
+    parser = argparse.ArgumentParser(description="Processador de vídeos para sistema de automação de vídeos")
+    parser.add_argument("--arquivo", required=True, help="Caminho para o vídeo de entrada")
+    parser.add_argument("--pasta_saida", required=True, help="Caminho para a pasta de saída")
+    parser.add_argument("--modo_render", choices=[MODO_RENDER_FANOUT, MODO_RENDER_SEQUENCIAL],
+                        default=MODO_RENDER_FANOUT, help="Modo de renderização das plataformas")
+    parser.add_argument("--orcamento_cpu", type=int, default=None,
+                        help="Núcleos de CPU divididos entre os encoders (padrão: todos)")
+    parser.add_argument("--max_paralelo", type=int, default=None,
+                        help="Máximo de renderizações simultâneas (padrão: uma por grupo de plataformas)")
+    parser.add_argument("--backend_render", choices=[BACKEND_MOVIEPY, BACKEND_FFMPEG],
+                        default=BACKEND_MOVIEPY, help="Backend de renderização das plataformas")
+    parser.add_argument("--reconhecedor", choices=list(reconhecimento_fala.RECONHECEDORES),
+                        default="google", help="Reconhecedor de fala usado nas legendas (vosk e whisper funcionam offline)")
+    parser.add_argument("--workers_reconhecimento", type=int, default=4,
+                        help="Segmentos de áudio transcritos simultaneamente")
+    parser.add_argument("--modo_audio", choices=[MODO_AUDIO_STREAM, MODO_AUDIO_ARQUIVO],
+                        default=MODO_AUDIO_STREAM, help="Extração do áudio para as legendas")
+    parser.add_argument("--modo_recorte", choices=[MODO_RECORTE_CENTRO, MODO_RECORTE_INTELIGENTE],
+                        default=MODO_RECORTE_CENTRO, help="Recorte para proporções mais estreitas (ex.: 9:16)")
+    parser.add_argument("--modo_legendas", choices=[MODO_LEGENDAS_QUEIMAR, MODO_LEGENDAS_FAIXA],
+                        default=MODO_LEGENDAS_QUEIMAR,
+                        help="Legendas queimadas ou em faixa/SRT nas plataformas que aceitam legendas externas")
+    parser.add_argument("--normalizar_audio", action="store_true",
+                        help=f"Normaliza o áudio das saídas para {ALVO_LOUDNESS} LUFS")
+    parser.add_argument("--lut", default=None,
+                        help="LUT .cube aplicada após o ajuste de cor padrão")
+    parser.add_argument("--sem_retomar", action="store_true",
+                        help="Refaz todas as etapas, ignorando as concluídas em execuções anteriores")
+    
+    args = parser.parse_args()
+    
+    # Processar vídeo
+    processador = ProcessadorVideo(
+        args.arquivo,
+        args.pasta_saida,
+        modo_render=args.modo_render,
+        orcamento_cpu=args.orcamento_cpu,
+        max_paralelo=args.max_paralelo,
+        backend_render=args.backend_render,
+        reconhecedor=args.reconhecedor,
+        workers_reconhecimento=args.workers_reconhecimento,
+        modo_audio=args.modo_audio,
+        retomar=not args.sem_retomar,
+        cadeia_cor=filtros_cor.cadeia_padrao().lut_cube(args.lut) if args.lut else None,
+        modo_recorte=args.modo_recorte,
+        modo_legendas=args.modo_legendas,
+        normalizar_audio=args.normalizar_audio
+    )
+    sucesso = processador.processar()
+    sys.exit(0 if sucesso else 1)
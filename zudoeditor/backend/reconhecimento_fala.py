@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Reconhecimento de Fala para o Processador de Vídeo
+
+Este módulo define a interface dos reconhecedores de fala usados na
+geração de legendas e um pool de trabalho limitado que transcreve os
+segmentos de áudio em paralelo, remontando as legendas na ordem original.
+
+Além da API Google, há reconhecedores offline (Vosk e Whisper carregados
+do disco) que devolvem palavras com tempo; nesse caso as legendas seguem
+as pausas da fala em vez dos limites fixos dos segmentos. Inclui também um
+reconhecedor local (stub) para testar e medir o pool sem rede.
+
+Uso (benchmark):
+    python reconhecimento_fala.py
+"""
+
+import os
+import json
+import time
+import wave
+import array
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("ReconhecimentoFala")
+
+# Formato de áudio esperado pelos reconhecedores
+TAXA_AMOSTRAGEM = 16000
+LARGURA_AMOSTRA = 2  # bytes (PCM 16 bits, mono)
+
+# Trecho de áudio a ser transcrito (pcm em bytes, PCM 16 bits mono)
+SegmentoAudio = namedtuple("SegmentoAudio", ["inicio", "fim", "pcm", "taxa"])
+
+# Palavra reconhecida com tempo em segundos
+Palavra = namedtuple("Palavra", ["texto", "inicio", "fim"])
+
+# Modelos locais dos reconhecedores offline
+DIR_MODELOS = os.environ.get(
+    "ZUDO_MODELOS_DIR",
+    os.path.join(os.path.expanduser("~"), ".zudoeditor", "modelos")
+)
+
+# Agrupamento de palavras em legendas
+PAUSA_LEGENDA = 0.6  # segundos de silêncio que encerram uma legenda
+MAX_CARACTERES_LEGENDA = 42
+
+
+class ErroReconhecimento(Exception):
+    """Falha do serviço de reconhecimento (rede, cota, modelo indisponível)."""
+
+
+class Reconhecedor:
+    """Interface base dos reconhecedores de fala."""
+    
+    nome = "base"
+    
+    # Reconhecedores que implementam reconhecer_palavras()
+    palavras_com_tempo = False
+    
+    def __init__(self, idioma="pt-BR"):
+        """
+        Inicializa o reconhecedor.
+        
+        Args:
+            idioma: Idioma do áudio (ex.: "pt-BR")
+        """
+        self.idioma = idioma
+    
+    def reconhecer(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        """
+        Transcreve um trecho de áudio.
+        
+        Args:
+            pcm: Áudio PCM 16 bits mono
+            taxa: Taxa de amostragem em Hz
+        
+        Returns:
+            str: Texto reconhecido (vazio se não houver fala)
+        """
+        raise NotImplementedError
+    
+    def reconhecer_palavras(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        """
+        Transcreve um trecho de áudio com o tempo de cada palavra.
+        
+        Returns:
+            List[Palavra]: Palavras com tempos relativos ao início do trecho
+        """
+        raise NotImplementedError
+
+
+class ReconhecedorGoogle(Reconhecedor):
+    """Reconhecedor usando a API Google Speech Recognition (requer internet)."""
+    
+    nome = "google"
+    
+    def reconhecer(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        import speech_recognition as sr
+        
+        audio_data = sr.AudioData(pcm, taxa, LARGURA_AMOSTRA)
+        try:
+            return sr.Recognizer().recognize_google(audio_data, language=self.idioma)
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise ErroReconhecimento(str(e))
+
+
+class ReconhecedorStub(Reconhecedor):
+    """Reconhecedor local determinístico para testes e benchmarks offline."""
+    
+    nome = "stub"
+    
+    def __init__(self, idioma="pt-BR", latencia=0.0, limiar_energia=100):
+        """
+        Inicializa o reconhecedor stub.
+        
+        Args:
+            idioma: Idioma do áudio
+            latencia: Atraso simulado por chamada, em segundos (imita uma API remota)
+            limiar_energia: Amplitude média abaixo da qual o trecho é tratado como silêncio
+        """
+        super().__init__(idioma)
+        self.latencia = latencia
+        self.limiar_energia = limiar_energia
+    
+    def reconhecer(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        if self.latencia:
+            time.sleep(self.latencia)
+        
+        amostras = array.array("h", pcm)
+        if not amostras:
+            return ""
+        
+        # Trechos silenciosos não geram texto
+        energia = sum(abs(amostra) for amostra in amostras) / len(amostras)
+        if energia < self.limiar_energia:
+            return ""
+        
+        return f"[fala {len(amostras) / taxa:.1f}s]"
+
+
+class ReconhecedorVosk(Reconhecedor):
+    """Reconhecedor offline usando Vosk (Kaldi), com modelo carregado do disco."""
+    
+    nome = "vosk"
+    palavras_com_tempo = True
+    
+    # Modelos já carregados (caminho: Model), compartilhados entre instâncias
+    _modelos = {}
+    _modelos_lock = threading.Lock()
+    
+    # Bytes entregues ao reconhecedor por chamada
+    TAMANHO_BLOCO = 8000
+    
+    def __init__(self, idioma="pt-BR", modelo=None):
+        """
+        Inicializa o reconhecedor Vosk.
+        
+        Args:
+            idioma: Idioma do áudio (o idioma efetivo é o do modelo)
+            modelo: Pasta do modelo Vosk (padrão: ZUDO_VOSK_MODELO ou
+                DIR_MODELOS/vosk-model-small-pt-0.3)
+        """
+        super().__init__(idioma)
+        self.modelo = modelo or os.environ.get(
+            "ZUDO_VOSK_MODELO",
+            os.path.join(DIR_MODELOS, "vosk-model-small-pt-0.3")
+        )
+    
+    def _carregar_modelo(self):
+        """Carrega o modelo uma única vez por processo (Model é thread-safe)"""
+        with self._modelos_lock:
+            if self.modelo not in self._modelos:
+                if not os.path.isdir(self.modelo):
+                    raise ErroReconhecimento(f"Modelo Vosk não encontrado em {self.modelo}")
+                
+                from vosk import Model, SetLogLevel
+                SetLogLevel(-1)
+                logger.info(f"Carregando modelo Vosk: {self.modelo}")
+                self._modelos[self.modelo] = Model(self.modelo)
+            return self._modelos[self.modelo]
+    
+    def reconhecer(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        return " ".join(palavra.texto for palavra in self.reconhecer_palavras(pcm, taxa))
+    
+    def reconhecer_palavras(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        from vosk import KaldiRecognizer
+        
+        # Um KaldiRecognizer por trecho: o modelo é compartilhado entre as threads
+        reconhecedor = KaldiRecognizer(self._carregar_modelo(), taxa)
+        reconhecedor.SetWords(True)
+        
+        resultados = []
+        for inicio in range(0, len(pcm), self.TAMANHO_BLOCO):
+            if reconhecedor.AcceptWaveform(pcm[inicio:inicio + self.TAMANHO_BLOCO]):
+                resultados.append(json.loads(reconhecedor.Result()))
+        resultados.append(json.loads(reconhecedor.FinalResult()))
+        
+        return [
+            Palavra(item["word"], item["start"], item["end"])
+            for resultado in resultados
+            for item in resultado.get("result", [])
+        ]
+
+
+class ReconhecedorWhisper(Reconhecedor):
+    """Reconhecedor offline usando Whisper, com modelo carregado do disco."""
+    
+    nome = "whisper"
+    palavras_com_tempo = True
+    
+    # Modelos já carregados (caminho: modelo); a inferência é serializada
+    _modelos = {}
+    _modelos_lock = threading.Lock()
+    
+    def __init__(self, idioma="pt-BR", modelo=None, dispositivo="cpu"):
+        """
+        Inicializa o reconhecedor Whisper.
+        
+        Args:
+            idioma: Idioma do áudio (ex.: "pt-BR")
+            modelo: Arquivo .pt do modelo (padrão: ZUDO_WHISPER_MODELO ou
+                DIR_MODELOS/whisper/base.pt)
+            dispositivo: "cpu" ou "cuda"
+        """
+        super().__init__(idioma)
+        self.modelo = modelo or os.environ.get(
+            "ZUDO_WHISPER_MODELO",
+            os.path.join(DIR_MODELOS, "whisper", "base.pt")
+        )
+        self.dispositivo = dispositivo
+    
+    def _carregar_modelo(self):
+        """Carrega o modelo do disco, sem download (nós de renderização sem rede)"""
+        with self._modelos_lock:
+            if self.modelo not in self._modelos:
+                if not os.path.isfile(self.modelo):
+                    raise ErroReconhecimento(f"Modelo Whisper não encontrado em {self.modelo}")
+                
+                import whisper
+                logger.info(f"Carregando modelo Whisper: {self.modelo}")
+                self._modelos[self.modelo] = whisper.load_model(self.modelo, device=self.dispositivo)
+            return self._modelos[self.modelo]
+    
+    def reconhecer(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        return " ".join(palavra.texto for palavra in self.reconhecer_palavras(pcm, taxa))
+    
+    def reconhecer_palavras(self, pcm, taxa=TAXA_AMOSTRAGEM):
+        import numpy as np
+        
+        if taxa != TAXA_AMOSTRAGEM:
+            raise ErroReconhecimento(f"Whisper requer áudio a {TAXA_AMOSTRAGEM} Hz (recebido: {taxa} Hz)")
+        
+        modelo = self._carregar_modelo()
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        
+        # O modelo PyTorch já usa todos os núcleos; chamadas concorrentes só disputariam CPU
+        with self._modelos_lock:
+            resultado = modelo.transcribe(
+                audio,
+                language=self.idioma.split("-")[0],
+                word_timestamps=True,
+                fp16=self.dispositivo != "cpu"
+            )
+        
+        return [
+            Palavra(item["word"].strip(), item["start"], item["end"])
+            for segmento in resultado.get("segments", [])
+            for item in segmento.get("words", [])
+            if item["word"].strip()
+        ]
+
+
+# Reconhecedores disponíveis (nome: classe)
+RECONHECEDORES = {
+    ReconhecedorGoogle.nome: ReconhecedorGoogle,
+    ReconhecedorVosk.nome: ReconhecedorVosk,
+    ReconhecedorWhisper.nome: ReconhecedorWhisper,
+    ReconhecedorStub.nome: ReconhecedorStub
+}
+
+
+def criar_reconhecedor(nome, **kwargs):
+    """
+    Cria um reconhecedor pelo nome.
+    
+    Args:
+        nome: Nome do reconhecedor (ver RECONHECEDORES)
+        **kwargs: Parâmetros do reconhecedor
+    
+    Returns:
+        Reconhecedor: Instância do reconhecedor
+    """
+    if nome not in RECONHECEDORES:
+        raise ValueError(f"Reconhecedor desconhecido: {nome}. Disponíveis: {', '.join(RECONHECEDORES)}")
+    return RECONHECEDORES[nome](**kwargs)
+
+
+def legendas_de_palavras(palavras, duracao_maxima=10, pausa=PAUSA_LEGENDA,
+                         max_caracteres=MAX_CARACTERES_LEGENDA):
+    """
+    Agrupa palavras com tempo em legendas.
+    
+    Uma legenda termina em uma pausa da fala, ao atingir a duração máxima ou
+    ao exceder o número de caracteres.
+    
+    Args:
+        palavras: Palavras em ordem, com tempos absolutos
+        duracao_maxima: Duração máxima de uma legenda em segundos
+        pausa: Silêncio entre palavras que encerra a legenda
+        max_caracteres: Tamanho máximo do texto de uma legenda
+    
+    Returns:
+        List[Dict]: Legendas com "inicio", "fim" e "texto"
+    """
+    legendas = []
+    atual = []
+    
+    def fechar():
+        if atual:
+            legendas.append({
+                "inicio": atual[0].inicio,
+                "fim": atual[-1].fim,
+                "texto": " ".join(palavra.texto for palavra in atual)
+            })
+            atual.clear()
+    
+    for palavra in palavras:
+        if atual:
+            texto = " ".join(p.texto for p in atual + [palavra])
+            if (palavra.inicio - atual[-1].fim > pausa
+                    or palavra.fim - atual[0].inicio > duracao_maxima
+                    or len(texto) > max_caracteres):
+                fechar()
+        atual.append(palavra)
+    
+    fechar()
+    return legendas
+
+
+def segmentos_de_wav(arquivo_audio, duracao_segmento=10, duracao_minima=1):
+    """
+    Divide um arquivo WAV (PCM 16 bits mono) em segmentos de duração fixa.
+    
+    Args:
+        arquivo_audio: Caminho do arquivo WAV
+        duracao_segmento: Duração de cada segmento em segundos
+        duracao_minima: Segmentos mais curtos que isso são descartados
+    
+    Yields:
+        SegmentoAudio: Segmentos na ordem do áudio
+    """
+    with wave.open(arquivo_audio, "rb") as wav:
+        taxa = wav.getframerate()
+        quadros_segmento = int(duracao_segmento * taxa)
+        inicio = 0.0
+        
+        while True:
+            pcm = wav.readframes(quadros_segmento)
+            if not pcm:
+                break
+            
+            duracao = len(pcm) / (LARGURA_AMOSTRA * wav.getnchannels() * taxa)
+            if duracao >= duracao_minima:
+                yield SegmentoAudio(inicio, inicio + duracao, pcm, taxa)
+            inicio += duracao
+
+
+class PoolReconhecimento:
+    """Pool limitado de workers que transcreve segmentos de áudio concorrentemente."""
+    
+    def __init__(self, reconhecedor, max_workers=4, max_pendentes=None):
+        """
+        Inicializa o pool.
+        
+        Args:
+            reconhecedor: Instância de Reconhecedor
+            max_workers: Número de transcrições simultâneas
+            max_pendentes: Máximo de segmentos em memória aguardando transcrição
+                (padrão: 2x max_workers)
+        """
+        self.reconhecedor = reconhecedor
+        self.max_workers = max(1, max_workers)
+        self.max_pendentes = max_pendentes or self.max_workers * 2
+        
+        # Segmentos que falharam na última transcrição (resultado incompleto)
+        self.falhas = 0
+        self._falhas_lock = threading.Lock()
+    
+    def transcrever(self, segmentos):
+        """
+        Transcreve os segmentos e retorna as legendas na ordem original.
+        
+        Args:
+            segmentos: Iterável de SegmentoAudio; geradores são consumidos sob
+                demanda, então a transcrição começa antes do fim da leitura
+        
+        Returns:
+            List[Dict]: Legendas com "inicio", "fim" e "texto" (com reconhecedores
+                de palavras com tempo, uma legenda por frase em vez de por segmento)
+        """
+        limite = threading.BoundedSemaphore(self.max_pendentes)
+        futuros = []
+        self.falhas = 0
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for segmento in segmentos:
+                # Bloqueia a leitura enquanto houver segmentos demais pendentes
+                limite.acquire()
+                futuro = executor.submit(self._reconhecer_segmento, segmento)
+                futuro.add_done_callback(lambda _: limite.release())
+                futuros.append(futuro)
+        
+        if self.reconhecedor.palavras_com_tempo:
+            palavras = [palavra for futuro in futuros for palavra in futuro.result()]
+            return legendas_de_palavras(palavras)
+        
+        legendas = []
+        for futuro in futuros:
+            inicio, fim, texto = futuro.result()
+            if texto:
+                legendas.append({
+                    "inicio": inicio,
+                    "fim": fim,
+                    "texto": texto
+                })
+        
+        return legendas
+    
+    def _reconhecer_segmento(self, segmento):
+        """Transcreve um segmento sem propagar erros (o segmento fica sem legenda)"""
+        if self.reconhecedor.palavras_com_tempo:
+            return self._reconhecer_palavras_segmento(segmento)
+        
+        try:
+            texto = self.reconhecedor.reconhecer(segmento.pcm, segmento.taxa)
+            if texto:
+                logger.debug(f"Legenda reconhecida: {texto}")
+            else:
+                logger.debug(f"Nenhuma fala reconhecida no segmento {segmento.inicio}-{segmento.fim}")
+        except ErroReconhecimento as e:
+            logger.warning(f"Erro na API de reconhecimento: {str(e)}")
+            self._registrar_falha()
+            texto = ""
+        except Exception as e:
+            logger.warning(f"Erro ao processar segmento de áudio: {str(e)}")
+            self._registrar_falha()
+            texto = ""
+        
+        return segmento.inicio, segmento.fim, texto
+    
+    def _reconhecer_palavras_segmento(self, segmento):
+        """Transcreve um segmento em palavras com tempo absoluto (lista vazia em caso de erro)"""
+        try:
+            palavras = self.reconhecedor.reconhecer_palavras(segmento.pcm, segmento.taxa)
+        except ErroReconhecimento as e:
+            logger.warning(f"Erro no reconhecedor {self.reconhecedor.nome}: {str(e)}")
+            self._registrar_falha()
+            return []
+        except Exception as e:
+            logger.warning(f"Erro ao processar segmento de áudio: {str(e)}")
+            self._registrar_falha()
+            return []
+        
+        return [
+            Palavra(palavra.texto, segmento.inicio + palavra.inicio, segmento.inicio + palavra.fim)
+            for palavra in palavras
+        ]
+    
+    def _registrar_falha(self):
+        with self._falhas_lock:
+            self.falhas += 1
+
+
+# Função de teste
+def test_pool_reconhecimento(duracao_audio=180, duracao_segmento=10, latencia=0.5):
+    """Mede o pool com o reconhecedor stub em áudio sintético."""
+    import random
+    
+    taxa = TAXA_AMOSTRAGEM
+    n_segmentos = duracao_audio // duracao_segmento
+    
+    # Alternar segmentos com "fala" (ruído) e silêncio
+    segmentos = []
+    for i in range(n_segmentos):
+        amplitude = 3000 if i % 3 else 0
+        amostras = array.array("h", (random.randint(-amplitude, amplitude) for _ in range(duracao_segmento * taxa)))
+        segmentos.append(SegmentoAudio(i * duracao_segmento, (i + 1) * duracao_segmento, amostras.tobytes(), taxa))
+    
+    reconhecedor = ReconhecedorStub(latencia=latencia)
+    print(f"Áudio sintético: {duracao_audio}s em {n_segmentos} segmentos, latência simulada de {latencia}s")
+    
+    for workers in (1, 2, 4, 8):
+        pool = PoolReconhecimento(reconhecedor, max_workers=workers)
+        inicio = time.time()
+        legendas = pool.transcrever(iter(segmentos))
+        duracao = time.time() - inicio
+        
+        em_ordem = all(a["inicio"] < b["inicio"] for a, b in zip(legendas, legendas[1:]))
+        print(f"- {workers} worker(s): {duracao:.2f}s, {len(legendas)} legendas, ordem {'ok' if em_ordem else 'INCORRETA'}")
+
+
+if __name__ == "__main__":
+    test_pool_reconhecimento()
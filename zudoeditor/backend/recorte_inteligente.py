@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Recorte Inteligente para Formatos Verticais no ZudoEditor
+
+Ao converter um vídeo horizontal para 9:16 (ou qualquer proporção mais
+estreita que a original), o recorte central corta quem está falando
+quando a pessoa não está no meio do quadro. Este módulo amostra poucos
+quadros reduzidos por segundo, localiza rostos (Haar cascade do OpenCV)
+ou, sem rostos, a região mais saliente (resíduo espectral), e calcula uma
+única vez um caminho suavizado para o centro do recorte.
+
+Durante a renderização, cada quadro só é fatiado na posição do caminho
+no seu instante: nenhuma detecção acontece por quadro.
+
+Uso:
+    python recorte_inteligente.py /caminho/para/video.mp4
+"""
+
+import os
+import sys
+import json
+import logging
+import subprocess
+
+import cv2
+import numpy as np
+
+from sonda_midia import obter_sonda
+
+logger = logging.getLogger("RecorteInteligente")
+
+# Amostragem dos quadros analisados
+AMOSTRAS_POR_SEGUNDO = 2
+LARGURA_ANALISE = 320
+
+# Desvio padrão da suavização do caminho (segundos)
+SUAVIZACAO = 1.0
+
+# Lado do mapa de saliência (pixels)
+TAMANHO_SALIENCIA = 64
+
+ARQUIVO_CASCATA = "haarcascade_frontalface_default.xml"
+
+
+def quadros_reduzidos(arquivo, largura, altura, duracao=None, amostras_por_segundo=AMOSTRAS_POR_SEGUNDO,
+                      largura_analise=LARGURA_ANALISE):
+    """
+    Decodifica poucos quadros por segundo, já reduzidos, em um pipe do ffmpeg.
+    
+    Yields:
+        Tuple[float, np.ndarray]: Instante e quadro em tons de cinza
+    """
+    altura_analise = max(2, int(round(largura_analise * altura / largura / 2)) * 2)
+    comando = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", arquivo]
+    if duracao:
+        comando += ["-t", f"{duracao:.3f}"]
+    comando += [
+        "-an",
+        "-vf", f"fps={amostras_por_segundo},scale={largura_analise}:{altura_analise}",
+        "-pix_fmt", "gray",
+        "-f", "rawvideo",
+        "pipe:1"
+    ]
+    
+    tamanho_quadro = largura_analise * altura_analise
+    processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        indice = 0
+        while True:
+            dados = processo.stdout.read(tamanho_quadro)
+            if len(dados) < tamanho_quadro:
+                break
+            # O filtro fps produz quadros nos instantes k / amostras_por_segundo
+            quadro = np.frombuffer(dados, dtype=np.uint8).reshape(altura_analise, largura_analise)
+            yield indice / amostras_por_segundo, quadro
+            indice += 1
+    finally:
+        processo.stdout.close()
+        processo.kill()
+        processo.wait()
+
+
+def saliencia_residuo_espectral(cinza, tamanho=TAMANHO_SALIENCIA):
+    """
+    Mapa de saliência pelo resíduo espectral (Hou e Zhang, 2007).
+    
+    Returns:
+        np.ndarray: Mapa (tamanho x tamanho) normalizado entre 0 e 1
+    """
+    pequeno = cv2.resize(cinza, (tamanho, tamanho), interpolation=cv2.INTER_AREA).astype(np.float32)
+    espectro = np.fft.fft2(pequeno)
+    log_amplitude = np.log(np.abs(espectro) + 1e-6).astype(np.float32)
+    residuo = log_amplitude - cv2.blur(log_amplitude, (3, 3))
+    
+    mapa = np.abs(np.fft.ifft2(np.exp(residuo + 1j * np.angle(espectro)))) ** 2
+    mapa = cv2.GaussianBlur(mapa.astype(np.float32), (0, 0), 2.5)
+    return mapa / (mapa.max() + 1e-9)
+
+
+class DetectorInteresse:
+    """Localiza o ponto de interesse de um quadro: rostos ou, sem eles, saliência."""
+    
+    def __init__(self):
+        caminho = os.path.join(cv2.data.haarcascades, ARQUIVO_CASCATA) if hasattr(cv2, "data") else ARQUIVO_CASCATA
+        self.cascata = cv2.CascadeClassifier(caminho)
+        if self.cascata.empty():
+            logger.warning(f"Cascata de rostos indisponível ({caminho}); usando apenas saliência")
+            self.cascata = None
+    
+    def centro(self, cinza):
+        """
+        Returns:
+            Tuple[float, float, str]: Centro (x, y) normalizado entre 0 e 1 e a origem
+                ("rosto" ou "saliencia")
+        """
+        altura, largura = cinza.shape
+        
+        if self.cascata is not None:
+            rostos = self.cascata.detectMultiScale(
+                cv2.equalizeHist(cinza),
+                scaleFactor=1.1,
+                minNeighbors=4,
+                minSize=(max(12, largura // 25),) * 2
+            )
+            if len(rostos):
+                # Rostos maiores (mais próximos) pesam mais
+                rostos = np.asarray(rostos, dtype=np.float64)
+                areas = rostos[:, 2] * rostos[:, 3]
+                x = np.sum((rostos[:, 0] + rostos[:, 2] / 2) * areas) / areas.sum()
+                y = np.sum((rostos[:, 1] + rostos[:, 3] / 2) * areas) / areas.sum()
+                return x / largura, y / altura, "rosto"
+        
+        mapa = saliencia_residuo_espectral(cinza) ** 2
+        total = mapa.sum()
+        if total <= 0:
+            return 0.5, 0.5, "saliencia"
+        eixo = (np.arange(mapa.shape[0]) + 0.5) / mapa.shape[0]
+        return float(mapa.sum(axis=0) @ eixo / total), float(mapa.sum(axis=1) @ eixo / total), "saliencia"
+
+
+def suavizar(valores, sigma_amostras):
+    """Suavização gaussiana com bordas replicadas"""
+    if sigma_amostras <= 0 or len(valores) < 2:
+        return valores
+    raio = int(3 * sigma_amostras)
+    nucleo = np.exp(-0.5 * (np.arange(-raio, raio + 1) / sigma_amostras) ** 2)
+    nucleo /= nucleo.sum()
+    estendido = np.pad(valores, raio, mode="edge")
+    return np.convolve(estendido, nucleo, mode="valid")
+
+
+class CaminhoRecorte:
+    """Centro do recorte ao longo do tempo, normalizado pelo quadro original."""
+    
+    def __init__(self, tempos, centros):
+        """
+        Args:
+            tempos: Instantes das amostras (segundos, crescentes)
+            centros: Centros (x, y) normalizados, um por instante
+        """
+        self.tempos = np.asarray(tempos, dtype=np.float64)
+        self.centros = np.asarray(centros, dtype=np.float64).reshape(-1, 2)
+    
+    def para_dict(self):
+        return {
+            "tempos": np.round(self.tempos, 3).tolist(),
+            "centros": np.round(self.centros, 4).tolist()
+        }
+    
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(dados["tempos"], dados["centros"])
+    
+    def posicionador(self, tamanho_video, tamanho_recorte):
+        """
+        Pré-calcula as posições do recorte para um tamanho de vídeo.
+        
+        Args:
+            tamanho_video: (largura, altura) do quadro original
+            tamanho_recorte: (largura, altura) da janela recortada
+        
+        Returns:
+            Callable[[float], Tuple[int, int]]: Canto superior esquerdo no instante t
+        """
+        largura, altura = tamanho_video
+        largura_recorte, altura_recorte = tamanho_recorte
+        cantos_x = np.clip(self.centros[:, 0] * largura - largura_recorte / 2, 0, largura - largura_recorte)
+        cantos_y = np.clip(self.centros[:, 1] * altura - altura_recorte / 2, 0, altura - altura_recorte)
+        
+        if not len(self.tempos):
+            centro = ((largura - largura_recorte) // 2, (altura - altura_recorte) // 2)
+            return lambda t: centro
+        
+        def posicao(t):
+            return (
+                int(np.interp(t, self.tempos, cantos_x)),
+                int(np.interp(t, self.tempos, cantos_y))
+            )
+        
+        return posicao
+
+
+def analisar(arquivo, info=None, duracao=None, amostras_por_segundo=AMOSTRAS_POR_SEGUNDO, suavizacao=SUAVIZACAO):
+    """
+    Calcula o caminho de recorte de um vídeo.
+    
+    Args:
+        arquivo: Vídeo a analisar
+        info: Resumo do vídeo (ver SondaMidia.info_video); consultado se ausente
+        duracao: Segundos analisados a partir do início (padrão: todo o vídeo)
+        amostras_por_segundo: Quadros analisados por segundo
+        suavizacao: Desvio padrão da suavização do caminho (segundos)
+    
+    Returns:
+        CaminhoRecorte: Caminho suavizado (vazio se o vídeo não puder ser lido)
+    """
+    info = info or obter_sonda().info_video(arquivo) or {}
+    if not info.get("largura") or not info.get("altura"):
+        return CaminhoRecorte([], [])
+    
+    detector = DetectorInteresse()
+    tempos, centros, origens = [], [], []
+    for tempo, quadro in quadros_reduzidos(arquivo, info["largura"], info["altura"], duracao, amostras_por_segundo):
+        x, y, origem = detector.centro(quadro)
+        tempos.append(tempo)
+        centros.append((x, y))
+        origens.append(origem)
+    
+    if not tempos:
+        return CaminhoRecorte([], [])
+    
+    centros = np.array(centros)
+    sigma = suavizacao * amostras_por_segundo
+    centros = np.stack([suavizar(centros[:, 0], sigma), suavizar(centros[:, 1], sigma)], axis=1)
+    
+    logger.info(
+        f"Caminho de recorte calculado: {len(tempos)} amostras, "
+        f"{origens.count('rosto')} com rostos"
+    )
+    return CaminhoRecorte(tempos, centros)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(analisar(sys.argv[1]).para_dict()))
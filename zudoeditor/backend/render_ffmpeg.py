@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Backend de Renderização ffmpeg para o Processador de Vídeo
+
+Este módulo compila as operações de edição das plataformas (recorte e
+escala, filtros de cor, legendas, CTA e marca d'água) em um único
+filter_complex do ffmpeg, executado em um só subprocesso. Várias
+plataformas podem ser geradas pela mesma decodificação com o filtro split.
+
+Operações que o filtergraph não consegue expressar (ou filtros ausentes
+na build local do ffmpeg) são detectadas por motivo_incompatibilidade(),
+e o processador volta a usar o caminho MoviePy.
+
+Também oferece o recorte prévio por stream copy, que limita entradas
+longas à duração usada pelas plataformas antes de qualquer decodificação,
+e a leitura e o embutimento de legendas SRT dos vídeos do gerador.
+"""
+
+import os
+import logging
+import subprocess
+from functools import lru_cache
+
+from sobreposicoes import TEXTO_MARCA_DAGUA, POSICAO_MARCA_DAGUA, MARGEM_DIREITA
+
+logger = logging.getLogger("RenderFFmpeg")
+
+# Filtros do ffmpeg usados pelo backend (lut1d/lut3d só com ajuste de cor, ver filtro_cor)
+FILTROS_NECESSARIOS = ["crop", "scale", "drawtext", "split"]
+FILTRO_LEGENDAS = "subtitles"
+
+# Marca gravada nos metadados (tag comment) dos vídeos do gerador
+MARCA_GERADOR = "ZudoEditor Gerador"
+
+
+@lru_cache(maxsize=1)
+def filtros_disponiveis():
+    """Retorna o conjunto de filtros suportados pelo ffmpeg instalado"""
+    try:
+        resultado = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-filters"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+    except Exception as e:
+        logger.warning(f"Não foi possível consultar os filtros do ffmpeg: {str(e)}")
+        return frozenset()
+    
+    filtros = set()
+    for linha in resultado.stdout.splitlines():
+        partes = linha.split()
+        # Formato: " TSC nome  A->A  descrição"
+        if len(partes) >= 3 and "->" in partes[2]:
+            filtros.add(partes[1])
+    return frozenset(filtros)
+
+
+def motivo_incompatibilidade(info_video, configs, legendas, cadeia_cor=None):
+    """
+    Verifica se a edição pode ser expressa como filtergraph.
+    
+    Args:
+        info_video: Informações do vídeo de entrada (ver ProcessadorVideo._extrair_info_video)
+        configs: Configurações das plataformas a renderizar
+        legendas: Lista de legendas a queimar no vídeo
+        cadeia_cor: Ajuste de cor (filtros_cor.CadeiaCor); lut1d/lut3d só são
+            exigidos se ele alterar as cores
+    
+    Returns:
+        str: Motivo da incompatibilidade, ou None se o backend ffmpeg puder ser usado
+    """
+    disponiveis = filtros_disponiveis()
+    necessarios = list(FILTROS_NECESSARIOS)
+    if legendas:
+        necessarios.append(FILTRO_LEGENDAS)
+    if cadeia_cor is not None and not cadeia_cor.compilar().identidade:
+        necessarios.append("lut1d" if cadeia_cor.por_canal else "lut3d")
+    
+    faltando = [filtro for filtro in necessarios if filtro not in disponiveis]
+    if faltando:
+        return f"filtros ausentes no ffmpeg: {', '.join(faltando)}"
+    
+    if not info_video.get("largura") or not info_video.get("altura"):
+        return "dimensões do vídeo de entrada desconhecidas"
+    
+    for config in configs:
+        for coordenada in config["posicao_cta"]:
+            if coordenada not in ("center", "right") and not isinstance(coordenada, (int, float)):
+                return f"posição de CTA não suportada: {config['posicao_cta']}"
+    
+    return None
+
+
+def escapar_valor(valor):
+    """Escapa um valor de opção para os dois níveis de parsing do filtergraph"""
+    valor = str(valor)
+    # Nível das opções do filtro
+    for caractere in ("\\", "'", ":"):
+        valor = valor.replace(caractere, "\\" + caractere)
+    # Nível do filtergraph: entre aspas simples
+    return "'" + valor.replace("'", "'\\''") + "'"
+
+
+def _formatar_tempo_srt(segundos):
+    """Formata o tempo no formato SRT (HH:MM:SS,mmm)"""
+    milissegundos = int(round(segundos * 1000))
+    horas, milissegundos = divmod(milissegundos, 3600000)
+    minutos, milissegundos = divmod(milissegundos, 60000)
+    segundos, milissegundos = divmod(milissegundos, 1000)
+    return f"{horas:02d}:{minutos:02d}:{segundos:02d},{milissegundos:03d}"
+
+
+def escrever_srt(legendas, caminho):
+    """Escreve as legendas do processador (inicio, fim, texto) em um arquivo SRT"""
+    with open(caminho, "w", encoding="utf-8") as f:
+        for indice, legenda in enumerate(legendas, 1):
+            f.write(f"{indice}\n")
+            f.write(f"{_formatar_tempo_srt(legenda['inicio'])} --> {_formatar_tempo_srt(legenda['fim'])}\n")
+            f.write(f"{legenda['texto']}\n\n")
+    return caminho
+
+
+def embutir_legendas(arquivo_video, arquivo_srt=None, comentario=None, idioma="por"):
+    """
+    Substitui as faixas de legenda do vídeo pelo SRT (mov_text), sem recodificar.
+    
+    Vídeo e áudio são copiados; sem SRT, as faixas de legenda são apenas
+    removidas. O arquivo é substituído ao final, então leitores nunca veem
+    um vídeo parcial.
+    
+    Args:
+        arquivo_video: Vídeo MP4/MOV alterado no lugar
+        arquivo_srt: Legendas a embutir (opcional)
+        comentario: Tag comment gravada nos metadados (ex.: MARCA_GERADOR)
+        idioma: Código ISO 639-2 da faixa de legenda
+    """
+    base, extensao = os.path.splitext(arquivo_video)
+    temporario = f"{base}.legendas{extensao}"
+    
+    comando = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", arquivo_video]
+    if arquivo_srt:
+        comando += ["-i", arquivo_srt]
+    comando += ["-map", "0", "-map", "-0:s"]
+    if arquivo_srt:
+        comando += ["-map", "1:0"]
+    comando += ["-c", "copy"]
+    if arquivo_srt:
+        comando += ["-c:s", "mov_text", "-metadata:s:s:0", f"language={idioma}"]
+    if comentario:
+        comando += ["-metadata", f"comment={comentario}"]
+    comando += ["-movflags", "+faststart", temporario]
+    
+    resultado = subprocess.run(
+        comando,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    
+    if resultado.returncode != 0:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise Exception(f"Erro ao embutir legendas: {resultado.stderr.strip()}")
+    
+    os.replace(temporario, arquivo_video)
+    return arquivo_video
+
+
+def _ler_tempo_srt(texto):
+    """Converte HH:MM:SS,mmm em segundos"""
+    horas, minutos, resto = texto.strip().replace(".", ",").split(":")
+    segundos, milissegundos = resto.split(",")
+    return int(horas) * 3600 + int(minutos) * 60 + int(segundos) + int(milissegundos) / 1000
+
+
+def ler_srt(caminho):
+    """Lê um arquivo SRT como legendas do processador (inicio, fim, texto)"""
+    with open(caminho, "r", encoding="utf-8-sig") as f:
+        blocos = f.read().replace("\r\n", "\n").strip().split("\n\n")
+    
+    legendas = []
+    for bloco in blocos:
+        linhas = [linha for linha in bloco.split("\n") if linha.strip()]
+        indice_tempo = next((i for i, linha in enumerate(linhas) if "-->" in linha), None)
+        if indice_tempo is None:
+            continue
+        
+        inicio, fim = linhas[indice_tempo].split("-->")
+        legendas.append({
+            "inicio": _ler_tempo_srt(inicio),
+            "fim": _ler_tempo_srt(fim.split()[0]),
+            "texto": " ".join(linhas[indice_tempo + 1:])
+        })
+    return legendas
+
+
+def extrair_legendas(arquivo_entrada, arquivo_srt):
+    """Extrai a primeira faixa de legenda de um vídeo para SRT (sem decodificar vídeo e áudio)"""
+    resultado = subprocess.run(
+        [
+            "ffmpeg", "-y",
+            "-hide_banner",
+            "-loglevel", "error",
+            "-i", arquivo_entrada,
+            "-map", "0:s:0",
+            "-f", "srt",
+            arquivo_srt
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    
+    if resultado.returncode != 0:
+        raise Exception(f"Erro ao extrair legendas: {resultado.stderr.strip()}")
+    
+    return arquivo_srt
+
+
+def filtro_recorte_escala(largura_atual, altura_atual, resolucao_alvo):
+    """Recorte central e escala, equivalente a ProcessadorVideo._redimensionar_video"""
+    largura_alvo, altura_alvo = resolucao_alvo
+    proporcao_atual = largura_atual / altura_atual
+    proporcao_alvo = largura_alvo / altura_alvo
+    
+    if proporcao_atual > proporcao_alvo:
+        # Vídeo é mais largo que o alvo, cortar laterais
+        nova_largura = int(altura_atual * proporcao_alvo)
+        x1, y1 = (largura_atual - nova_largura) // 2, 0
+        recorte = (nova_largura, altura_atual, x1, y1)
+    else:
+        # Vídeo é mais alto que o alvo, cortar topo e base
+        nova_altura = int(largura_atual / proporcao_alvo)
+        x1, y1 = 0, (altura_atual - nova_altura) // 2
+        recorte = (largura_atual, nova_altura, x1, y1)
+    
+    return "crop={}:{}:{}:{},scale={}:{}".format(*recorte, largura_alvo, altura_alvo)
+
+
+def filtro_cor(cadeia_cor, pasta):
+    """
+    Cadeia de cor de _aplicar_filtros como lut1d/lut3d (ver filtros_cor).
+    
+    Returns:
+        str: Filtro do ffmpeg, ou None se a cadeia não alterar as cores
+    """
+    if cadeia_cor.compilar().identidade:
+        return None
+    exportado = cadeia_cor.exportar_ffmpeg(pasta)
+    if exportado is None:
+        return None
+    filtro, arquivo_cube = exportado
+    return f"{filtro}=file={escapar_valor(arquivo_cube)}"
+
+
+def filtro_legendas(arquivo_srt):
+    """Queima as legendas com estilo próximo ao de _adicionar_legendas"""
+    estilo = "Fontname=Arial,Bold=1,Fontsize=16,PrimaryColour=&H00FFFFFF,BackColour=&H80000000,BorderStyle=3,Outline=1,Alignment=2"
+    return f"subtitles=filename={escapar_valor(arquivo_srt)}:force_style={escapar_valor(estilo)}"
+
+
+def filtro_texto(texto, fontsize, cor, posicao, bg_cor=None):
+    """Monta um drawtext para o CTA ou a marca d'água (posição como em sobreposicoes.posicionar)"""
+    pos_x, pos_y = posicao
+    if pos_x == "center":
+        x = "(w-text_w)/2"
+    elif pos_x == "right":
+        x = f"w-text_w-w*{MARGEM_DIREITA}"
+    else:
+        x = f"w*{pos_x}"
+    y = "(h-text_h)/2" if pos_y == "center" else f"h*{pos_y}"
+    
+    opcoes = [
+        f"text={escapar_valor(texto)}",
+        "expansion=none",
+        "font=Arial",
+        f"fontsize={fontsize}",
+        f"fontcolor={cor}",
+        "borderw=1",
+        "bordercolor=black",
+        f"x={x}",
+        f"y={y}"
+    ]
+    
+    if bg_cor:
+        opcoes += ["box=1", f"boxcolor={_cor_ffmpeg(bg_cor)}", "boxborderw=8"]
+    
+    return "drawtext=" + ":".join(opcoes)
+
+
+def _cor_ffmpeg(cor):
+    """Converte 'rgba(r,g,b,a)' para a notação 0xRRGGBB@a do ffmpeg"""
+    if cor.startswith("rgba("):
+        r, g, b, a = [v.strip() for v in cor[5:-1].split(",")]
+        return f"0x{int(r):02x}{int(g):02x}{int(b):02x}@{float(a)}"
+    return cor
+
+
+def montar_comando(arquivo_entrada, info_video, saidas, arquivo_srt=None, threads=4, tem_audio=True,
+                   filtro_cor=None, arquivo_audio=None):
+    """
+    Monta o comando ffmpeg que renderiza todas as saídas em um único processo.
+    
+    Args:
+        arquivo_entrada: Vídeo de entrada
+        info_video: Informações do vídeo de entrada (largura, altura)
+        saidas: Lista de dicionários com "arquivo", "config" (PLATAFORMAS), "duracao"
+            e, opcionalmente, "encoder" ("preset", "crf" e "threads" do libx264)
+        arquivo_srt: Legendas a queimar (opcional)
+        threads: Threads do encoder por saída (sem "encoder" na saída)
+        tem_audio: Se a entrada possui faixa de áudio
+        filtro_cor: Filtro de cor (ver filtro_cor), ou None para não alterar as cores
+        arquivo_audio: Áudio já codificado (ver codificar_audio), copiado em todas as saídas
+    
+    Returns:
+        list: Argumentos do comando
+    """
+    resolucao = saidas[0]["config"]["resolucao"]
+    
+    # Camadas comuns: recorte/escala, cor, legendas e marca d'água
+    cadeia = [filtro_recorte_escala(info_video["largura"], info_video["altura"], resolucao)]
+    if filtro_cor:
+        cadeia.append(filtro_cor)
+    if arquivo_srt:
+        cadeia.append(filtro_legendas(arquivo_srt))
+    cadeia.append(filtro_texto(TEXTO_MARCA_DAGUA, 30, "white", POSICAO_MARCA_DAGUA))
+    
+    rotulos = [f"[base{i}]" for i in range(len(saidas))]
+    grafo = [f"[0:v]{','.join(cadeia)},split={len(saidas)}{''.join(rotulos)}"]
+    
+    # Camada específica de cada plataforma: CTA
+    for i, saida in enumerate(saidas):
+        config = saida["config"]
+        cta = filtro_texto(config["texto_cta"], 40, config["cor_cta"], config["posicao_cta"], config["bg_cta"])
+        grafo.append(f"{rotulos[i]}{cta}[saida{i}]")
+    
+    comando = [
+        "ffmpeg", "-y",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", arquivo_entrada
+    ]
+    if arquivo_audio:
+        comando += ["-i", arquivo_audio]
+    comando += ["-filter_complex", ";".join(grafo)]
+    
+    for i, saida in enumerate(saidas):
+        encoder = saida.get("encoder") or {"preset": "medium", "threads": threads}
+        comando += ["-map", f"[saida{i}]"]
+        if arquivo_audio:
+            # Cortado por pacote em -t, sem recodificar
+            comando += ["-map", "1:a:0", "-c:a", "copy"]
+        elif tem_audio:
+            comando += ["-map", "0:a:0", "-c:a", "aac"]
+        comando += [
+            "-t", f"{saida['duracao']:.3f}",
+            "-c:v", "libx264",
+            "-preset", encoder["preset"],
+            "-threads", str(encoder["threads"])
+        ]
+        if "crf" in encoder:
+            comando += ["-crf", str(encoder["crf"])]
+        comando += [
+            "-pix_fmt", "yuv420p",
+            saida["arquivo"]
+        ]
+    
+    return comando
+
+
+def renderizar(comando):
+    """Executa o comando de renderização e levanta exceção em caso de erro"""
+    logger.info(f"Renderizando com ffmpeg: {' '.join(comando[-1:])}")
+    resultado = subprocess.run(
+        comando,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    
+    if resultado.returncode != 0:
+        raise Exception(f"Erro na renderização ffmpeg: {resultado.stderr.strip()[-2000:]}")
+
+
+def quadro_chave_apos(arquivo, instante, janela=30):
+    """
+    Localiza o primeiro quadro-chave do vídeo em ou após um instante.
+    
+    Args:
+        arquivo: Vídeo de entrada
+        instante: Instante em segundos
+        janela: Segundos analisados após o instante
+    
+    Returns:
+        float: Instante do quadro-chave, ou None se não houver um na janela
+    """
+    resultado = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "v:0",
+            "-read_intervals", f"{instante}%+{janela}",
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0",
+            arquivo
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    
+    if resultado.returncode != 0:
+        raise Exception(f"Erro ao localizar quadros-chave: {resultado.stderr.strip()}")
+    
+    for linha in resultado.stdout.splitlines():
+        partes = linha.strip().split(",")
+        if len(partes) < 2 or partes[0] in ("", "N/A"):
+            continue
+        
+        tempo = float(partes[0])
+        if tempo >= instante and "K" in partes[1]:
+            return tempo
+    
+    return None
+
+
+def recortar_copia(arquivo_entrada, arquivo_saida, duracao):
+    """
+    Recorta o início do vídeo sem recodificar (stream copy).
+    
+    A duração deve terminar em um quadro-chave (ver quadro_chave_apos) para
+    que todos os quadros mantidos possam ser decodificados.
+    """
+    comando = [
+        "ffmpeg", "-y",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", arquivo_entrada,
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+        "-t", f"{duracao:.3f}",
+        "-c", "copy",
+        "-avoid_negative_ts", "make_zero",
+        arquivo_saida
+    ]
+    logger.info(f"Recortando entrada com stream copy: {duracao:.1f}s")
+    
+    resultado = subprocess.run(
+        comando,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    
+    if resultado.returncode != 0:
+        raise Exception(f"Erro no recorte da entrada: {resultado.stderr.strip()[-2000:]}")
+    
+    return arquivo_saida
+
+
+def codificar_audio(arquivo_entrada, arquivo_saida, duracao=None, ganho_db=None, bitrate="192k"):
+    """
+    Codifica a faixa de áudio uma única vez em AAC, para ser copiada nas saídas.
+    
+    Args:
+        arquivo_entrada: Vídeo de entrada
+        arquivo_saida: Arquivo .m4a de saída
+        duracao: Segundos codificados a partir do início (padrão: todo o áudio)
+        ganho_db: Ganho aplicado antes da codificação (normalização de loudness)
+        bitrate: Bitrate do AAC
+    """
+    comando = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", arquivo_entrada]
+    if duracao:
+        comando += ["-t", f"{duracao:.3f}"]
+    comando += ["-map", "0:a:0", "-vn"]
+    if ganho_db:
+        comando += ["-af", f"volume={ganho_db:.2f}dB"]
+    comando += ["-c:a", "aac", "-b:a", bitrate, "-ar", "44100", arquivo_saida]
+    
+    resultado = subprocess.run(
+        comando,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    
+    if resultado.returncode != 0:
+        raise Exception(f"Erro ao codificar o áudio: {resultado.stderr.strip()[-2000:]}")
+    
+    return arquivo_saida
+
+
+def parametros_audio_copiado(arquivo_audio):
+    """
+    Parâmetros de saída do writer do MoviePy para o áudio de codificar_audio.
+    
+    O áudio é copiado sem recodificar e cortado por pacote junto com o fim
+    do vídeo; sem áudio codificado, o MoviePy segue com o próprio áudio.
+    """
+    return ["-shortest"] if arquivo_audio else []
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Sobreposições Pré-renderizadas (CTA e Marca d'Água) para o ZudoEditor
+
+Os textos sobrepostos aos vídeos (CTA das plataformas e marca d'água) são
+sempre os mesmos. Em vez de compor um TextClip sobre cada quadro, cada
+texto é rasterizado uma única vez por estilo e resolução em uma imagem
+RGBA com alfa pré-multiplicado, recortada à área efetivamente desenhada e
+guardada em cache (memória e disco). A mistura é feita no próprio quadro,
+só na área coberta, com aritmética inteira e buffers pré-alocados.
+
+Uso:
+    python sobreposicoes.py "Texto" /caminho/para/saida.png
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+from sonda_midia import DIR_CACHE_PADRAO
+
+logger = logging.getLogger("Sobreposicoes")
+
+# Pasta das sobreposições rasterizadas
+DIR_SOBREPOSICOES = os.path.join(DIR_CACHE_PADRAO, "sobreposicoes")
+
+# Estilos usados pelo processador (parâmetros do TextClip do MoviePy)
+ESTILO_CTA = {
+    "fontsize": 40,
+    "font": "Arial-Bold",
+    "method": "caption",
+    "align": "center",
+    "stroke_color": "black",
+    "stroke_width": 1
+}
+ESTILO_MARCA_DAGUA = {
+    "fontsize": 30,
+    "color": "white",
+    "bg_color": "transparent",
+    "font": "Arial-Bold",
+    "stroke_color": "black",
+    "stroke_width": 1
+}
+
+# Texto e posição relativa da marca d'água (encostada à direita)
+TEXTO_MARCA_DAGUA = "eBook"
+POSICAO_MARCA_DAGUA = ("right", 0.05)
+
+# Distância da borda direita na posição "right" (fração da largura do vídeo)
+MARGEM_DIREITA = 0.05
+
+# Imagens RGBA já rasterizadas nesta execução
+_cache_rgba = {}
+_cache_lock = threading.Lock()
+
+
+def _chave(texto, estilo, tamanho_video):
+    partes = {"texto": texto, "estilo": estilo, "tamanho_video": list(tamanho_video)}
+    return hashlib.sha1(json.dumps(partes, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def rasterizar_texto(texto, estilo):
+    """
+    Rasteriza um texto com o TextClip do MoviePy.
+    
+    Returns:
+        np.ndarray: Imagem RGBA uint8 (alfa não pré-multiplicado)
+    """
+    from moviepy.editor import TextClip
+    
+    clip = TextClip(texto, **estilo)
+    try:
+        rgb = clip.get_frame(0)
+        if clip.mask is not None:
+            alfa = np.round(clip.mask.get_frame(0) * 255)
+        else:
+            alfa = np.full(rgb.shape[:2], 255)
+    finally:
+        clip.close()
+    
+    return np.dstack((rgb, alfa)).astype(np.uint8)
+
+
+def obter_rgba(texto, estilo, tamanho_video, pasta=DIR_SOBREPOSICOES):
+    """
+    Retorna a imagem RGBA de um texto, rasterizando apenas na primeira vez.
+    
+    Args:
+        texto: Texto a desenhar
+        estilo: Parâmetros do TextClip (cor, fonte, tamanho...)
+        tamanho_video: (largura, altura) do vídeo de destino
+        pasta: Pasta do cache em disco
+    """
+    chave = _chave(texto, estilo, tamanho_video)
+    with _cache_lock:
+        if chave in _cache_rgba:
+            return _cache_rgba[chave]
+    
+    arquivo = os.path.join(pasta, f"{chave}.npy")
+    rgba = None
+    if os.path.exists(arquivo):
+        try:
+            rgba = np.load(arquivo)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Sobreposição em cache inválida {arquivo}: {str(e)}")
+    
+    if rgba is None:
+        rgba = rasterizar_texto(texto, estilo)
+        try:
+            os.makedirs(pasta, exist_ok=True)
+            descritor, temporario = tempfile.mkstemp(dir=pasta, suffix=".npy")
+            with os.fdopen(descritor, "wb") as f:
+                np.save(f, rgba)
+            os.replace(temporario, arquivo)
+        except OSError as e:
+            logger.warning(f"Não foi possível guardar a sobreposição em cache: {str(e)}")
+    
+    with _cache_lock:
+        _cache_rgba[chave] = rgba
+    return rgba
+
+
+def posicionar(tamanho_imagem, posicao, tamanho_video):
+    """
+    Canto superior esquerdo, na convenção de set_position(posicao, relative=True).
+    
+    x também aceita "right": a imagem termina a MARGEM_DIREITA da borda
+    direita, qualquer que seja a sua largura.
+    """
+    largura, altura = tamanho_imagem
+    largura_video, altura_video = tamanho_video
+    pos_x, pos_y = posicao
+    if pos_x == "center":
+        x = (largura_video - largura) // 2
+    elif pos_x == "right":
+        x = largura_video - largura - int(MARGEM_DIREITA * largura_video)
+    else:
+        x = int(pos_x * largura_video)
+    y = (altura_video - altura) // 2 if pos_y == "center" else int(pos_y * altura_video)
+    return x, y
+
+
+class Sobreposicao:
+    """Imagem RGBA pré-multiplicada misturada no lugar sobre quadros RGB uint8."""
+    
+    def __init__(self, rgba, x, y):
+        """
+        Prepara a sobreposição.
+        
+        Args:
+            rgba: Imagem RGBA uint8 (alfa não pré-multiplicado)
+            x, y: Posição do canto superior esquerdo no quadro (pode ser negativa)
+        """
+        # Recortar à área efetivamente desenhada (alfa > 0)
+        linhas = np.flatnonzero(rgba[:, :, 3].any(axis=1))
+        colunas = np.flatnonzero(rgba[:, :, 3].any(axis=0))
+        if len(linhas):
+            rgba = rgba[linhas[0]:linhas[-1] + 1, colunas[0]:colunas[-1] + 1]
+            x, y = x + int(colunas[0]), y + int(linhas[0])
+        else:
+            rgba = rgba[:0, :0]
+        
+        alfa = rgba[:, :, 3:4].astype(np.uint16)
+        # cor * alfa e (255 - alfa), ambos na escala 0-255²
+        self._cor = rgba[:, :, :3].astype(np.uint16) * alfa
+        self._inverso = 255 - alfa
+        self.x, self.y = x, y
+        
+        # Buffers por formato de quadro: área coberta, mistura e fundo original
+        self._areas = {}
+    
+    @classmethod
+    def de_texto(cls, texto, estilo, posicao, tamanho_video):
+        """Sobreposição de um texto (rasterizado uma vez, ver obter_rgba)"""
+        rgba = obter_rgba(texto, estilo, tamanho_video)
+        x, y = posicionar((rgba.shape[1], rgba.shape[0]), posicao, tamanho_video)
+        return cls(rgba, x, y)
+    
+    def _area(self, forma):
+        """Recorte da sobreposição aos limites de um quadro, com seus buffers"""
+        area = self._areas.get(forma)
+        if area is None:
+            altura_quadro, largura_quadro = forma[:2]
+            altura, largura = self._cor.shape[:2]
+            x0, y0 = max(self.x, 0), max(self.y, 0)
+            x1 = min(self.x + largura, largura_quadro)
+            y1 = min(self.y + altura, altura_quadro)
+            
+            if x1 <= x0 or y1 <= y0:
+                area = False
+            else:
+                origem = (slice(y0 - self.y, y1 - self.y), slice(x0 - self.x, x1 - self.x))
+                area = {
+                    "destino": (slice(y0, y1), slice(x0, x1), slice(0, 3)),
+                    "cor": self._cor[origem],
+                    "inverso": self._inverso[origem],
+                    "mistura": np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint16),
+                    "fundo": np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+                }
+            self._areas[forma] = area
+        return area
+    
+    def aplicar(self, quadro):
+        """
+        Mistura a sobreposição no quadro (H, W, 3) uint8, no lugar.
+        
+        A área coberta é guardada antes da mistura e pode ser devolvida com
+        desfazer(), para reaproveitar o mesmo quadro em outra saída.
+        
+        Returns:
+            np.ndarray: O quadro (cópia se o original for somente leitura)
+        """
+        if not quadro.flags.writeable:
+            quadro = quadro.copy()
+        
+        area = self._area(quadro.shape)
+        if not area:
+            return quadro
+        
+        regiao = quadro[area["destino"]]
+        mistura = area["mistura"]
+        np.copyto(area["fundo"], regiao)
+        
+        # (fundo * (255 - alfa) + cor * alfa) / 255, arredondado, sem ponto flutuante
+        np.multiply(regiao, area["inverso"], out=mistura)
+        mistura += area["cor"]
+        mistura += 128
+        mistura += mistura >> 8
+        mistura >>= 8
+        np.copyto(regiao, mistura, casting="unsafe")
+        return quadro
+    
+    def desfazer(self, quadro):
+        """Devolve ao quadro a área coberta pela última chamada a aplicar()"""
+        area = self._area(quadro.shape)
+        if area:
+            np.copyto(quadro[area["destino"]], area["fundo"])
+        return quadro
+    
+    __call__ = aplicar
+
+
+if __name__ == "__main__":
+    from PIL import Image
+    
+    logging.basicConfig(level=logging.INFO)
+    estilo = dict(ESTILO_CTA, color="white", bg_color="rgba(0,0,0,0.7)")
+    Image.fromarray(obter_rgba(sys.argv[1], estilo, (1920, 1080))).save(sys.argv[2])
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Sonda de Mídia com Cache Persistente para o ZudoEditor
+
+Este módulo centraliza as chamadas ao ffprobe feitas pelo monitor de pasta,
+pelo processador de vídeo e pelo gerador de vídeos. Os resultados ficam em
+um índice SQLite em disco, indexado por (caminho, tamanho, mtime, inode):
+uma nova sonda do mesmo arquivo inalterado é respondida sem subprocesso.
+
+Uso:
+    python sonda_midia.py /caminho/para/video.mp4
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import logging
+import threading
+import subprocess
+
+logger = logging.getLogger("SondaMidia")
+
+# Diretório padrão dos caches persistentes do ZudoEditor
+DIR_CACHE_PADRAO = os.environ.get(
+    "ZUDO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".zudoeditor", "cache")
+)
+
+
+class SondaMidia:
+    """Executa o ffprobe e guarda os resultados em um índice em disco."""
+    
+    def __init__(self, caminho_indice=None):
+        """
+        Inicializa a sonda.
+        
+        Args:
+            caminho_indice: Caminho do banco SQLite do índice (opcional)
+        """
+        self.caminho_indice = caminho_indice or os.path.join(DIR_CACHE_PADRAO, "sondas.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho_indice)), exist_ok=True)
+        
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        self._local = threading.local()
+        
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sondas (
+                    caminho TEXT PRIMARY KEY,
+                    tamanho INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    resultado TEXT
+                )
+                """
+            )
+    
+    def _conexao(self):
+        """Retorna a conexão SQLite da thread atual"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho_indice, timeout=30)
+            # WAL permite leituras concorrentes do monitor e dos processadores
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+    
+    def sondar(self, caminho):
+        """
+        Retorna o resultado do ffprobe (format e streams) de um arquivo.
+        
+        Args:
+            caminho: Caminho do arquivo de mídia
+        
+        Returns:
+            Dict: JSON do ffprobe, ou None se o arquivo não for uma mídia válida
+        """
+        try:
+            estado = os.stat(caminho)
+        except OSError as e:
+            logger.error(f"Arquivo não encontrado para sonda: {caminho} ({str(e)})")
+            return None
+        
+        chave = (os.path.realpath(caminho), estado.st_size, estado.st_mtime_ns, estado.st_ino)
+        
+        try:
+            linha = self._conexao().execute(
+                "SELECT resultado FROM sondas WHERE caminho = ? AND tamanho = ? AND mtime_ns = ? AND inode = ?",
+                chave
+            ).fetchone()
+            if linha is not None:
+                return json.loads(linha[0]) if linha[0] else None
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao consultar índice de sondas: {str(e)}")
+        
+        try:
+            resultado = self._executar_ffprobe(caminho)
+        except Exception as e:
+            # Falhas ao executar o ffprobe não são gravadas no índice
+            logger.error(f"Erro ao executar ffprobe em {caminho}: {str(e)}")
+            return None
+        
+        try:
+            conexao = self._conexao()
+            with conexao:
+                conexao.execute(
+                    "INSERT OR REPLACE INTO sondas (caminho, tamanho, mtime_ns, inode, resultado) VALUES (?, ?, ?, ?, ?)",
+                    chave + (json.dumps(resultado) if resultado is not None else None,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar índice de sondas: {str(e)}")
+        
+        return resultado
+    
+    def _executar_ffprobe(self, caminho):
+        """Executa o ffprobe e retorna o JSON, ou None se o arquivo não for uma mídia válida"""
+        resultado = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-show_format",
+                "-show_streams",
+                "-of", "json",
+                caminho
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        
+        if resultado.returncode != 0:
+            logger.debug(f"ffprobe falhou para {caminho}: {resultado.stderr.strip()}")
+            return None
+        
+        return json.loads(resultado.stdout)
+    
+    def validar(self, caminho):
+        """Verifica se o arquivo é uma mídia válida"""
+        return self.sondar(caminho) is not None
+    
+    def info_video(self, caminho):
+        """
+        Retorna um resumo do vídeo no formato usado pelo processador.
+        
+        Returns:
+            Dict: duracao, tamanho, bitrate, largura, altura, codecs e tem_audio
+                (None se o arquivo não for uma mídia válida)
+        """
+        dados = self.sondar(caminho)
+        if dados is None:
+            return None
+        
+        streams = dados.get("streams", [])
+        formato = dados.get("format", {})
+        
+        video_stream = next((s for s in streams if s.get("codec_type") == "video"), None)
+        audio_stream = next((s for s in streams if s.get("codec_type") == "audio"), None)
+        
+        return {
+            "duracao": float(formato.get("duration", 0)),
+            "tamanho": int(formato.get("size", 0)),
+            "bitrate": int(formato.get("bit_rate", 0)),
+            "largura": int(video_stream.get("width", 0)) if video_stream else 0,
+            "altura": int(video_stream.get("height", 0)) if video_stream else 0,
+            "codec_video": video_stream.get("codec_name") if video_stream else None,
+            "codec_audio": audio_stream.get("codec_name") if audio_stream else None,
+            "tem_audio": audio_stream is not None
+        }
+
+
+# Instância compartilhada por processo
+_sonda = None
+_sonda_lock = threading.Lock()
+
+
+def obter_sonda():
+    """Retorna a instância compartilhada de SondaMidia"""
+    global _sonda
+    with _sonda_lock:
+        if _sonda is None:
+            _sonda = SondaMidia()
+        return _sonda
+
+
+def _descartar_sonda():
+    """Descarta a instância herdada após fork (conexões SQLite não sobrevivem ao fork)"""
+    global _sonda
+    _sonda = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_descartar_sonda)
+
+
+if __name__ == "__main__":
+    for arquivo in sys.argv[1:]:
+        print(json.dumps(obter_sonda().info_video(arquivo), indent=4))
@@ -35,6 +35,15 @@ except ImportError as e:
     logger.error("Instale as dependências necessárias: pip install numpy pillow moviepy SpeechRecognition")
     sys.exit(1)
 
+# Cache de transcrições compartilhado com o processador de vídeo (opcional)
+try:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import audio_pcm
+    import cache_transcricao
+except ImportError as e:
+    logger.warning(f"Cache de transcrições indisponível: {e}")
+    cache_transcricao = None
+
 class SubtitleStyle:
     """Estilos de legenda disponíveis."""
     STANDARD = "standard"
@@ -354,6 +363,12 @@ class SubtitleManager:
                 logger.warning("Whisper não está instalado. Usando método alternativo.")
             
             if use_whisper:
+                # Transcrição já feita para este áudio?
+                cache, chave = self._consultar_cache_transcricao(audio_path, "whisper", "tiny")
+                subtitles = cache.obter(chave) if cache else None
+                if subtitles is not None:
+                    return subtitles
+                
                 # Usar Whisper para transcrição com timestamps
                 model = whisper.load_model("tiny")
                 result = model.transcribe(audio_path, word_timestamps=True)
@@ -371,6 +386,9 @@ class SubtitleManager:
                     }
                     subtitles.append(subtitle)
                 
+                if cache:
+                    cache.guardar(chave, subtitles)
+                
                 return subtitles
             
             # Método alternativo usando SpeechRecognition
@@ -379,6 +397,11 @@ class SubtitleManager:
                 return self.generate_subtitle_timing_from_text(text)
             
             else:
+                cache, chave = self._consultar_cache_transcricao(audio_path, "google")
+                subtitles = cache.obter(chave) if cache else None
+                if subtitles is not None:
+                    return subtitles
+                
                 # Tentar usar SpeechRecognition para transcrição
                 recognizer = sr.Recognizer()
                 with sr.AudioFile(audio_path) as source:
@@ -386,7 +409,11 @@ class SubtitleManager:
                     text = recognizer.recognize_google(audio_data)
                 
                 # Gerar timing baseado no texto
-                return self.generate_subtitle_timing_from_text(text)
+                subtitles = self.generate_subtitle_timing_from_text(text)
+                if cache:
+                    cache.guardar(chave, subtitles)
+                
+                return subtitles
         
         except Exception as e:
             logger.error(f"Erro ao gerar timing das legendas: {e}")
@@ -403,6 +430,29 @@ class SubtitleManager:
                     "end": audio_clip.duration
                 }]
     
+    def _consultar_cache_transcricao(self, audio_path: str, recognizer: str, model: str = None):
+        """
+        Calcula a chave do cache de transcrições para um áudio.
+        
+        Args:
+            audio_path: Caminho para o arquivo de áudio
+            recognizer: Nome do reconhecedor
+            model: Modelo do reconhecedor
+            
+        Returns:
+            Tuple: (cache, chave), ou (None, None) se o cache não estiver disponível
+        """
+        if cache_transcricao is None:
+            return None, None
+        
+        try:
+            impressao = cache_transcricao.impressao_blocos(audio_pcm.stream_pcm(audio_path))
+            cache = cache_transcricao.obter_cache()
+            return cache, cache.chave(impressao, recognizer, modelo=model, formato="subtitle_manager")
+        except Exception as e:
+            logger.warning(f"Não foi possível consultar o cache de transcrições: {e}")
+            return None, None
+    
     def create_subtitle_clips(self, subtitles: List[Dict], style: str = SubtitleStyle.STANDARD, 
                              position: str = SubtitlePosition.BOTTOM, video_size: Tuple[int, int] = (1920, 1080)) -> List[TextClip]:
         """
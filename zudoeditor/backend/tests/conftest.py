@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do backend se importam pelo nome (ver sys.path.append nos scripts)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+import numpy as np
+
+import cache_transcricao
+import deteccao_voz
+from reconhecimento_fala import TAXA_AMOSTRAGEM
+
+
+def _narracao(atraso):
+    """Dois trechos de "fala" (ruído) separados por uma pausa, após atraso segundos de silêncio"""
+    gerador = np.random.default_rng(7)
+    
+    def silencio(segundos):
+        return np.zeros(int(segundos * TAXA_AMOSTRAGEM), dtype=np.int16)
+    
+    def fala(segundos):
+        return (gerador.standard_normal(int(segundos * TAXA_AMOSTRAGEM)) * 3000).astype(np.int16)
+    
+    return np.concatenate([silencio(1 + atraso), fala(4), silencio(1), fala(3), silencio(1)])
+
+
+def _segmentos(amostras):
+    return list(deteccao_voz.segmentos_fala([amostras]))
+
+
+def test_fala_deslocada_no_tempo_nao_reaproveita_cache(tmp_path):
+    segmentos = _segmentos(_narracao(0))
+    deslocados = _segmentos(_narracao(3))
+    assert len(segmentos) == len(deslocados) == 2
+    assert [s.pcm for s in segmentos] == [s.pcm for s in deslocados]
+    
+    cache = cache_transcricao.CacheTranscricao(str(tmp_path / "transcricoes.db"))
+    chave = cache.chave(cache_transcricao.impressao_segmentos(segmentos), "teste")
+    cache.guardar(chave, [{"inicio": s.inicio, "fim": s.fim, "texto": "x"} for s in segmentos])
+    
+    chave_deslocada = cache.chave(cache_transcricao.impressao_segmentos(deslocados), "teste")
+    assert chave_deslocada != chave
+    assert cache.obter(chave_deslocada) is None
+    assert cache.obter(chave) is not None
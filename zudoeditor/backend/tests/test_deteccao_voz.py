@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import deteccao_voz
+from reconhecimento_fala import TAXA_AMOSTRAGEM
+
+
+def _silencio(segundos, gerador):
+    # Ruído de fundo fraco, como em uma gravação real
+    return (gerador.standard_normal(int(segundos * TAXA_AMOSTRAGEM)) * 5).astype(np.int16)
+
+
+def _tom(segundos, frequencia=300):
+    t = np.arange(int(segundos * TAXA_AMOSTRAGEM)) / TAXA_AMOSTRAGEM
+    return (np.sin(2 * np.pi * frequencia * t) * 3000).astype(np.int16)
+
+
+def _audio(*trechos):
+    """Concatena ("fala"|"pausa", segundos) e devolve o PCM e os intervalos de fala"""
+    gerador = np.random.default_rng(3)
+    partes, falas, instante = [], [], 0.0
+    for tipo, segundos in trechos:
+        partes.append(_tom(segundos) if tipo == "fala" else _silencio(segundos, gerador))
+        if tipo == "fala":
+            falas.append((instante, instante + segundos))
+        instante += segundos
+    return np.concatenate(partes), falas
+
+
+def _intervalos(amostras, **opcoes):
+    return [(s.inicio, s.fim) for s in deteccao_voz.segmentos_fala([amostras], **opcoes)]
+
+
+def test_trechos_seguem_a_fala_com_margem():
+    amostras, falas = _audio(("pausa", 1), ("fala", 2), ("pausa", 1.5), ("fala", 1), ("pausa", 1))
+    intervalos = _intervalos(amostras)
+    
+    assert len(intervalos) == len(falas)
+    tolerancia = deteccao_voz.MARGEM_TRECHO + 2 * deteccao_voz.DURACAO_QUADRO
+    for (inicio, fim), (inicio_fala, fim_fala) in zip(intervalos, falas):
+        assert inicio <= inicio_fala <= inicio + tolerancia
+        assert fim - tolerancia <= fim_fala <= fim
+
+
+def test_pcm_do_segmento_corresponde_aos_tempos():
+    amostras, _ = _audio(("pausa", 1), ("fala", 2), ("pausa", 1))
+    segmento, = deteccao_voz.segmentos_fala([amostras])
+    inicio = round(segmento.inicio * TAXA_AMOSTRAGEM)
+    fim = round(segmento.fim * TAXA_AMOSTRAGEM)
+    assert segmento.pcm == amostras[inicio:fim].tobytes()
+    assert segmento.taxa == TAXA_AMOSTRAGEM
+
+
+def test_pausa_curta_nao_separa_e_ruido_curto_e_descartado():
+    amostras, _ = _audio(
+        ("pausa", 1), ("fala", 1), ("pausa", 0.15), ("fala", 1),  # pausa curta: um trecho só
+        ("pausa", 2), ("fala", 0.1),  # estalo: descartado
+        ("pausa", 2)
+    )
+    assert len(_intervalos(amostras)) == 1
+
+
+def test_silencio_nao_gera_trechos():
+    amostras = _silencio(5, np.random.default_rng(1))
+    assert _intervalos(amostras) == []
+
+
+def test_fala_longa_e_dividida():
+    # Silêncio suficiente para estimar o ruído de fundo (percentil 10 da energia)
+    amostras, _ = _audio(("pausa", 3), ("fala", 25), ("pausa", 3))
+    intervalos = _intervalos(amostras, duracao_maxima=8)
+    
+    assert len(intervalos) >= 4
+    assert all(fim - inicio <= 8 + 1e-6 for inicio, fim in intervalos)
+    # Os pedaços são contíguos
+    assert all(fim == pytest.approx(proximo) for (_, fim), (proximo, _) in zip(intervalos, intervalos[1:]))
+
+
+def test_streaming_em_blocos_equivale_a_analise_unica():
+    amostras, _ = _audio(*[(tipo, segundos) for _ in range(6) for tipo, segundos in (("pausa", 1.2), ("fala", 2.5))])
+    bloco = TAXA_AMOSTRAGEM // 10
+    blocos = [amostras[i:i + bloco] for i in range(0, len(amostras), bloco)]
+    
+    em_blocos = [(s.inicio, s.fim) for s in deteccao_voz.segmentos_fala(blocos, janela=5)]
+    assert len(em_blocos) == 6
+    for (inicio, fim), (inicio_unico, fim_unico) in zip(em_blocos, _intervalos(amostras)):
+        assert inicio == pytest.approx(inicio_unico, abs=deteccao_voz.DURACAO_QUADRO)
+        assert fim == pytest.approx(fim_unico, abs=deteccao_voz.DURACAO_QUADRO)
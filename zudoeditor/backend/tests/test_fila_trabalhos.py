@@ -0,0 +1,118 @@
+import socket
+import subprocess
+import time
+
+import pytest
+
+import fila_trabalhos
+from fila_trabalhos import FilaTrabalhos
+
+
+@pytest.fixture
+def fila(tmp_path):
+    return FilaTrabalhos(str(tmp_path / "fila.db"), duracao_lease=60, max_tentativas=2)
+
+
+@pytest.fixture
+def dono_encerrado():
+    processo = subprocess.Popen(["true"])
+    processo.wait()
+    return f"{socket.gethostname()}:{processo.pid}"
+
+
+@pytest.fixture
+def processador():
+    processo = subprocess.Popen(["sleep", "30"])
+    yield processo
+    processo.kill()
+    processo.wait()
+
+
+def test_reivindica_por_prioridade_e_duracao(fila):
+    fila.enfileirar("/v/longo", "a.mp4", duracao=600)
+    fila.enfileirar("/v/curto", "b.mp4", duracao=30)
+    fila.enfileirar("/v/urgente", "c.mp4", prioridade=5, duracao=900)
+    fila.enfileirar("/v/sem_duracao", "d.mp4")
+    
+    ordem = [fila.reivindicar("monitor")["pasta_video"] for _ in range(4)]
+    assert ordem == ["/v/urgente", "/v/curto", "/v/longo", "/v/sem_duracao"]
+    assert fila.reivindicar("monitor") is None
+    assert fila.contar(fila_trabalhos.ESTADO_PROCESSANDO) == 4
+
+
+def test_lease_vencido_volta_a_fila(tmp_path):
+    fila = FilaTrabalhos(str(tmp_path / "fila.db"), duracao_lease=0.05)
+    trabalho = fila.enfileirar("/v/a", "a.mp4")
+    fila.reivindicar("outro-host:1")
+    assert fila.recuperar() == []
+    
+    time.sleep(0.1)
+    recuperados = fila.recuperar()
+    assert [t["id"] for t in recuperados] == [trabalho["id"]]
+    assert recuperados[0]["estado"] == fila_trabalhos.ESTADO_NA_FILA
+    assert recuperados[0]["dono"] is None
+
+
+def test_renovar_adia_o_vencimento(tmp_path):
+    fila = FilaTrabalhos(str(tmp_path / "fila.db"), duracao_lease=0.3)
+    trabalho = fila.enfileirar("/v/a", "a.mp4")
+    fila.reivindicar("monitor")
+    time.sleep(0.2)
+    fila.renovar([trabalho["id"]], "monitor")
+    time.sleep(0.2)
+    assert fila.recuperar() == []
+
+
+def test_limite_de_tentativas(fila):
+    trabalho = fila.enfileirar("/v/a", "a.mp4")
+    
+    fila.reivindicar("monitor")
+    assert fila.falhar(trabalho["id"], "monitor", "falhou")["estado"] == fila_trabalhos.ESTADO_NA_FILA
+    
+    fila.reivindicar("monitor")
+    final = fila.falhar(trabalho["id"], "monitor", "falhou de novo")
+    assert final["estado"] == fila_trabalhos.ESTADO_ERRO
+    assert final["tentativas"] == 2
+    assert final["mensagem_erro"] == "falhou de novo"
+    assert fila.reivindicar("monitor") is None
+
+
+def test_dono_encerrado_sem_processador_volta_a_fila(fila, dono_encerrado):
+    trabalho = fila.enfileirar("/v/a", "a.mp4")
+    fila.reivindicar(dono_encerrado)
+    
+    assert fila.recuperar() == []
+    recuperados = fila.recuperar(incluir_orfaos=True)
+    assert [t["id"] for t in recuperados] == [trabalho["id"]]
+    assert recuperados[0]["estado"] == fila_trabalhos.ESTADO_NA_FILA
+
+
+def test_processador_vivo_e_adotado(fila, dono_encerrado, processador):
+    trabalho = fila.enfileirar("/v/a", "a.mp4")
+    fila.reivindicar(dono_encerrado)
+    fila.registrar_processo(trabalho["id"], dono_encerrado, processador.pid)
+    
+    assert fila.recuperar(incluir_orfaos=True) == []
+    adotados = fila.adotar("novo-monitor")
+    assert [t["id"] for t in adotados] == [trabalho["id"]]
+    assert adotados[0]["dono"] == "novo-monitor"
+    assert adotados[0]["estado"] == fila_trabalhos.ESTADO_PROCESSANDO
+    assert fila.adotar("outro-monitor") == []
+
+
+def test_pid_reutilizado_conta_como_encerrado(fila, dono_encerrado, processador):
+    trabalho = fila.enfileirar("/v/a", "a.mp4")
+    fila.reivindicar(dono_encerrado)
+    fila.registrar_processo(trabalho["id"], dono_encerrado, processador.pid)
+    processo = fila.obter(trabalho["id"])["processo"]
+    assert fila_trabalhos.processo_vivo(processo)
+    
+    # Mesmo pid, outro início: um processo qualquer que herdou o pid
+    host, pid, inicio = processo.split(":")
+    reutilizado = f"{host}:{pid}:{int(inicio) + 1}"
+    assert not fila_trabalhos.processo_vivo(reutilizado)
+    
+    conexao = fila._conexao()
+    conexao.execute("UPDATE trabalhos SET processo = ? WHERE id = ?", (reutilizado, trabalho["id"]))
+    assert fila.adotar("novo-monitor") == []
+    assert [t["id"] for t in fila.recuperar(incluir_orfaos=True)] == [trabalho["id"]]
@@ -0,0 +1,48 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from filtros_cor import CadeiaCor
+
+
+def _todas_as_cores(passo=3):
+    eixo = np.arange(0, 256, passo, dtype=np.uint8)
+    r, g, b = np.meshgrid(eixo, eixo, eixo, indexing="ij")
+    return np.stack((r, g, b), axis=-1)
+
+
+def test_tabelas_compiladas_seguem_a_avaliacao_direta():
+    # Contraste e brilho saturam antes da saturação, que mistura os canais
+    cadeia = CadeiaCor().contraste(1.6).brilho(40).saturacao(1.8)
+    quadro = _todas_as_cores()
+    
+    compilado = cadeia.compilar().aplicar(quadro.copy()).astype(np.int16)
+    direto = np.clip(np.round(cadeia.avaliar(quadro)), 0, 255).astype(np.int16)
+    
+    # Só resta o erro da amostragem da tabela 3D (7 bits por canal)
+    assert np.abs(compilado - direto).max() <= 3
+
+
+def test_cadeia_so_por_canal_e_exata():
+    cadeia = CadeiaCor().contraste(1.2).brilho(10).gama(1.3)
+    quadro = _todas_as_cores(1)
+    
+    compilado = cadeia.compilar().aplicar(quadro.copy())
+    direto = np.clip(np.round(cadeia.avaliar(quadro)), 0, 255).astype(np.uint8)
+    assert (compilado == direto).all()
+
+
+def test_exportacoes_simultaneas_da_mesma_lut(tmp_path):
+    cadeia = CadeiaCor().contraste(1.2).saturacao(1.3)
+    caminho = str(tmp_path / "cor.cube")
+    
+    with ThreadPoolExecutor(8) as executor:
+        filtros = list(executor.map(lambda _: cadeia.exportar_cube(caminho, tamanho=9), range(16)))
+    
+    assert set(filtros) == {"lut3d"}
+    assert os.listdir(tmp_path) == ["cor.cube"]
+    with open(caminho, encoding="utf-8") as f:
+        linhas = f.read().splitlines()
+    assert linhas[1] == "LUT_3D_SIZE 9"
+    assert len(linhas) == 2 + 9 ** 3
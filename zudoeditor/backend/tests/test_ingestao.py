@@ -0,0 +1,85 @@
+import errno
+import os
+
+import pytest
+
+pytest.importorskip("watchdog")
+
+import indice_duplicatas
+import monitor_pasta
+
+
+def _sem_suporte(*args, **kwargs):
+    raise OSError(errno.EXDEV, "outro dispositivo")
+
+
+@pytest.fixture
+def origem(tmp_path):
+    (tmp_path / "entrada").mkdir()
+    (tmp_path / "job").mkdir()
+    caminho = tmp_path / "entrada" / "video.mp4"
+    caminho.write_bytes(os.urandom(64 * 1024))
+    return str(caminho)
+
+
+def _destino(origem):
+    return os.path.join(os.path.dirname(os.path.dirname(origem)), "job", "video.mp4")
+
+
+def test_rename_e_preferido(origem):
+    conteudo = open(origem, "rb").read()
+    destino = _destino(origem)
+    
+    assert monitor_pasta.ingerir(origem, destino) == "rename"
+    assert not os.path.exists(origem)
+    assert open(destino, "rb").read() == conteudo
+
+
+def test_hardlink_quando_o_rename_falha(origem, monkeypatch):
+    monkeypatch.setitem(monitor_pasta._INGESTORES, "rename", _sem_suporte)
+    destino = _destino(origem)
+    
+    assert monitor_pasta.ingerir(origem, destino) == "hardlink"
+    assert os.path.samefile(origem, destino)
+
+
+def test_copia_calcula_o_hash_completo(origem, monkeypatch):
+    for metodo in ("rename", "hardlink", "reflink"):
+        monkeypatch.setitem(monitor_pasta._INGESTORES, metodo, _sem_suporte)
+    destino = _destino(origem)
+    resumo = indice_duplicatas.novo_resumo()
+    
+    assert monitor_pasta.ingerir(origem, destino, resumo=resumo) == "copia"
+    assert os.path.exists(origem)
+    assert not os.path.samefile(origem, destino)
+    assert resumo.hexdigest() == indice_duplicatas.hash_completo(destino)
+
+
+def test_ultimo_metodo_propaga_o_erro(origem, monkeypatch):
+    monkeypatch.setitem(monitor_pasta._INGESTORES, "rename", _sem_suporte)
+    monkeypatch.setitem(monitor_pasta._INGESTORES, "hardlink", _sem_suporte)
+    with pytest.raises(OSError):
+        monitor_pasta.ingerir(origem, _destino(origem), metodos=("rename", "hardlink"))
+
+
+def test_manter_entrada_nunca_usa_hardlink():
+    assert monitor_pasta.metodos_ingestao() == monitor_pasta.METODOS_INGESTAO
+    metodos = monitor_pasta.metodos_ingestao(manter_entrada=True)
+    assert "hardlink" not in metodos
+    assert "rename" not in metodos
+    assert metodos[-1] == "copia"
+
+
+def test_manter_entrada_isola_o_job_de_um_novo_arquivo_de_mesmo_nome(origem):
+    conteudo = open(origem, "rb").read()
+    destino = _destino(origem)
+    
+    metodo = monitor_pasta.ingerir(origem, destino, monitor_pasta.metodos_ingestao(manter_entrada=True))
+    assert metodo in ("reflink", "copia")
+    assert os.path.exists(origem)
+    
+    # cp sobre o mesmo nome trunca e reescreve o arquivo no lugar
+    with open(origem, "r+b") as f:
+        f.truncate(0)
+        f.write(b"outro video")
+    assert open(destino, "rb").read() == conteudo
@@ -0,0 +1,49 @@
+import os
+import pickle
+
+import metadados_job
+
+
+def _gravar(pasta, dados):
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, "metadados.json")
+    metadados_job.gravar_metadados(caminho, dados)
+    return caminho
+
+
+def test_duplicata_le_status_e_resultados_atuais_do_original(tmp_path):
+    original = str(tmp_path / "video_original")
+    _gravar(original, {"status": "na_fila"})
+    duplicata = _gravar(str(tmp_path / "video_copia"), {"status": "duplicado", "duplicata_de": original})
+    
+    lida = metadados_job.ler_metadados_resolvidos(duplicata)
+    assert lida["status"] == "duplicado"
+    assert lida["status_original"] == "na_fila"
+    assert lida["resultados"] == {}
+    
+    # O original termina depois que a duplicata foi criada
+    resultados = {"youtube": {"arquivo": os.path.join(original, "video_youtube.mp4")}}
+    _gravar(original, {"status": "concluido", "resultados": resultados})
+    
+    lida = metadados_job.ler_metadados_resolvidos(duplicata)
+    assert lida["status_original"] == "concluido"
+    assert lida["resultados"] == resultados
+    # A resolução não é gravada na pasta da duplicata
+    assert "resultados" not in metadados_job.ler_metadados(duplicata)
+
+
+def test_metadados_comuns_nao_sao_alterados(tmp_path):
+    caminho = _gravar(str(tmp_path / "video"), {"status": "concluido", "resultados": {}})
+    assert metadados_job.ler_metadados_resolvidos(caminho) == metadados_job.ler_metadados(caminho)
+    assert metadados_job.ler_metadados_resolvidos(str(tmp_path / "ausente.json"), {}) == {}
+
+
+def test_gravador_desserializado_e_descarregado_ao_sair(tmp_path):
+    caminho = str(tmp_path / "metadados.json")
+    copia = pickle.loads(pickle.dumps(metadados_job.GravadorMetadados(caminho, intervalo=60)))
+    assert copia in metadados_job._gravadores
+    
+    copia.salvar({"status": "processando"})
+    assert not os.path.exists(caminho)
+    metadados_job._descarregar_todos()
+    assert metadados_job.ler_metadados(caminho) == {"status": "processando"}
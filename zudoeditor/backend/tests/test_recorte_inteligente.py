@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from recorte_inteligente import CaminhoRecorte, suavizar
+
+VIDEO = (1920, 1080)
+RECORTE = (608, 1080)  # 9:16 na altura do original
+
+
+def test_interpola_entre_as_amostras():
+    caminho = CaminhoRecorte([0.0, 2.0], [(0.25, 0.5), (0.75, 0.5)])
+    posicao = caminho.posicionador(VIDEO, RECORTE)
+    
+    inicio = int(0.25 * 1920 - 304)
+    fim = int(0.75 * 1920 - 304)
+    assert posicao(0.0) == (inicio, 0)
+    assert posicao(2.0) == (fim, 0)
+    assert posicao(1.0) == ((inicio + fim) // 2, 0)
+
+
+def test_limita_a_janela_ao_quadro():
+    caminho = CaminhoRecorte([0.0, 1.0, 2.0], [(0.0, 0.0), (0.5, 0.5), (1.0, 1.0)])
+    posicao = caminho.posicionador(VIDEO, (608, 600))
+    
+    assert posicao(0.0) == (0, 0)
+    assert posicao(2.0) == (1920 - 608, 1080 - 600)
+    # Fora do intervalo amostrado vale a amostra mais próxima
+    assert posicao(-5.0) == posicao(0.0)
+    assert posicao(60.0) == posicao(2.0)
+
+
+def test_janela_sempre_dentro_do_quadro():
+    gerador = np.random.default_rng(5)
+    tempos = np.arange(40) / 2
+    caminho = CaminhoRecorte(tempos, gerador.uniform(-0.5, 1.5, (40, 2)))
+    posicao = caminho.posicionador(VIDEO, RECORTE)
+    
+    for t in np.linspace(-1, 21, 200):
+        x, y = posicao(t)
+        assert 0 <= x <= 1920 - 608
+        assert y == 0
+
+
+def test_caminho_vazio_usa_o_recorte_central():
+    posicao = CaminhoRecorte([], []).posicionador(VIDEO, RECORTE)
+    assert posicao(0.0) == posicao(10.0) == ((1920 - 608) // 2, 0)
+
+
+def test_ida_e_volta_por_dict():
+    caminho = CaminhoRecorte([0.0, 0.5, 1.0], [(0.2, 0.5), (0.4, 0.5), (0.6, 0.5)])
+    copia = CaminhoRecorte.de_dict(caminho.para_dict())
+    posicao, posicao_copia = caminho.posicionador(VIDEO, RECORTE), copia.posicionador(VIDEO, RECORTE)
+    assert all(posicao(t) == posicao_copia(t) for t in (0.0, 0.3, 0.7, 1.0))
+
+
+def test_suavizar_preserva_constantes_e_bordas():
+    assert np.allclose(suavizar(np.full(20, 0.3), 2), 0.3)
+    degrau = np.concatenate((np.zeros(20), np.ones(20)))
+    suave = suavizar(degrau, 2)
+    assert len(suave) == len(degrau)
+    assert suave[0] == pytest.approx(0) and suave[-1] == pytest.approx(1)
+    assert np.all(np.diff(suave) >= 0)
@@ -0,0 +1,90 @@
+import pytest
+
+import render_ffmpeg
+
+
+def test_srt_ida_e_volta(tmp_path):
+    legendas = [
+        {"inicio": 0.0, "fim": 1.5, "texto": "Olá, mundo"},
+        {"inicio": 61.237, "fim": 64.001, "texto": "Segunda legenda: com dois-pontos"},
+        {"inicio": 3725.5, "fim": 3727.25, "texto": "Depois de uma hora"}
+    ]
+    caminho = render_ffmpeg.escrever_srt(legendas, str(tmp_path / "legendas.srt"))
+    
+    lidas = render_ffmpeg.ler_srt(caminho)
+    assert [legenda["texto"] for legenda in lidas] == [legenda["texto"] for legenda in legendas]
+    for lida, original in zip(lidas, legendas):
+        assert lida["inicio"] == pytest.approx(original["inicio"], abs=1e-3)
+        assert lida["fim"] == pytest.approx(original["fim"], abs=1e-3)
+
+
+def test_formato_dos_tempos_srt(tmp_path):
+    caminho = render_ffmpeg.escrever_srt(
+        [{"inicio": 3725.5, "fim": 3727.0004, "texto": "x"}], str(tmp_path / "legendas.srt")
+    )
+    with open(caminho, encoding="utf-8") as f:
+        assert f.read() == "1\n01:02:05,500 --> 01:02:07,000\nx\n\n"
+
+
+def test_ler_srt_de_outros_geradores(tmp_path):
+    caminho = tmp_path / "externo.srt"
+    # BOM, CRLF, ponto nos milissegundos, texto em duas linhas e posição após o tempo
+    caminho.write_bytes(
+        "\ufeff1\r\n00:00:01.000 --> 00:00:02,500 X1:10 X2:20\r\nPrimeira\r\nlinha\r\n\r\n"
+        "2\r\n00:00:03,000 --> 00:00:04,000\r\nSegunda\r\n".encode("utf-8")
+    )
+    
+    assert render_ffmpeg.ler_srt(str(caminho)) == [
+        {"inicio": 1.0, "fim": 2.5, "texto": "Primeira linha"},
+        {"inicio": 3.0, "fim": 4.0, "texto": "Segunda"}
+    ]
+
+
+def _saidas():
+    config = {
+        "resolucao": (1080, 1920),
+        "texto_cta": "Link na bio",
+        "posicao_cta": ("center", 0.85),
+        "cor_cta": "white",
+        "bg_cta": "rgba(0,0,0,0.5)"
+    }
+    return [
+        {"arquivo": "/saida/instagram.mp4", "config": config, "duracao": 90},
+        {"arquivo": "/saida/tiktok.mp4", "config": config, "duracao": 60}
+    ]
+
+
+def _argumentos_da_saida(comando, indice):
+    """Argumentos da saída de índice dado, do seu -map de vídeo até o arquivo"""
+    inicio = comando.index(f"[saida{indice}]") - 1
+    return comando[inicio:comando.index(_saidas()[indice]["arquivo"])]
+
+
+def test_audio_compartilhado_e_copiado_em_todas_as_saidas():
+    info = {"largura": 1920, "altura": 1080}
+    comando = render_ffmpeg.montar_comando("/entrada.mp4", info, _saidas(), arquivo_audio="/temp/audio_saida.m4a")
+    
+    assert comando[comando.index("-i", comando.index("/entrada.mp4")) + 1] == "/temp/audio_saida.m4a"
+    for indice, saida in enumerate(_saidas()):
+        argumentos = _argumentos_da_saida(comando, indice)
+        assert argumentos[:6] == ["-map", f"[saida{indice}]", "-map", "1:a:0", "-c:a", "copy"]
+        assert argumentos[argumentos.index("-t") + 1] == f"{saida['duracao']:.3f}"
+        assert "aac" not in argumentos
+
+
+def test_sem_audio_compartilhado_o_audio_da_entrada_e_codificado():
+    info = {"largura": 1920, "altura": 1080}
+    comando = render_ffmpeg.montar_comando("/entrada.mp4", info, _saidas())
+    assert comando.count("-i") == 1
+    for indice in range(len(_saidas())):
+        argumentos = _argumentos_da_saida(comando, indice)
+        assert "0:a:0" in argumentos
+        assert argumentos[argumentos.index("-c:a") + 1] == "aac"
+    
+    sem_audio = render_ffmpeg.montar_comando("/entrada.mp4", info, _saidas(), tem_audio=False)
+    assert "-c:a" not in sem_audio
+
+
+def test_writer_do_moviepy_corta_o_audio_copiado_no_fim_do_video():
+    assert render_ffmpeg.parametros_audio_copiado("/temp/audio_saida.m4a") == ["-shortest"]
+    assert render_ffmpeg.parametros_audio_copiado(None) == []
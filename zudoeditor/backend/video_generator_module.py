@@ -34,6 +34,8 @@ try:
     from text_to_speech_component import TTSManager
     from background_selection_system import BackgroundManager, BackgroundType
     from subtitle_synchronization_mechanism import SubtitleManager, SubtitleStyle, SubtitlePosition
+    from ajuste_encoder import parametros_encoder, parametros_ffmpeg, PERFIL_GERADOR
+    from render_ffmpeg import embutir_legendas, MARCA_GERADOR
     
     # Importar dependências externas
     import numpy as np
@@ -61,6 +63,12 @@ class VideoGeneratorConfig:
         self.audio_codec = kwargs.get("audio_codec", "aac")
         self.audio_bitrate = kwargs.get("audio_bitrate", "192k")
         
+        # Preset, CRF e threads do libx264 (padrão: medidos por ajuste_encoder.py)
+        encoder = parametros_encoder(PERFIL_GERADOR)
+        self.video_preset = kwargs.get("video_preset", encoder["preset"])
+        self.video_crf = kwargs.get("video_crf", encoder["crf"])
+        self.video_threads = kwargs.get("video_threads", encoder["threads"])
+        
         # Configurações de TTS
         self.tts_engine = kwargs.get("tts_engine", None)  # Usar padrão do TTSManager
         self.tts_voice = kwargs.get("tts_voice", None)    # Usar padrão do motor selecionado
@@ -74,6 +82,8 @@ class VideoGeneratorConfig:
         self.subtitle_style = kwargs.get("subtitle_style", SubtitleStyle.MODERN)
         self.subtitle_position = kwargs.get("subtitle_position", SubtitlePosition.BOTTOM)
         self.export_subtitle_file = kwargs.get("export_subtitle_file", True)
+        # False: legendas só como faixa mov_text (sem composição por quadro)
+        self.burn_subtitles = kwargs.get("burn_subtitles", True)
         
         # Configurações de saída
         self.output_dir = kwargs.get("output_dir", os.path.join(os.path.dirname(os.path.abspath(__file__)), "output"))
@@ -235,18 +245,21 @@ class VideoGenerator:
             subtitles = self.subtitle_manager.generate_subtitle_timing_from_audio(audio_path, text)
             
             # 4. Exportar arquivo de legenda (opcional)
-            if self.config.export_subtitle_file:
+            subtitle_path = None
+            if self.config.export_subtitle_file or not self.config.burn_subtitles:
                 subtitle_path = os.path.splitext(output_path)[0] + ".srt"
                 self.subtitle_manager.export_subtitles_file(subtitles, subtitle_path)
             
-            # 5. Criar clips de legenda
-            logger.info("Criando clips de legenda...")
-            subtitle_clips = self.subtitle_manager.create_subtitle_clips(
-                subtitles,
-                style=self.config.subtitle_style,
-                position=self.config.subtitle_position,
-                video_size=(self.config.video_width, self.config.video_height)
-            )
+            # 5. Criar clips de legenda (apenas se forem queimadas no vídeo)
+            subtitle_clips = []
+            if self.config.burn_subtitles:
+                logger.info("Criando clips de legenda...")
+                subtitle_clips = self.subtitle_manager.create_subtitle_clips(
+                    subtitles,
+                    style=self.config.subtitle_style,
+                    position=self.config.subtitle_position,
+                    video_size=(self.config.video_width, self.config.video_height)
+                )
             
             # 6. Criar clip de fundo
             logger.info("Criando clip de fundo...")
@@ -262,7 +275,7 @@ class VideoGenerator:
             # 7. Combinar áudio, fundo e legendas
             logger.info("Combinando elementos do vídeo...")
             video_with_audio = background_clip.set_audio(audio_clip)
-            final_clip = CompositeVideoClip([video_with_audio] + subtitle_clips)
+            final_clip = CompositeVideoClip([video_with_audio] + subtitle_clips) if subtitle_clips else video_with_audio
             
             # 8. Exportar vídeo final
             logger.info(f"Exportando vídeo final para {output_path}...")
@@ -271,9 +284,22 @@ class VideoGenerator:
                 codec=self.config.video_codec,
                 audio_codec=self.config.audio_codec,
                 audio_bitrate=self.config.audio_bitrate,
-                fps=self.config.video_fps
+                fps=self.config.video_fps,
+                preset=self.config.video_preset,
+                threads=self.config.video_threads,
+                ffmpeg_params=parametros_ffmpeg({"crf": self.config.video_crf}) + [
+                    "-metadata", f"comment={MARCA_GERADOR}"
+                ]
             )
             
+            # Legendas com o tempo exato da narração embutidas no vídeo: o
+            # processador as reaproveita em vez de refazer o reconhecimento de fala
+            if subtitle_path:
+                try:
+                    embutir_legendas(output_path, subtitle_path, comentario=MARCA_GERADOR)
+                except Exception as e:
+                    logger.warning(f"Não foi possível embutir as legendas: {e}")
+            
             # 9. Limpar arquivos temporários
             audio_clip.close()
             final_clip.close()
@@ -281,7 +307,10 @@ class VideoGenerator:
             logger.info(f"Vídeo gerado com sucesso: {output_path}")
             
             # 10. Copiar para pasta de entrada do ZudoEditor (para processamento adicional)
+            # O SRT é copiado antes do vídeo, para já estar lá quando o monitor detectá-lo
             input_copy_path = os.path.join(self.config.input_dir, output_filename)
+            if subtitle_path:
+                shutil.copy2(subtitle_path, os.path.splitext(input_copy_path)[0] + ".srt")
             shutil.copy2(output_path, input_copy_path)
             logger.info(f"Vídeo copiado para pasta de entrada: {input_copy_path}")
             
@@ -31,6 +31,9 @@ except ImportError as e:
     print("O painel funcionará em modo limitado.")
     BACKEND_IMPORTS_OK = False
 
+# Leitura dos metadados dos jobs (só biblioteca padrão, disponível mesmo em modo limitado)
+from backend import metadados_job
+
 class ZudoEditorApp:
     def __init__(self, root):
         self.root = root
@@ -726,19 +729,18 @@ class ZudoEditorApp:
             dir_saida = os.path.join(self.dir_raiz, "saida")
             os.makedirs(dir_saida, exist_ok=True)
             
-            # Inicializar processador
-            processador = ProcessadorVideo(video_path, dir_saida)
-            
-            # Atualizar metadados com plataformas selecionadas
-            processador.metadados["plataformas"] = plataformas
-            processador._salvar_metadados()
+            # Inicializar processador com as plataformas selecionadas
+            processador = ProcessadorVideo(video_path, dir_saida, plataformas=plataformas)
             
             # Processar vídeo
             resultado = processador.processar()
             
-            # Atualizar interface na thread principal
-            self.root.after(0, lambda: self._finalizar_edicao(resultado, dir_saida))
+            # Status final lido do metadados.json gravado pelo processador
+            erro = None if resultado else self._erro_job(dir_saida)
             
+            # Atualizar interface na thread principal
+            self.root.after(0, lambda: self._finalizar_edicao(resultado, dir_saida, erro))
+        
         except Exception as e:
             # Atualizar interface na thread principal
             self.root.after(0, lambda: self._finalizar_edicao(False, None, str(e)))
@@ -1007,27 +1009,23 @@ class ZudoEditorApp:
                 dir_saida = os.path.join(self.dir_raiz, "saida")
                 os.makedirs(dir_saida, exist_ok=True)
                 
-                # Inicializar processador
-                processador = ProcessadorVideo(resultado_video, dir_saida)
-                
-                # Atualizar metadados com plataformas selecionadas
-                processador.metadados["plataformas"] = plataformas
-                processador._salvar_metadados()
+                # Inicializar processador com as plataformas selecionadas
+                processador = ProcessadorVideo(resultado_video, dir_saida, plataformas=plataformas)
                 
                 # Processar vídeo
                 resultado_edicao = processador.processar()
                 
                 if not resultado_edicao:
-                    raise Exception("Falha ao editar vídeo")
+                    raise Exception(f"Falha ao editar vídeo: {self._erro_job(dir_saida)}")
                 
-                # Obter caminhos dos vídeos editados
-                videos_editados = []
-                for plataforma in plataformas:
-                    nome_base = os.path.basename(resultado_video)
-                    nome_sem_ext, _ = os.path.splitext(nome_base)
-                    video_editado = os.path.join(dir_saida, f"{nome_sem_ext}_{plataforma}.mp4")
-                    if os.path.exists(video_editado):
-                        videos_editados.append(video_editado)
+                # Obter caminhos dos vídeos editados (resultados do metadados.json)
+                metadados = metadados_job.ler_metadados(os.path.join(dir_saida, "metadados.json"), {})
+                videos_editados = [
+                    metadados["resultados"][plataforma]["arquivo"]
+                    for plataforma in plataformas
+                    if plataforma in metadados.get("resultados", {})
+                    and os.path.exists(metadados["resultados"][plataforma]["arquivo"])
+                ]
                 
                 # Atualizar progresso
                 self.root.after(0, lambda: self._atualizar_progresso_auto("editar", 100))
@@ -1182,13 +1180,37 @@ class ZudoEditorApp:
                 os.makedirs(dir_saida, exist_ok=True)
                 return
             
-            # Listar arquivos de vídeo
-            for arquivo in os.listdir(dir_saida):
+            # Listar arquivos de vídeo e as saídas das pastas de jobs do monitor
+            for arquivo in sorted(os.listdir(dir_saida)):
+                caminho = os.path.join(dir_saida, arquivo)
                 if arquivo.lower().endswith((".mp4", ".avi", ".mov", ".mkv")):
-                    self.lista_videos_editados.insert(tk.END, os.path.join(dir_saida, arquivo))
+                    self.lista_videos_editados.insert(tk.END, caminho)
+                elif os.path.isdir(caminho):
+                    for video in self._saidas_job(caminho):
+                        self.lista_videos_editados.insert(tk.END, video)
         except Exception as e:
             self.atualizar_status(f"Erro ao atualizar lista de vídeos editados: {str(e)}", erro=True)
     
+    def _erro_job(self, pasta_job):
+        """Mensagem de erro gravada pelo processador no metadados.json do job"""
+        metadados = metadados_job.ler_metadados(os.path.join(pasta_job, "metadados.json"), {})
+        return (metadados.get("detalhes", {}).get("mensagem_erro")
+                or metadados.get("mensagem_erro")
+                or f"status {metadados.get('status', 'desconhecido')}")
+    
+    def _saidas_job(self, pasta_job):
+        """Vídeos gerados por um job concluído (duplicatas mostram os do job original)"""
+        metadados = metadados_job.ler_metadados_resolvidos(os.path.join(pasta_job, "metadados.json"))
+        if not metadados:
+            return []
+        status = metadados.get("status_original") if metadados.get("duplicata_de") else metadados.get("status")
+        if status != "concluido":
+            return []
+        return [
+            resultado["arquivo"] for resultado in metadados.get("resultados", {}).values()
+            if resultado.get("arquivo") and os.path.exists(resultado["arquivo"])
+        ]
+    
     def atualizar_status(self, mensagem, erro=False):
         """Atualiza a barra de status"""
         self.label_status.configure(text=mensagem, foreground="red" if erro else "black")